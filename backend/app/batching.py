@@ -0,0 +1,94 @@
+# backend/app/batching.py
+"""
+Dynamic request batching for model inference.
+
+Concurrent requests each hand their frames to MicroBatcher.submit(). A single
+background task collects queued frames until it has max_batch of them or the oldest
+has waited max_wait_ms, runs one forward pass on the inference executor, and scatters
+the rows of the result back to the waiting callers. Under load this turns many
+batch-of-1 passes into a few full batches.
+"""
+import asyncio
+import time
+
+import numpy as np
+
+
+class MicroBatcher:
+    def __init__(self, predict, executor, max_batch=32, max_wait_ms=5.0):
+        """predict: blocking fn(uint8 [N, H, W, 3]) -> [N, C]; runs on executor."""
+        self.predict = predict
+        self.executor = executor
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue = asyncio.Queue()
+        self.task = None
+        self.current = []
+        self.batches = 0
+        self.frames = 0
+
+    def start(self):
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        # Fail whatever was still waiting so callers don't hang at shutdown
+        pending = [fut for _, fut in self.current]
+        while not self.queue.empty():
+            pending.append(self.queue.get_nowait()[1])
+        self.current = []
+        for fut in pending:
+            if not fut.done():
+                fut.set_exception(RuntimeError("batcher stopped"))
+
+    async def submit(self, frames):
+        """Queue frames (uint8 [k, H, W, 3]) and wait for their [k, C] predictions."""
+        if self.task is None:
+            raise RuntimeError("batcher is not running")
+        fut = asyncio.get_running_loop().create_future()
+        await self.queue.put((frames, fut))
+        return await fut
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = self.current = [await self.queue.get()]
+            n = len(items[0][0])
+            deadline = time.monotonic() + self.max_wait
+            while n < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                items.append(item)
+                n += len(item[0])
+
+            items = self.current = [(f, fut) for f, fut in items if not fut.cancelled()]
+            if not items:
+                continue
+            # Bad input (e.g. mismatched frame shapes) fails this batch only, never the loop
+            try:
+                batch = items[0][0] if len(items) == 1 else np.concatenate([f for f, _ in items])
+                out = await loop.run_in_executor(self.executor, self.predict, batch)
+            except Exception as e:
+                for _, fut in items:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            self.batches += 1
+            self.frames += len(batch)
+            start = 0
+            for f, fut in items:
+                if not fut.done():
+                    fut.set_result(out[start:start + len(f)])
+                start += len(f)
+            self.current = []
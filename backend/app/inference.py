@@ -0,0 +1,196 @@
+# backend/app/inference.py
+"""
+Model loading, frame sampling and batched prediction for the /analyze and /classify endpoints.
+
+The classifier is the center-frame ResNet-18 saved by scripts/train_baseline_frame.py
+(baseline_resnet18.pt with its class_to_idx), or one of the TorchScript/int8/ONNX
+artifacts exported from it by scripts/export_model.py. Videos are decoded front to back once,
+keeping one frame every `every_sec` seconds, in bounded chunks so memory does not
+grow with video length. Frames are classified in fixed-size batches (the last one is
+padded) and runs of consecutive confident predictions become events.
+"""
+import json
+import os
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+import torch
+import torch.nn as nn
+from torchvision import models
+
+DEFAULT_MODEL_PATH = Path(__file__).resolve().parents[1] / "data" / "splits" / "baseline_resnet18.pt"
+IMAGENET_MEAN = [0.485, 0.456, 0.406]
+IMAGENET_STD = [0.229, 0.224, 0.225]
+
+
+# Artifacts written next to the checkpoint by scripts/export_model.py
+MODEL_FORMATS = {
+    "eager": ".pt",
+    "torchscript": ".ts.pt",
+    "int8": ".int8.ts.pt",
+    "onnx": ".onnx",
+}
+
+
+class FrameClassifier:
+    """
+    Loads a baseline checkpoint once and classifies uint8 RGB frames in fixed-size batches.
+    model_format (or ASTRO_MODEL_FORMAT) selects the eager checkpoint or one of the
+    exported CPU artifacts; int8 and onnx always run on CPU.
+    """
+
+    def __init__(self, ckpt_path=None, batch_size=32, device=None, model_format=None):
+        ckpt_path = Path(ckpt_path or os.environ.get("ASTRO_MODEL_PATH", DEFAULT_MODEL_PATH))
+        self.model_format = model_format or os.environ.get("ASTRO_MODEL_FORMAT", "eager")
+        if self.model_format not in MODEL_FORMATS:
+            raise ValueError(f"unknown model format {self.model_format!r} (choose from {sorted(MODEL_FORMATS)})")
+        self.batch_size = batch_size
+        if self.model_format in ("int8", "onnx"):
+            device = "cpu"
+        self.device = torch.device(device or ("cuda" if torch.cuda.is_available() else "cpu"))
+
+        path = ckpt_path.with_suffix("").with_suffix(MODEL_FORMATS[self.model_format])
+        if self.model_format == "eager":
+            ckpt = torch.load(path, map_location="cpu")
+            meta = {"class_to_idx": ckpt["class_to_idx"], "img_size": ckpt.get("img_size", 224)}
+            model = models.resnet18(weights=None)
+            model.fc = nn.Linear(model.fc.in_features, len(meta["class_to_idx"]))
+            model.load_state_dict(ckpt["model"])
+            self.model = model.to(self.device).eval()
+        elif self.model_format == "onnx":
+            import onnxruntime as ort
+            if not path.exists():
+                raise FileNotFoundError(path)
+            sess = ort.InferenceSession(str(path), providers=["CPUExecutionProvider"])
+            meta = json.loads(sess.get_modelmeta().custom_metadata_map["meta.json"])
+            self.model = lambda x: torch.from_numpy(sess.run(None, {"input": x.numpy()})[0])
+        else:
+            if self.model_format == "int8" and "x86" in torch.backends.quantized.supported_engines:
+                torch.backends.quantized.engine = "x86"  # same engine export_model.py quantized for
+            if not path.exists():
+                raise FileNotFoundError(path)
+            extra = {"meta.json": ""}
+            self.model = torch.jit.load(str(path), map_location=self.device, _extra_files=extra)
+            meta = json.loads(extra["meta.json"])
+
+        self.class_to_idx = meta["class_to_idx"]
+        self.idx_to_class = {i: a for a, i in self.class_to_idx.items()}
+        self.img_size = int(meta["img_size"])
+        self.mean = torch.tensor(IMAGENET_MEAN, device=self.device).view(1, 3, 1, 1)
+        self.std = torch.tensor(IMAGENET_STD, device=self.device).view(1, 3, 1, 1)
+
+    def warmup(self):
+        """Run one full batch so the first request doesn't pay for lazy init."""
+        self.predict(np.zeros((self.batch_size, self.img_size, self.img_size, 3), dtype=np.uint8))
+
+    @torch.no_grad()
+    def predict(self, frames):
+        """frames: uint8 [N, img_size, img_size, 3] RGB. Returns softmax probs as float32 [N, C]."""
+        out = []
+        for i in range(0, len(frames), self.batch_size):
+            chunk = frames[i:i + self.batch_size]
+            n = len(chunk)
+            if n < self.batch_size:
+                # keep every forward pass the same shape
+                pad = np.zeros((self.batch_size - n,) + chunk.shape[1:], dtype=np.uint8)
+                chunk = np.concatenate([chunk, pad])
+            x = torch.from_numpy(chunk).to(self.device).permute(0, 3, 1, 2).float().div_(255)
+            x = (x - self.mean) / self.std
+            out.append(torch.softmax(self.model(x), dim=1)[:n].float().cpu())
+        if not out:
+            return np.zeros((0, len(self.class_to_idx)), dtype=np.float32)
+        return torch.cat(out).numpy()
+
+
+def read_center_frame(path, img_size=224):
+    """Center frame of a short clip as uint8 [1, img_size, img_size, 3] RGB (the model's training input)."""
+    cap = cv2.VideoCapture(str(path))
+    if not cap.isOpened():
+        raise ValueError("could not open video")
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or 1
+    cap.set(cv2.CAP_PROP_POS_FRAMES, max(0, frame_count // 2))
+    ok, frame = cap.read()
+    if not ok or frame is None:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        ok, frame = cap.read()
+    cap.release()
+    if not ok or frame is None:
+        raise ValueError("could not decode a frame")
+    frame = cv2.resize(frame, (img_size, img_size), interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)[None]
+
+
+class FrameSampler:
+    """
+    Sequential reader that keeps one frame every `every_sec` seconds, resized to img_size.
+    Call read(n) repeatedly; each call continues where the previous one stopped.
+    """
+
+    def __init__(self, path, every_sec=0.5, img_size=224):
+        self.cap = cv2.VideoCapture(str(path))
+        if not self.cap.isOpened():
+            raise ValueError("could not open video")
+        fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.fps = fps
+        self.step = max(1, int(round(fps * every_sec)))
+        self.img_size = img_size
+        self.pos = 0
+
+    def read(self, n):
+        """Up to n sampled frames as (uint8 [k, H, W, 3] RGB, times in seconds, seconds spent)."""
+        t0 = time.perf_counter()
+        frames, times = [], []
+        while len(frames) < n:
+            if not self.cap.grab():
+                break
+            if self.pos % self.step == 0:
+                ok, frame = self.cap.retrieve()
+                if ok:
+                    frame = cv2.resize(frame, (self.img_size, self.img_size), interpolation=cv2.INTER_AREA)
+                    frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+                    times.append(self.pos / self.fps)
+            self.pos += 1
+        arr = np.stack(frames) if frames else np.zeros((0, self.img_size, self.img_size, 3), dtype=np.uint8)
+        return arr, times, time.perf_counter() - t0
+
+    def close(self):
+        self.cap.release()
+
+
+def frames_to_events(probs, times, idx_to_class, min_conf=0.5):
+    """
+    Merge runs of consecutive samples with the same confident prediction into one event,
+    timed at its most confident sample. Returns [{"t_sec", "action", "confidence"}].
+    """
+    events = []
+    run = None
+    for p, t in zip(probs, times):
+        k = int(p.argmax())
+        conf = float(p[k])
+        if conf < min_conf:
+            run = None
+            continue
+        if run is not None and run["k"] == k:
+            if conf > run["confidence"]:
+                run.update(t_sec=t, confidence=conf)
+            continue
+        run = {"k": k, "t_sec": t, "confidence": conf}
+        events.append(run)
+    return [{"t_sec": round(e["t_sec"], 3), "action": idx_to_class[e["k"]],
+             "confidence": round(e["confidence"], 4)} for e in events]
+
+
+def summarize(events, actions, player="unknown"):
+    """
+    Roadmap schema: {players: {name: {action: {attempts, success}}}, totals: {...}}.
+    The baseline model has no outcome head, so success is reported as None.
+    """
+    counts = {a: {"attempts": 0, "success": None} for a in actions}
+    for e in events:
+        counts[e["action"]]["attempts"] += 1
+    return {
+        "players": {player: counts},
+        "totals": {a: dict(v) for a, v in counts.items()},
+    }
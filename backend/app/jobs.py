@@ -0,0 +1,177 @@
+# backend/app/jobs.py
+"""
+Background processing for uploaded videos.
+
+JobQueue holds at most max_pending queued jobs (submit raises asyncio.QueueFull beyond
+that, so callers can answer 503 instead of piling up work; reserve() claims a slot up
+front for callers that must await something before submitting) and runs them on a fixed
+number of asyncio workers. Each job is a list of named steps; a step is a blocking
+function run on the job thread pool that gets a progress=fn(fraction) keyword and returns
+a JSON-able result. Steps run in order; a failing step does not stop the later ones, and
+the job reports per-step status, progress and results. Jobs live in memory only.
+
+Step functions for uploads: probe_video, extract_video_clips, classify_video.
+"""
+import asyncio
+import json
+import subprocess
+import sys
+import time
+import uuid
+from collections import OrderedDict
+from functools import partial
+from pathlib import Path
+
+import cv2
+
+from .inference import FrameSampler, frames_to_events, summarize
+
+EXTRACT_SCRIPT = Path(__file__).resolve().parents[1] / "scripts" / "extract_clips.py"
+
+
+class JobQueue:
+    def __init__(self, executor, workers=2, max_pending=32, keep=200):
+        self.executor = executor
+        self.n_workers = workers
+        self.queue = asyncio.Queue(maxsize=max_pending)
+        self.jobs = OrderedDict()
+        self.keep = keep
+        self.tasks = []
+        self.reserved = 0
+
+    def start(self):
+        self.tasks = [asyncio.create_task(self._worker()) for _ in range(self.n_workers)]
+
+    async def stop(self):
+        for t in self.tasks:
+            t.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    def reserve(self):
+        """Hold a queue slot for a later submit(..., reserved=True); raises asyncio.QueueFull."""
+        if self.queue.maxsize and self.queue.qsize() + self.reserved >= self.queue.maxsize:
+            raise asyncio.QueueFull
+        self.reserved += 1
+
+    def release(self):
+        """Give back a reserved slot that will not be used."""
+        self.reserved -= 1
+
+    def submit(self, video, steps, reserved=False):
+        """Queue [(name, fn(progress=...) -> result)] for video; returns the job dict."""
+        if not reserved and self.queue.maxsize and self.queue.qsize() + self.reserved >= self.queue.maxsize:
+            raise asyncio.QueueFull
+        job = {
+            "id": uuid.uuid4().hex, "video": video, "status": "queued", "progress": 0.0,
+            "created": time.time(), "started": None, "finished": None,
+            "steps": [{"name": name, "status": "pending", "progress": 0.0, "result": None, "error": None}
+                      for name, _ in steps],
+        }
+        self.queue.put_nowait((job, steps))
+        if reserved:
+            self.reserved -= 1
+        self.jobs[job["id"]] = job
+        # forget the oldest finished jobs
+        while len(self.jobs) > self.keep:
+            oldest = next((j for j in self.jobs.values() if j["finished"] is not None), None)
+            if oldest is None:
+                break
+            del self.jobs[oldest["id"]]
+        return job
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def list(self):
+        return list(reversed(self.jobs.values()))
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job, steps = await self.queue.get()
+            job["status"], job["started"] = "running", time.time()
+            for i, (state, (_, fn)) in enumerate(zip(job["steps"], steps)):
+                def progress(fraction, state=state, i=i):
+                    state["progress"] = round(min(max(fraction, 0.0), 1.0), 3)
+                    job["progress"] = round((i + state["progress"]) / len(steps), 3)
+                state["status"] = "running"
+                t0 = time.perf_counter()
+                try:
+                    state["result"] = await loop.run_in_executor(self.executor, partial(fn, progress=progress))
+                    state["status"] = "skipped" if (state["result"] or {}).get("skipped") else "done"
+                except Exception as e:
+                    state["status"], state["error"] = "failed", f"{type(e).__name__}: {e}"
+                progress(1.0)
+                state["seconds"] = round(time.perf_counter() - t0, 3)
+            failed = any(s["status"] == "failed" for s in job["steps"])
+            job["status"], job["finished"] = ("failed" if failed else "done"), time.time()
+            self.queue.task_done()
+
+
+def probe_video(path, progress=None):
+    """Duration, size, fps, codec of a video (ffprobe, falling back to OpenCV)."""
+    try:
+        out = subprocess.run(
+            ["ffprobe", "-v", "error", "-select_streams", "v:0", "-show_entries",
+             "stream=codec_name,width,height,avg_frame_rate:format=duration,size", "-of", "json", str(path)],
+            capture_output=True, text=True, check=True).stdout
+        info = json.loads(out)
+        stream = (info.get("streams") or [{}])[0]
+        num, _, den = (stream.get("avg_frame_rate") or "0/1").partition("/")
+        return {
+            "duration": float(info.get("format", {}).get("duration") or 0.0),
+            "bytes": int(info.get("format", {}).get("size") or Path(path).stat().st_size),
+            "width": stream.get("width"), "height": stream.get("height"), "codec": stream.get("codec_name"),
+            "fps": round(float(num) / float(den or 1), 3) if float(den or 1) else None,
+        }
+    except (OSError, subprocess.CalledProcessError, ValueError):
+        cap = cv2.VideoCapture(str(path))
+        if not cap.isOpened():
+            raise ValueError("could not open video")
+        fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+        frames = cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0.0
+        info = {"duration": frames / fps if fps else 0.0, "bytes": Path(path).stat().st_size,
+                "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                "codec": None, "fps": round(fps, 3)}
+        cap.release()
+        return info
+
+
+def extract_video_clips(video, manifest, out_dir, pre=1.0, post=2.0, progress=None):
+    """Run scripts/extract_clips.py for this video's tags in manifest, into out_dir."""
+    video = Path(video)
+    if not manifest or not Path(manifest).exists():
+        return {"skipped": "no manifest"}
+    cmd = [sys.executable, str(EXTRACT_SCRIPT), "--manifest", str(manifest), "--video-root", str(video.parent),
+           "--out-dir", str(out_dir), "--video", video.name, "--pre", str(pre), "--post", str(post)]
+    proc = subprocess.run(cmd, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError((proc.stderr or proc.stdout).strip()[-500:])
+    return {"out_dir": str(out_dir), "log": proc.stdout.strip().splitlines()[-3:]}
+
+
+def classify_video(path, clf, predict, every_sec=0.5, min_conf=0.5, chunk_frames=256, progress=None):
+    """
+    Same as /analyze for a stored video: sampled frames → predict (e.g. the API's
+    micro-batcher, called from this worker thread) → events and per-action summary.
+    """
+    sampler = FrameSampler(path, every_sec=every_sec, img_size=clf.img_size)
+    total = sampler.cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0
+    probs, times = [], []
+    try:
+        while True:
+            frames, chunk_times, _ = sampler.read(chunk_frames)
+            if not len(frames):
+                break
+            probs.extend(predict(frames))
+            times.extend(chunk_times)
+            if progress is not None and total:
+                progress(sampler.pos / total)
+    finally:
+        sampler.close()
+    events = frames_to_events(probs, times, clf.idx_to_class, min_conf=min_conf)
+    body = summarize(events, sorted(clf.class_to_idx))
+    body["events"] = events
+    body["frames"] = len(times)
+    return body
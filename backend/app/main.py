@@ -1,8 +1,413 @@
 # backend/app/main.py
-from fastapi import FastAPI
+import asyncio
+import logging
+import os
+import re
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from pathlib import Path
 
-app = FastAPI()
+from fastapi import FastAPI, File, Form, HTTPException, Query, Request, UploadFile
+from fastapi.responses import FileResponse, JSONResponse
+from pydantic import BaseModel
+
+from .batching import MicroBatcher
+from .inference import FrameClassifier, FrameSampler, frames_to_events, read_center_frame, summarize
+from .jobs import JobQueue, classify_video, extract_video_clips, probe_video
+from .media import (DEFAULT_SPRITE_CACHE, DEFAULT_VIDEO_ROOT, SpriteCache, VideoResponse, list_videos,
+                    resolve_video, sprite_key)
+from .stats import DEFAULT_STATS_DB, StatsStore
+from .uploads import DEFAULT_UPLOAD_DIR, UploadError, UploadStore
+
+CHUNK_FRAMES = 256  # sampled frames decoded per step; bounds memory per request
+log = logging.getLogger(__name__)
+
+
+def log_sync_failure(future):
+    if not future.cancelled() and future.exception() is not None:
+        log.error("Stats sync failed", exc_info=future.exception())
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load + warm the model once; /analyze answers 503 if there is no checkpoint yet
+    app.state.decode_pool = ThreadPoolExecutor(
+        max_workers=int(os.environ.get("ASTRO_DECODE_WORKERS", 4)), thread_name_prefix="decode")
+    # torch already uses all cores per forward pass; one inference thread avoids oversubscription
+    app.state.infer_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="infer")
+    app.state.video_root = Path(os.environ.get("ASTRO_VIDEO_ROOT", DEFAULT_VIDEO_ROOT))
+    app.state.sprite_cache = SpriteCache(os.environ.get("ASTRO_SPRITE_CACHE", DEFAULT_SPRITE_CACHE),
+                                         max_bytes=int(os.environ.get("ASTRO_SPRITE_CACHE_MB", 512)) << 20)
+    app.state.uploads = UploadStore(os.environ.get("ASTRO_UPLOAD_DIR", DEFAULT_UPLOAD_DIR),
+                                    chunk_size=int(os.environ.get("ASTRO_CHUNK_MB", 8)) << 20)
+    app.state.uploads.purge(float(os.environ.get("ASTRO_UPLOAD_TTL_H", 24)) * 3600)
+    # Background jobs get their own small pool so they never starve request decoding
+    n_job_workers = int(os.environ.get("ASTRO_JOB_WORKERS", 2))
+    app.state.job_pool = ThreadPoolExecutor(max_workers=n_job_workers, thread_name_prefix="job")
+    app.state.jobs = JobQueue(app.state.job_pool, workers=n_job_workers,
+                              max_pending=int(os.environ.get("ASTRO_JOB_QUEUE", 32)))
+    app.state.jobs.start()
+    # Stats store catches up with the manifest on its own thread (never a job worker); queries work meanwhile
+    app.state.manifest = Path(os.environ.get("ASTRO_MANIFEST", app.state.video_root.parent / "manifest.csv"))
+    app.state.stats = StatsStore(os.environ.get("ASTRO_STATS_DB", DEFAULT_STATS_DB))
+    app.state.stats_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stats")
+    app.state.stats_sync = None
+    if app.state.manifest.exists():
+        app.state.stats_sync = app.state.stats_pool.submit(app.state.stats.sync, app.state.manifest)
+        app.state.stats_sync.add_done_callback(log_sync_failure)
+    try:
+        app.state.classifier = FrameClassifier(batch_size=int(os.environ.get("ASTRO_BATCH_SIZE", 32)))
+        app.state.classifier.warmup()
+    except FileNotFoundError:
+        app.state.classifier = None
+    # Every forward pass goes through one micro-batcher so concurrent requests share batches
+    app.state.batcher = None
+    if app.state.classifier is not None:
+        app.state.batcher = MicroBatcher(
+            app.state.classifier.predict, app.state.infer_pool,
+            max_batch=int(os.environ.get("ASTRO_MAX_BATCH", app.state.classifier.batch_size)),
+            max_wait_ms=float(os.environ.get("ASTRO_MAX_WAIT_MS", 5)),
+        )
+        app.state.batcher.start()
+    yield
+    await app.state.jobs.stop()
+    if app.state.batcher is not None:
+        await app.state.batcher.stop()
+    app.state.job_pool.shutdown(wait=False, cancel_futures=True)
+    app.state.stats_pool.shutdown(wait=False, cancel_futures=True)
+    app.state.decode_pool.shutdown()
+    app.state.infer_pool.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 
 @app.get("/")
 def root():
     return {"message": "Astro backend is running!"}
+
+
+@app.post("/analyze")
+async def analyze(
+    file: UploadFile = File(...),
+    player: str = Form("unknown"),
+    sample_every: float = Form(0.5),
+    min_conf: float = Form(0.5),
+):
+    """
+    Upload a video → sampled frames → batched predictions → per-player/totals summary.
+    Stage latencies (ms) are returned in the Server-Timing header.
+    """
+    clf = app.state.classifier
+    if clf is None:
+        raise HTTPException(status_code=503, detail="model checkpoint not found")
+    loop = asyncio.get_running_loop()
+    timings = {}
+
+    t0 = time.perf_counter()
+    suffix = os.path.splitext(file.filename or "")[1] or ".mp4"
+    tmp = tempfile.NamedTemporaryFile(suffix=suffix, delete=False)
+    sampler = next_chunk = None
+    try:
+        with tmp:
+            await loop.run_in_executor(app.state.decode_pool, shutil.copyfileobj, file.file, tmp, 1 << 20)
+        timings["upload"] = time.perf_counter() - t0
+
+        try:
+            sampler = await loop.run_in_executor(
+                app.state.decode_pool, FrameSampler, tmp.name, max(sample_every, 0.04), clf.img_size)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        # Decode the next chunk while the current one is being classified
+        decode_s = predict_s = 0.0
+        probs, times = [], []
+        next_chunk = loop.run_in_executor(app.state.decode_pool, sampler.read, CHUNK_FRAMES)
+        while True:
+            frames, chunk_times, secs = await next_chunk
+            decode_s += secs
+            if not len(frames):
+                break
+            next_chunk = loop.run_in_executor(app.state.decode_pool, sampler.read, CHUNK_FRAMES)
+            t1 = time.perf_counter()
+            probs.extend(await app.state.batcher.submit(frames))
+            predict_s += time.perf_counter() - t1
+            times.extend(chunk_times)
+        timings["decode"] = decode_s
+        timings["predict"] = predict_s
+    finally:
+        # A prefetched read may still be running on the pool (predict failed, client went
+        # away); it uses the capture, so let it finish before releasing it
+        if next_chunk is not None and not next_chunk.done():
+            await asyncio.wait([next_chunk])
+        if next_chunk is not None and not next_chunk.cancelled():
+            next_chunk.exception()  # mark retrieved; the original error (if any) is what propagates
+        if sampler is not None:
+            sampler.close()
+        os.unlink(tmp.name)
+
+    t2 = time.perf_counter()
+    events = frames_to_events(probs, times, clf.idx_to_class, min_conf=min_conf)
+    body = summarize(events, sorted(clf.class_to_idx), player=player)
+    body["events"] = events
+    body["frames"] = len(times)
+    timings["aggregate"] = time.perf_counter() - t2
+
+    return JSONResponse(body, headers={"Server-Timing": server_timing(timings)})
+
+
+@app.post("/classify")
+async def classify(file: UploadFile = File(...)):
+    """Classify one pre-cut clip (e.g. from extract_clips.py) by its center frame."""
+    clf = app.state.classifier
+    if clf is None:
+        raise HTTPException(status_code=503, detail="model checkpoint not found")
+    loop = asyncio.get_running_loop()
+    timings = {}
+
+    t0 = time.perf_counter()
+    suffix = os.path.splitext(file.filename or "")[1] or ".mp4"
+    tmp = tempfile.NamedTemporaryFile(suffix=suffix, delete=False)
+    try:
+        with tmp:
+            await loop.run_in_executor(app.state.decode_pool, shutil.copyfileobj, file.file, tmp, 1 << 20)
+        timings["upload"] = time.perf_counter() - t0
+
+        t1 = time.perf_counter()
+        try:
+            frame = await loop.run_in_executor(app.state.decode_pool, read_center_frame, tmp.name, clf.img_size)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        timings["decode"] = time.perf_counter() - t1
+    finally:
+        os.unlink(tmp.name)
+
+    t2 = time.perf_counter()
+    p = (await app.state.batcher.submit(frame))[0]
+    timings["predict"] = time.perf_counter() - t2
+
+    k = int(p.argmax())
+    body = {
+        "action": clf.idx_to_class[k],
+        "confidence": round(float(p[k]), 4),
+        "probs": {clf.idx_to_class[i]: round(float(v), 4) for i, v in enumerate(p)},
+    }
+    return JSONResponse(body, headers={"Server-Timing": server_timing(timings)})
+
+
+@app.get("/videos")
+def videos():
+    """Videos under ASTRO_VIDEO_ROOT (default backend/data/videos)."""
+    return {"videos": [{"name": p.name, "size": p.stat().st_size, "url": f"/videos/{p.name}"}
+                       for p in list_videos(app.state.video_root)]}
+
+
+@app.api_route("/videos/{name}", methods=["GET", "HEAD"])
+def video(name: str):
+    """Stream a video with Range support, so seeking only fetches the bytes near the playhead."""
+    path = resolve_video(app.state.video_root, name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="video not found")
+    return VideoResponse(path, headers={"cache-control": "no-cache"})
+
+
+@app.get("/videos/{name}/sprites")
+async def sprites(name: str, interval: float = 2.0, width: int = 160, cols: int = 10, rows: int = 10):
+    """
+    Timeline thumbnail sprite sheets: one tile every `interval` seconds, cols x rows tiles
+    per JPEG sheet. Tile i is on sheet i // (cols * rows) at column i % cols, row
+    (i // cols) % rows. Built once per video/config, then served from the LRU disk cache.
+    """
+    path = resolve_video(app.state.video_root, name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="video not found")
+    interval = min(max(interval, 0.5), 60.0)
+    width, cols, rows = min(max(width, 32), 480), min(max(cols, 1), 20), min(max(rows, 1), 20)
+    cache = app.state.sprite_cache
+    key = sprite_key(path, interval, width, cols, rows)
+    manifest = cache.get(key)
+    if manifest is None:
+        # the cache builds each key once; concurrent requests and upload jobs wait for it
+        build = partial(cache.get_or_build, key, path, interval=interval, tile_width=width, cols=cols, rows=rows)
+        try:
+            manifest = await asyncio.get_running_loop().run_in_executor(app.state.decode_pool, build)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return {**manifest, "sheets": [f"/sprites/{key}/{s}" for s in manifest["sheets"]]}
+
+
+@app.get("/sprites/{key}/{sheet}")
+def sprite_sheet(key: str, sheet: str):
+    """A cached sheet; its URL changes whenever the video or sprite config does, so it is immutable."""
+    path = None
+    if re.fullmatch(r"[0-9a-f]{20}", key) and re.fullmatch(r"sheet_\d{3}\.jpg", sheet):
+        path = app.state.sprite_cache.sheet_path(key, sheet)
+    if path is None:
+        raise HTTPException(status_code=404, detail="sprite sheet not found")
+    return FileResponse(path, media_type="image/jpeg",
+                        headers={"cache-control": "public, max-age=31536000, immutable"})
+
+
+class UploadStart(BaseModel):
+    filename: str
+    size: int
+    chunk_size: int = 0
+
+
+class UploadDone(BaseModel):
+    sprites: bool = True
+    extract: bool = True
+    infer: bool = False
+    pre: float = 1.0
+    post: float = 2.0
+    sample_every: float = 0.5
+    min_conf: float = 0.5
+
+
+def upload_status(store, session):
+    missing = store.missing(session)
+    return {"upload_id": session["id"], "filename": session["filename"], "size": session["size"],
+            "chunk_size": session["chunk_size"], "chunks": session["chunks"],
+            "received": len(session["received"]), "missing": missing}
+
+
+@app.post("/uploads", status_code=201)
+def start_upload(body: UploadStart):
+    """Open a resumable upload; then PUT each chunk to /uploads/{id}/chunks/{index}."""
+    try:
+        session = app.state.uploads.create(body.filename, body.size, body.chunk_size or None)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status, detail=str(e))
+    return upload_status(app.state.uploads, session)
+
+
+@app.get("/uploads/{upload_id}")
+def get_upload(upload_id: str):
+    """Which chunks are still missing, for resuming an interrupted upload."""
+    session = app.state.uploads.get(upload_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="upload not found")
+    return upload_status(app.state.uploads, session)
+
+
+@app.put("/uploads/{upload_id}/chunks/{index}")
+async def put_chunk(upload_id: str, index: int, request: Request):
+    """
+    Raw chunk body (application/octet-stream), streamed straight to disk. Optional
+    X-Chunk-Sha256 header is verified. Re-sending a chunk is harmless.
+    """
+    try:
+        session = await app.state.uploads.write_chunk(upload_id, index, request.stream(),
+                                                      sha256=request.headers.get("x-chunk-sha256"))
+    except UploadError as e:
+        raise HTTPException(status_code=e.status, detail=str(e))
+    return {"index": index, "received": len(session["received"]), "chunks": session["chunks"]}
+
+
+@app.delete("/uploads/{upload_id}", status_code=204)
+def cancel_upload(upload_id: str):
+    if app.state.uploads.get(upload_id) is None:
+        raise HTTPException(status_code=404, detail="upload not found")
+    app.state.uploads.delete(upload_id)
+
+
+def upload_steps(path, body):
+    """Processing steps of the job for an uploaded video (see complete_upload)."""
+    steps = [("probe", partial(probe_video, path))]
+    if body.sprites:
+        cache = app.state.sprite_cache
+        key = sprite_key(path, 2.0, 160, 10, 10)  # the /videos/{name}/sprites defaults
+        steps.append(("sprites", lambda progress: {"sheets": len(cache.get_or_build(key, path, progress=progress)["sheets"])}))
+    if body.extract:
+        manifest = app.state.manifest
+        clips_dir = Path(os.environ.get("ASTRO_CLIPS_DIR", app.state.video_root.parent / "clips")) / path.name
+        steps.append(("extract", partial(extract_video_clips, path, manifest, clips_dir, pre=body.pre, post=body.post)))
+    if body.infer:
+        if app.state.classifier is None:
+            steps.append(("infer", lambda progress: {"skipped": "model checkpoint not found"}))
+        else:
+            loop = asyncio.get_running_loop()
+            # frames go through the shared micro-batcher, like /analyze
+            predict = lambda frames: asyncio.run_coroutine_threadsafe(app.state.batcher.submit(frames), loop).result()
+            steps.append(("infer", partial(classify_video, path, app.state.classifier, predict,
+                                           every_sec=max(body.sample_every, 0.04), min_conf=body.min_conf)))
+    return steps
+
+
+@app.post("/uploads/{upload_id}/complete", status_code=202)
+async def complete_upload(upload_id: str, body: UploadDone = UploadDone()):
+    """
+    Move the finished upload into the video root and queue its processing job:
+    probe → thumbnail sprites → clip extraction (tags from ASTRO_MANIFEST) → optional inference.
+    Poll GET /jobs/{job_id} for progress.
+    """
+    store, jobs = app.state.uploads, app.state.jobs
+    # Claim the job slot before the upload is consumed, so a full queue never strands it
+    try:
+        jobs.reserve()
+    except asyncio.QueueFull:
+        raise HTTPException(status_code=503, detail="job queue is full, retry later",
+                            headers={"Retry-After": "30"})
+    try:
+        try:
+            path = await asyncio.get_running_loop().run_in_executor(None, store.finish, upload_id, app.state.video_root)
+        except UploadError as e:
+            raise HTTPException(status_code=e.status, detail=str(e))
+        job = jobs.submit(path.name, upload_steps(path, body), reserved=True)
+    except BaseException:
+        jobs.release()
+        raise
+    return {"video": path.name, "url": f"/videos/{path.name}", "job_id": job["id"]}
+
+
+@app.get("/jobs")
+def list_jobs():
+    return {"jobs": [{k: j[k] for k in ("id", "video", "status", "progress", "created", "finished")}
+                     for j in app.state.jobs.list()]}
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """Status, overall progress and per-step status/progress/results of a processing job."""
+    job = app.state.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    return job
+
+
+@app.get("/stats")
+def stats(
+    player: list[str] = Query(None),
+    action: list[str] = Query(None),
+    video: list[str] = Query(None),
+    date_from: str = None,
+    date_to: str = None,
+    group_by: str = "player,action",
+):
+    """
+    Per-player attempts/success from the stats store, e.g.
+    /stats?player=Ann&group_by=action,month or /stats?date_from=2024-09-01&group_by=player.
+    Repeat player/action/video to filter on several values; group_by takes any of
+    player, action, video, date, month (empty for the overall total only).
+    """
+    try:
+        return app.state.stats.query(players=player, actions=action, videos=video, date_from=date_from,
+                                     date_to=date_to, group_by=[g.strip() for g in group_by.split(",") if g.strip()])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/stats/sync")
+def stats_sync(force: bool = False):
+    """Apply manifest changes (new, removed, re-tagged events) to the stats store."""
+    if not app.state.manifest.exists():
+        raise HTTPException(status_code=404, detail=f"manifest not found: {app.state.manifest}")
+    return app.state.stats.sync(app.state.manifest, force=force)
+
+
+
+def server_timing(timings):
+    return ", ".join(f"{k};dur={1000 * v:.1f}" for k, v in timings.items())
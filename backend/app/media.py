@@ -0,0 +1,308 @@
+# backend/app/media.py
+"""
+Video streaming and timeline thumbnail sprites for the tagging UI.
+
+VideoResponse serves a file with HTTP Range support (one byte range per request, which
+is what <video> elements send), so the browser fetches only the bytes around the
+playhead instead of the whole match. When the ASGI server offers the zero-copy send
+extensions the kernel copies the file straight to the socket; otherwise the range is
+streamed in 1 MB reads and stops as soon as the client disconnects (a seek).
+
+Sprite sheets are JPEG grids of small thumbnails taken every `interval` seconds. A video
+is decoded once, front to back, per sprite configuration; the result is stored on disk
+under a key derived from the video's size/mtime and the configuration, and the cache is
+kept under a byte budget by evicting the least recently used entries.
+"""
+import asyncio
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+import tempfile
+import threading
+import time
+from email.utils import formatdate
+from pathlib import Path
+
+import cv2
+import numpy as np
+from starlette.responses import Response
+
+DEFAULT_VIDEO_ROOT = Path(__file__).resolve().parents[1] / "data" / "videos"
+DEFAULT_SPRITE_CACHE = Path(__file__).resolve().parents[1] / "data" / "sprite_cache"
+VIDEO_EXTS = {".mp4", ".mov", ".m4v", ".webm", ".mkv"}
+READ_CHUNK = 1 << 20
+
+
+def resolve_video(root, name):
+    """Path of video `name` directly under root, or None (missing, wrong type, or outside root)."""
+    root = Path(root).resolve()
+    path = (root / name).resolve()
+    if path.parent != root or path.suffix.lower() not in VIDEO_EXTS or not path.is_file():
+        return None
+    return path
+
+
+def list_videos(root):
+    root = Path(root)
+    if not root.is_dir():
+        return []
+    return sorted(p for p in root.iterdir() if p.suffix.lower() in VIDEO_EXTS and p.is_file())
+
+
+def parse_range(header, size):
+    """
+    (start, end_exclusive) for a single "bytes=" range, None to ignore the header (other
+    units or several ranges; a full 200 is valid then), or "unsatisfiable".
+    """
+    units, _, spec = (header or "").partition("=")
+    if units.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    try:
+        if first == "":
+            n = int(last)  # suffix range: the last n bytes
+            if n <= 0:
+                return "unsatisfiable"
+            return max(0, size - n), size
+        start = int(first)
+        end = int(last) + 1 if last else size
+    except ValueError:
+        return None
+    if start >= size or end <= start:
+        return "unsatisfiable"
+    return start, min(end, size)
+
+
+class VideoResponse(Response):
+    """File response with Range, If-Range, ETag and Last-Modified support."""
+
+    def __init__(self, path, headers=None):
+        self.path = str(path)
+        self.extra_headers = headers or {}
+        self.background = None
+
+    async def __call__(self, scope, receive, send):
+        st = os.stat(self.path)
+        size = st.st_size
+        etag = '"%x-%x"' % (st.st_mtime_ns, size)
+        headers = {
+            "accept-ranges": "bytes",
+            "content-type": mimetypes.guess_type(self.path)[0] or "application/octet-stream",
+            "etag": etag,
+            "last-modified": formatdate(st.st_mtime, usegmt=True),
+            **self.extra_headers,
+        }
+        req = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers", [])}
+        rng = None
+        if "range" in req and req.get("if-range", etag) in (etag, headers["last-modified"]):
+            rng = parse_range(req["range"], size)
+        if rng == "unsatisfiable":
+            await send({"type": "http.response.start", "status": 416,
+                        "headers": _raw({"content-range": f"bytes */{size}", "content-length": "0"})})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        status, (start, end) = (206, rng) if rng else (200, (0, size))
+        headers["content-length"] = str(end - start)
+        if status == 206:
+            headers["content-range"] = f"bytes {start}-{end - 1}/{size}"
+        await send({"type": "http.response.start", "status": status, "headers": _raw(headers)})
+        if scope["method"] == "HEAD" or end == start:
+            await send({"type": "http.response.body", "body": b""})
+        elif status == 200 and "http.response.pathsend" in scope.get("extensions", {}):
+            await send({"type": "http.response.pathsend", "path": self.path})
+        else:
+            with open(self.path, "rb") as f:
+                if "http.response.zerocopysend" in scope.get("extensions", {}):
+                    await send({"type": "http.response.zerocopysend", "file": f.fileno(),
+                                "offset": start, "count": end - start})
+                else:
+                    await _stream_range(f, start, end, receive, send)
+        if self.background is not None:
+            await self.background()
+
+
+def _raw(headers):
+    return [(k.encode("latin-1"), str(v).encode("latin-1")) for k, v in headers.items()]
+
+
+async def _stream_range(f, start, end, receive, send):
+    """Send [start, end) of file f in READ_CHUNK reads; stop early if the client goes away (e.g. a seek)."""
+    loop = asyncio.get_running_loop()
+    gone = asyncio.Event()
+
+    async def watch():
+        while (await receive())["type"] != "http.disconnect":
+            pass
+        gone.set()
+
+    watcher = asyncio.create_task(watch())
+    try:
+        f.seek(start)
+        pos = start
+        while pos < end and not gone.is_set():
+            chunk = await loop.run_in_executor(None, f.read, min(READ_CHUNK, end - pos))
+            if not chunk:
+                break
+            pos += len(chunk)
+            await send({"type": "http.response.body", "body": chunk, "more_body": pos < end})
+        if pos < end and not gone.is_set():
+            await send({"type": "http.response.body", "body": b""})
+    finally:
+        watcher.cancel()
+
+
+def sprite_key(path, interval, tile_width, cols, rows):
+    """Cache key: video identity (name, size, mtime) plus the sprite configuration."""
+    st = os.stat(path)
+    blob = json.dumps([Path(path).name, st.st_size, st.st_mtime_ns, interval, tile_width, cols, rows])
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()[:20]
+
+
+def build_sprites(src, out_dir, interval=2.0, tile_width=160, cols=10, rows=10, quality=70, progress=None):
+    """
+    Decode src once, keep one frame every `interval` seconds as a tile_width-wide
+    thumbnail and pack them row-major into cols x rows JPEG sheets in out_dir.
+    Writes and returns the sheet manifest (also saved as out_dir/sprites.json).
+    progress: optional fn(fraction of frames decoded).
+    """
+    cap = cv2.VideoCapture(str(src))
+    if not cap.isOpened():
+        raise ValueError("could not open video")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    total = cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0
+    step = max(1, int(round(fps * interval)))
+    per_sheet = cols * rows
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    sheets, count, pos, tile_h, sheet = [], 0, 0, None, None
+
+    def flush(n_tiles):
+        used_rows = (n_tiles + cols - 1) // cols
+        name = f"sheet_{len(sheets):03d}.jpg"
+        ok, buf = cv2.imencode(".jpg", sheet[:used_rows * tile_h], [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if ok:
+            (out_dir / name).write_bytes(buf.tobytes())
+            sheets.append(name)
+
+    while cap.grab():
+        if pos % step == 0:
+            ok, frame = cap.retrieve()
+            if ok:
+                if tile_h is None:
+                    h, w = frame.shape[:2]
+                    tile_h = max(2, int(round(h * tile_width / w)) // 2 * 2)
+                    sheet = np.zeros((rows * tile_h, cols * tile_width, 3), dtype=np.uint8)
+                slot = count % per_sheet
+                y, x = (slot // cols) * tile_h, (slot % cols) * tile_width
+                sheet[y:y + tile_h, x:x + tile_width] = cv2.resize(frame, (tile_width, tile_h),
+                                                                   interpolation=cv2.INTER_AREA)
+                count += 1
+                if progress is not None and total:
+                    progress(pos / total)
+                if count % per_sheet == 0:
+                    flush(per_sheet)
+                    sheet[:] = 0
+        pos += 1
+    cap.release()
+    if count % per_sheet:
+        flush(count % per_sheet)
+
+    manifest = {
+        "video": Path(src).name, "interval": interval, "count": count,
+        "tile_width": tile_width, "tile_height": tile_h or 0, "cols": cols, "rows": rows,
+        "sheets": sheets, "duration": pos / fps,
+    }
+    with open(out_dir / "sprites.json", "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    return manifest
+
+
+class SpriteCache:
+    """
+    On-disk LRU of sprite sets: cache_dir/<key>/{sprites.json, sheet_*.jpg}. A hit bumps
+    the entry's sprites.json mtime; after each new entry, the least recently used others
+    are deleted until the cache fits in max_bytes. Use get_or_build() from any thread:
+    each key is built at most once at a time.
+    """
+
+    def __init__(self, cache_dir, max_bytes=512 << 20):
+        self.dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = self.misses = self.evictions = 0
+        self.locks = {}  # key -> [lock, callers using it]
+        self.locks_guard = threading.Lock()
+
+    def get(self, key):
+        meta = self.dir / key / "sprites.json"
+        try:
+            with open(meta, encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        os.utime(meta)
+        self.hits += 1
+        return manifest
+
+    def sheet_path(self, key, sheet):
+        path = self.dir / key / sheet
+        return path if path.is_file() else None
+
+    def get_or_build(self, key, src, **kw):
+        """
+        The cached set for key, built first if missing. Builds of one key are serialized,
+        so callers that race (UI requests, upload jobs) wait and then hit the cache.
+        """
+        with self.locks_guard:
+            entry = self.locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                return self.get(key) or self.build(key, src, **kw)
+        finally:
+            with self.locks_guard:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self.locks[key]
+
+    def build(self, key, src, **kw):
+        """Generate into a temp dir, rename into place (readers never see half a set), then evict."""
+        self.misses += 1
+        self.dir.mkdir(parents=True, exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(prefix=f".{key}.", suffix=".tmp", dir=self.dir))  # unique per call
+        try:
+            t0 = time.perf_counter()
+            manifest = build_sprites(src, tmp, **kw)
+            manifest["build_s"] = round(time.perf_counter() - t0, 3)
+            with open(tmp / "sprites.json", "w", encoding="utf-8") as f:
+                json.dump(manifest, f)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        try:
+            os.replace(tmp, self.dir / key)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)  # another worker finished the same key first
+        self.evict(keep=key)
+        return manifest
+
+    def evict(self, keep=None):
+        entries = []
+        for d in self.dir.iterdir() if self.dir.is_dir() else []:
+            meta = d / "sprites.json"
+            if d.name.startswith(".") or not meta.exists():
+                continue
+            size = sum(f.stat().st_size for f in d.iterdir())
+            entries.append((meta.stat().st_mtime, d, size))
+        total = sum(size for _, _, size in entries)
+        for _, d, size in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            if d.name == keep:
+                continue
+            shutil.rmtree(d, ignore_errors=True)
+            total -= size
+            self.evictions += 1
+        return total
@@ -0,0 +1,307 @@
+# backend/app/stats.py
+"""
+Per-player statistics store.
+
+Manifest rows (one tagged action each: video_id, t_event_sec, action, player, outcome)
+are kept in SQLite together with materialized attempt/success counts at four levels:
+
+    agg_all    player x action
+    agg_month  player x action x month
+    agg_day    player x action x date
+    agg        player x action x video x date
+
+Syncing a manifest applies only the difference (new, removed and re-tagged events) to
+every level, in one transaction, so the aggregates are never rebuilt. A file unchanged
+since its last sync is skipped outright; otherwise each video's rows are fingerprinted
+and only videos whose rows changed are diffed against the stored events. A query reads
+the coarsest level that has all of its filter and group-by columns (month-aligned date
+ranges use the month level), so an all-time player table is a scan of a few hundred
+rows however many events are stored.
+
+An event's date is the row's `date` column if it has one, else a YYYY-MM-DD or YYYYMMDD
+found in its video id, else the day the event was first ingested.
+"""
+import csv
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from datetime import date as Date
+from datetime import timedelta
+from operator import itemgetter
+from pathlib import Path
+
+DEFAULT_STATS_DB = Path(__file__).resolve().parents[1] / "data" / "stats.db"
+DIMENSIONS = ("player", "action", "video", "date", "month")
+# (table, key columns), coarsest first
+LEVELS = [
+    ("agg_all", ("player", "action")),
+    ("agg_month", ("player", "action", "month")),
+    ("agg_day", ("player", "action", "date")),
+    ("agg", ("player", "action", "video", "date")),
+]
+SCHEMA_VERSION = 2  # older stores are dropped and rebuilt from the manifest on the next sync
+COLUMNS = ("video_id", "video_filename", "t_event_sec", "action", "player", "outcome", "date")
+_DATE = re.compile(r"((?:19|20)\d{2})-?(0[1-9]|1[0-2])-?(0[1-9]|[12]\d|3[01])")
+
+
+def read_manifest(path):
+    """COLUMNS values of each row (strings, "" if missing) of a manifest .csv, or .parquet (needs pyarrow)."""
+    path = Path(path)
+    if path.suffix.lower() in (".parquet", ".pq"):
+        import pyarrow.parquet as pq
+        table = pq.read_table(path)
+        cols = [table.column(c).to_pylist() if c in table.column_names else [None] * table.num_rows
+                for c in COLUMNS]
+        return [tuple("" if v is None else str(v) for v in row) for row in zip(*cols)]
+    with open(path, newline="", encoding="utf-8") as f:
+        r = csv.reader(f)
+        header = next(r, [])
+        width = len(header) + 1  # missing columns point at a padding ""
+        pick = itemgetter(*[header.index(c) if c in header else width - 1 for c in COLUMNS])
+        return [pick(row if len(row) >= width else row + [""] * (width - len(row))) for row in r]
+
+
+def video_of(row):
+    return (row[0] or Path(row[1]).stem).strip()
+
+
+def date_in(text):
+    m = _DATE.search(text or "")
+    return "-".join(m.groups()) if m else None
+
+
+def event_from_row(row, video, video_date):
+    """(key, (video, player, action, date or None, outcome)), or (None, None) for an unusable row."""
+    _, _, t, action, player, outcome, day = row
+    action = action.strip().lower()
+    try:
+        t = float(t)
+    except ValueError:
+        return None, None
+    if not action:
+        return None, None
+    player = player.strip() or "unknown"
+    try:
+        outcome = 1 if int(float(outcome or 0)) == 1 else 0
+    except ValueError:
+        outcome = 0
+    # JSON, not a joined string, so ids containing any separator can't collide
+    key = json.dumps([video, f"{t:.3f}", action, player], ensure_ascii=False)
+    return key, (video, player, action, date_in(day) or video_date, outcome)
+
+
+def fingerprint(rows):
+    h = hashlib.sha1()
+    for row in rows:
+        h.update("\x1f".join(row[1:]).encode("utf-8"))
+        h.update(b"\n")
+    return h.hexdigest()
+
+
+def month_end(day):
+    return (Date.fromisoformat(day) + timedelta(days=1)).day == 1
+
+
+class StatsStore:
+    def __init__(self, db_path=DEFAULT_STATS_DB):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.local = threading.local()
+        self.write_lock = threading.Lock()
+        con = self._con()
+        with con:
+            if con.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+                for table in ["sources", "videos", "events"] + [t for t, _ in LEVELS]:
+                    con.execute(f"DROP TABLE IF EXISTS {table}")
+                con.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            con.execute("CREATE TABLE IF NOT EXISTS sources (path TEXT PRIMARY KEY, size INTEGER, "
+                        "mtime_ns INTEGER, events INTEGER, synced REAL)")
+            con.execute("CREATE TABLE IF NOT EXISTS videos (source TEXT, video TEXT, sig TEXT, events INTEGER, "
+                        "PRIMARY KEY (source, video)) WITHOUT ROWID")
+            con.execute("CREATE TABLE IF NOT EXISTS events (source TEXT, key TEXT, video TEXT, player TEXT, "
+                        "action TEXT, date TEXT, outcome INTEGER, PRIMARY KEY (source, video, key)) WITHOUT ROWID")
+            for table, cols in LEVELS:
+                con.execute(f"CREATE TABLE IF NOT EXISTS {table} ({', '.join(c + ' TEXT' for c in cols)}, "
+                            f"attempts INTEGER NOT NULL, success INTEGER NOT NULL, "
+                            f"PRIMARY KEY ({', '.join(cols)})) WITHOUT ROWID")
+            # covering indexes for date ranges and single-video lookups without a player filter
+            con.execute("CREATE INDEX IF NOT EXISTS agg_day_date ON agg_day (date, attempts, success)")
+            con.execute("CREATE INDEX IF NOT EXISTS agg_date ON agg (date, attempts, success)")
+            con.execute("CREATE INDEX IF NOT EXISTS agg_video ON agg (video, attempts, success)")
+
+    def _con(self):
+        """One connection per thread (FastAPI runs sync endpoints on a thread pool)."""
+        con = getattr(self.local, "con", None)
+        if con is None:
+            con = sqlite3.connect(self.db_path, timeout=30)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            self.local.con = con
+        return con
+
+    def sync(self, path, force=False):
+        """Bring the store in line with manifest `path`; returns what changed."""
+        path = Path(path)
+        st = path.stat()
+        src = str(path.resolve())
+        t0 = time.perf_counter()
+        with self.write_lock:
+            con = self._con()
+            seen = con.execute("SELECT size, mtime_ns FROM sources WHERE path = ?", (src,)).fetchone()
+            if not force and seen == (st.st_size, st.st_mtime_ns):
+                return {"source": src, "skipped": True}
+
+            groups = {}
+            for row in read_manifest(path):
+                video = video_of(row)
+                if video:
+                    groups.setdefault(video, []).append(row)
+            sigs = {video: fingerprint(rows) for video, rows in groups.items()}
+            old_sigs = dict(con.execute("SELECT video, sig FROM videos WHERE source = ?", (src,)))
+            changed_videos = [v for v in groups if force or old_sigs.get(v) != sigs[v]]
+            changed_videos += [v for v in old_sigs if v not in groups]
+
+            today = Date.today().isoformat()
+            attempts, success = Counter(), Counter()
+            upserts, removed, video_rows = [], [], []
+            added = changed = 0
+
+            def apply(event, sign):
+                video, player, action, day, outcome = event
+                attempts[player, action, video, day] += sign
+                success[player, action, video, day] += sign * outcome
+
+            for video in changed_videos:
+                new, video_date = {}, date_in(video)
+                for row in groups.get(video, ()):
+                    key, event = event_from_row(row, video, video_date)
+                    if key is not None:
+                        new[key] = event
+                old = {key: tuple(rest) for key, *rest in con.execute(
+                    "SELECT key, video, player, action, date, outcome FROM events "
+                    "WHERE source = ? AND video = ?", (src, video))}
+                for key in old.keys() - new.keys():
+                    apply(old[key], -1)
+                    removed.append((src, video, key))
+                for key, event in new.items():
+                    prev = old.get(key)
+                    if event[3] is None:  # no date anywhere: keep the one it got when first ingested
+                        event = event[:3] + (prev[3] if prev else today,) + event[4:]
+                    if prev == event:
+                        continue
+                    if prev is None:
+                        added += 1
+                    else:
+                        apply(prev, -1)
+                        changed += 1
+                    apply(event, +1)
+                    upserts.append((src, key) + event)
+                video_rows.append((src, video, sigs.get(video), len(new)))
+
+            with con:
+                con.executemany("DELETE FROM events WHERE source = ? AND video = ? AND key = ?", removed)
+                con.executemany("INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?, ?, ?, ?)", upserts)
+                for table, cols in LEVELS:
+                    self._apply_delta(con, table, cols, attempts, success)
+                con.executemany("INSERT OR REPLACE INTO videos VALUES (?, ?, ?, ?)",
+                                [r for r in video_rows if r[2] is not None])
+                con.executemany("DELETE FROM videos WHERE source = ? AND video = ?",
+                                [r[:2] for r in video_rows if r[2] is None])
+                n_events = con.execute("SELECT COALESCE(SUM(events), 0) FROM videos WHERE source = ?",
+                                       (src,)).fetchone()[0]
+                con.execute("INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?, ?)",
+                            (src, st.st_size, st.st_mtime_ns, n_events, time.time()))
+        return {"source": src, "skipped": False, "events": n_events, "videos_changed": len(changed_videos),
+                "added": added, "removed": len(removed), "changed": changed,
+                "seconds": round(time.perf_counter() - t0, 3)}
+
+    @staticmethod
+    def _apply_delta(con, table, cols, attempts, success):
+        """Fold fine-grained (player, action, video, date) deltas into one aggregate level."""
+        da, ds = Counter(), Counter()
+        for fine, n in attempts.items():
+            player, action, video, day = fine
+            values = {"player": player, "action": action, "video": video, "date": day, "month": day[:7]}
+            key = tuple(values[c] for c in cols)
+            da[key] += n
+            ds[key] += success[fine]
+        rows = [key + (n, ds[key]) for key, n in da.items() if n or ds[key]]
+        if not rows:
+            return
+        con.executemany(
+            f"INSERT INTO {table} ({', '.join(cols)}, attempts, success) VALUES ({', '.join('?' * (len(cols) + 2))}) "
+            f"ON CONFLICT ({', '.join(cols)}) DO UPDATE SET attempts = attempts + excluded.attempts, "
+            f"success = success + excluded.success", rows)
+        if any(n < 0 for n in da.values()):
+            con.execute(f"DELETE FROM {table} WHERE attempts <= 0")
+
+    def query(self, players=None, actions=None, videos=None, date_from=None, date_to=None,
+              group_by=("player", "action")):
+        """
+        Attempts / successes / success rate grouped by any of DIMENSIONS (an empty
+        group_by gives just the total), filtered by players, actions, videos and an
+        inclusive YYYY-MM-DD date range.
+        """
+        group_by = list(dict.fromkeys(group_by))
+        unknown = set(group_by) - set(DIMENSIONS)
+        if unknown:
+            raise ValueError(f"unknown group_by {sorted(unknown)}; use {', '.join(DIMENSIONS)}")
+        for d in (date_from, date_to):
+            if d and not re.fullmatch(r"\d{4}-\d{2}-\d{2}", d):
+                raise ValueError("dates must be YYYY-MM-DD")
+            if d:
+                Date.fromisoformat(d)  # ValueError for days like 2024-02-30
+        needed = set(group_by)
+        needed |= {name for name, vals in (("player", players), ("action", actions), ("video", videos)) if vals}
+        # whole-month ranges can be answered from the month level
+        by_month = (not date_from or date_from.endswith("-01")) and (not date_to or month_end(date_to))
+        if date_from or date_to:
+            needed.add("month" if by_month else "date")
+        table, cols = next((t, c) for t, c in LEVELS
+                           if all(n in c or (n == "month" and "date" in c) for n in needed))
+
+        exprs = {c: c for c in cols}
+        if "month" not in cols:
+            exprs["month"] = "substr(date, 1, 7)"
+        where, params = [], []
+        for col, vals in (("player", players), ("action", actions), ("video", videos)):
+            if vals:
+                where.append(f"{col} IN ({', '.join('?' * len(vals))})")
+                params += list(vals)
+        if "month" in cols:
+            bounds = [("month >= ?", date_from and date_from[:7]), ("month <= ?", date_to and date_to[:7])]
+        else:
+            bounds = [("date >= ?", date_from), ("date <= ?", date_to)]
+        for cond, value in bounds:
+            if value:
+                where.append(cond)
+                params.append(value)
+        select = [f"{exprs[g]} AS {g}" for g in group_by]
+        sql = f"SELECT {', '.join(select + ['SUM(attempts)', 'SUM(success)'])} FROM {table}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        if group_by:
+            sql += f" GROUP BY {', '.join(group_by)} ORDER BY {', '.join(group_by)}"
+
+        t0 = time.perf_counter()
+        result = self._con().execute(sql, params).fetchall()
+        rows = []
+        for r in result:
+            n, ok = r[-2] or 0, r[-1] or 0
+            if n:
+                rows.append({**dict(zip(group_by, r)), "attempts": n, "success": ok,
+                             "success_rate": round(ok / n, 4)})
+        n, ok = sum(r["attempts"] for r in rows), sum(r["success"] for r in rows)
+        return {
+            "group_by": group_by, "level": table, "rows": rows,
+            "total": {"attempts": n, "success": ok, "success_rate": round(ok / n, 4) if n else None},
+            "query_ms": round((time.perf_counter() - t0) * 1000, 3),
+        }
+
+    def sources(self):
+        return [dict(zip(("path", "size", "mtime_ns", "events", "synced"), r))
+                for r in self._con().execute("SELECT * FROM sources ORDER BY path")]
@@ -0,0 +1,217 @@
+# backend/app/uploads.py
+"""
+Chunked, resumable uploads for full match videos.
+
+A client opens a session with the file's name and size, then PUTs fixed-size chunks by
+index, in any order, in parallel, and retries only the ones that failed. Each chunk body
+is streamed from the socket into its place in a preallocated .part file, about 1 MB at a
+time, so a 2 GB upload never sits in memory and never occupies one request for its whole
+duration. Session state (which chunks have arrived) is a small JSON file next to the
+.part file, so an interrupted upload can resume after a server restart. Once every chunk
+is in, the .part file is renamed into the video root.
+"""
+import asyncio
+import errno
+import hashlib
+import itertools
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+from pathlib import Path
+
+from .media import VIDEO_EXTS
+
+DEFAULT_UPLOAD_DIR = Path(__file__).resolve().parents[1] / "data" / "uploads"
+WRITE_BUFFER = 1 << 20
+
+
+class UploadError(ValueError):
+    """Rejected upload request; status is the HTTP code to answer with."""
+
+    def __init__(self, detail, status=400):
+        super().__init__(detail)
+        self.status = status
+
+
+def safe_filename(name):
+    """Basename with anything but letters, digits, '-', '_' and '.' replaced."""
+    name = re.sub(r"[^A-Za-z0-9._-]+", "_", Path(name or "").name).strip("._")
+    return name or "upload.mp4"
+
+
+class UploadStore:
+    def __init__(self, root=DEFAULT_UPLOAD_DIR, chunk_size=8 << 20, max_size=20 << 30):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.chunk_size = chunk_size
+        self.max_size = max_size
+        self.locks = {}
+        self.writing = set()  # (upload_id, index) of chunk bodies being streamed
+
+    def _meta(self, upload_id):
+        return self.root / f"{upload_id}.json"
+
+    def _part(self, upload_id):
+        return self.root / f"{upload_id}.part"
+
+    def _save(self, session):
+        session["updated"] = time.time()
+        tmp = self.root / f"{session['id']}.json.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(session, f)
+        os.replace(tmp, self._meta(session["id"]))
+
+    def create(self, filename, size, chunk_size=None):
+        """Open a session and preallocate (sparsely) its .part file."""
+        filename = safe_filename(filename)
+        if Path(filename).suffix.lower() not in VIDEO_EXTS:
+            raise UploadError(f"not a video file ({', '.join(sorted(VIDEO_EXTS))})")
+        if not 0 < size <= self.max_size:
+            raise UploadError(f"size must be between 1 byte and {self.max_size} bytes", 413)
+        chunk_size = min(max(int(chunk_size or self.chunk_size), 1 << 20), 64 << 20)
+        session = {
+            "id": uuid.uuid4().hex, "filename": filename, "size": size, "chunk_size": chunk_size,
+            "chunks": (size + chunk_size - 1) // chunk_size, "received": [], "created": time.time(),
+        }
+        with open(self._part(session["id"]), "wb") as f:
+            f.truncate(size)
+        self._save(session)
+        return session
+
+    def get(self, upload_id):
+        if not re.fullmatch(r"[0-9a-f]{32}", upload_id or ""):
+            return None
+        try:
+            with open(self._meta(upload_id), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    async def write_chunk(self, upload_id, index, stream, sha256=None):
+        """
+        Stream one chunk body (async iterable of bytes) to its offset in the .part file.
+        The chunk only counts as received once its full length (and sha256, if given) checks out.
+        A chunk already received is only checked again, never rewritten, so a bad resend
+        can't corrupt it; one chunk can't be written by two requests at once (409).
+        """
+        session = self.get(upload_id)
+        if session is None:
+            raise UploadError("upload not found", 404)
+        if not 0 <= index < session["chunks"]:
+            raise UploadError(f"chunk index must be in [0, {session['chunks']})")
+        if (upload_id, index) in self.writing:
+            raise UploadError(f"chunk {index} is already being uploaded", 409)
+        offset = index * session["chunk_size"]
+        expected = min(session["chunk_size"], session["size"] - offset)
+        loop = asyncio.get_running_loop()
+        digest = hashlib.sha256() if sha256 else None
+        n = 0
+        self.writing.add((upload_id, index))
+        f = None
+        try:
+            if index not in session["received"]:
+                # Chunks cover disjoint byte ranges, so concurrent chunks each use their own handle
+                f = open(self._part(upload_id), "r+b")
+                f.seek(offset)
+            buf = bytearray()
+            async for piece in stream:
+                n += len(piece)
+                if n > expected:
+                    raise UploadError(f"chunk {index} is larger than {expected} bytes", 413)
+                if digest is not None:
+                    digest.update(piece)
+                if f is None:
+                    continue
+                buf += piece
+                if len(buf) >= WRITE_BUFFER:
+                    data, buf = bytes(buf), bytearray()
+                    await loop.run_in_executor(None, f.write, data)
+            if buf:
+                await loop.run_in_executor(None, f.write, bytes(buf))
+        finally:
+            if f is not None:
+                f.close()
+            self.writing.discard((upload_id, index))
+        if n != expected:
+            raise UploadError(f"chunk {index} has {n} bytes, expected {expected}")
+        if digest is not None and digest.hexdigest() != sha256.lower():
+            raise UploadError(f"chunk {index} failed its sha256 check")
+
+        async with self.locks.setdefault(upload_id, asyncio.Lock()):
+            session = self.get(upload_id)
+            if session is None:
+                raise UploadError("upload was cancelled", 404)
+            if index not in session["received"]:
+                session["received"] = sorted(session["received"] + [index])
+                self._save(session)
+        return session
+
+    def missing(self, session):
+        got = set(session["received"])
+        return [i for i in range(session["chunks"]) if i not in got]
+
+    def finish(self, upload_id, dest_dir):
+        """Move a complete upload to dest_dir (never overwriting a video there) and drop the session."""
+        session = self.get(upload_id)
+        if session is None:
+            raise UploadError("upload not found", 404)
+        missing = self.missing(session)
+        if missing:
+            raise UploadError(f"{len(missing)} chunks missing, first {missing[:10]}", 409)
+        dest_dir = Path(dest_dir)
+        dest_dir.mkdir(parents=True, exist_ok=True)
+        dest = self._claim(dest_dir, session["filename"])
+        tmp = dest_dir / f".{dest.name}.{upload_id}.tmp"
+        try:
+            try:
+                os.replace(self._part(upload_id), dest)
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+                # upload dir on another filesystem: copy next to dest, then rename into place
+                shutil.move(self._part(upload_id), tmp)
+                os.replace(tmp, dest)
+        except BaseException:
+            dest.unlink(missing_ok=True)
+            if self._part(upload_id).exists():
+                tmp.unlink(missing_ok=True)
+            raise
+        self.delete(upload_id)
+        return dest
+
+    @staticmethod
+    def _claim(dest_dir, filename):
+        """Reserve a free name in dest_dir (filename, then stem_1, stem_2, ...) by creating it exclusively."""
+        stem, suffix = Path(filename).stem, Path(filename).suffix
+        for n in itertools.count():
+            dest = dest_dir / (filename if n == 0 else f"{stem}_{n}{suffix}")
+            try:
+                open(dest, "xb").close()
+                return dest
+            except FileExistsError:
+                continue
+
+    def delete(self, upload_id):
+        for p in (self._meta(upload_id), self._part(upload_id)):
+            try:
+                p.unlink()
+            except FileNotFoundError:
+                pass
+        self.locks.pop(upload_id, None)
+
+    def purge(self, max_age_s):
+        """Delete sessions untouched for max_age_s seconds; returns how many."""
+        n = 0
+        for meta in self.root.glob("*.json"):
+            try:
+                with open(meta, encoding="utf-8") as f:
+                    updated = json.load(f).get("updated", 0)
+            except (OSError, ValueError):
+                continue
+            if time.time() - updated > max_age_s:
+                self.delete(meta.stem)
+                n += 1
+        return n
@@ -0,0 +1,71 @@
+"""
+bench_clip_decode.py - Multi-Frame Clip Decode Benchmark
+
+This script compares two ways of pulling T frames out of every clip in a split or
+clips_index.csv: seeking to each frame with CAP_PROP_POS_FRAMES, and the single
+sequential decode used by ClipDataset (read_clip_frames).
+
+Main workflow:
+1. Read clip paths from the given CSV
+2. For each clip, decode T uniformly spaced frames with both approaches
+3. Report sampled frames/s and clips/s for each
+
+Usage:
+    python bench_clip_decode.py --csv data/splits/train.csv --num-frames 16
+"""
+
+import argparse, time
+
+import cv2
+import numpy as np
+
+from tables import read_rows
+from train_baseline_frame import read_clip_frames, sample_indices
+
+def read_clip_frames_seek(path, num_frames, img_size=224):
+    """Reference: one CAP_PROP_POS_FRAMES seek per sampled frame."""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened(): return None
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or 1
+    out = np.zeros((num_frames, img_size, img_size, 3), dtype=np.uint8)
+    for i, idx in enumerate(sample_indices(frame_count, num_frames)):
+        cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
+        ok, frame = cap.read()
+        if not ok: continue
+        frame = cv2.resize(frame, (img_size, img_size), interpolation=cv2.INTER_AREA)
+        out[i] = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    cap.release()
+    return out
+
+def run(fn, paths, num_frames, img_size):
+    t0 = time.perf_counter()
+    for p in paths:
+        fn(p, num_frames, img_size=img_size)
+    return time.perf_counter() - t0
+
+def main():
+    ap = argparse.ArgumentParser(description="Compare seek-based and sequential multi-frame decoding")
+    ap.add_argument("--csv", required=True, help="Split file or clips_index (.csv or .parquet) with a clip_path column")
+    ap.add_argument("--num-frames", type=int, default=16)
+    ap.add_argument("--img-size", type=int, default=224)
+    ap.add_argument("--limit", type=int, default=0, help="Only use the first N clips (0 = all)")
+    args = ap.parse_args()
+
+    paths = [row["clip_path"] for row in read_rows(args.csv)[1]]
+    if args.limit:
+        paths = paths[:args.limit]
+    if not paths:
+        print("No clips found")
+        return
+
+    n_frames = len(paths) * args.num_frames
+    print(f"{len(paths)} clips × {args.num_frames} frames at {args.img_size}px")
+    results = {}
+    for name, fn in (("seek", read_clip_frames_seek), ("sequential", read_clip_frames)):
+        secs = run(fn, paths, args.num_frames, args.img_size)
+        results[name] = secs
+        print(f"  {name:<10}: {n_frames / secs:8.1f} frames/s  {len(paths) / secs:6.1f} clips/s  ({secs:.2f}s)")
+    print(f"Sequential speedup: {results['seek'] / results['sequential']:.2f}x")
+
+if __name__ == "__main__":
+    main()
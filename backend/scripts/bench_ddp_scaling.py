@@ -0,0 +1,112 @@
+"""
+bench_ddp_scaling.py - Data-Parallel Training Scaling Benchmark
+
+This script measures how well DistributedDataParallel training of the baseline ResNet-18
+scales across processes on one host, using the same gloo setup as
+`torchrun train_baseline_frame.py`. Each process trains on synthetic batches (no decoding),
+so the numbers isolate compute + gradient all-reduce from data loading.
+
+Main workflow:
+1. For each process count in --procs, spawn that many ranks with a gloo process group
+2. Each rank gets its share of the cores (--threads-per-proc, default cores / N) and
+   runs --warmup untimed steps, then --steps timed steps at --batch-size per process
+3. Throughput = N x batch x steps / slowest rank's time (weak scaling: per-process batch fixed)
+4. Scaling efficiency = throughput(N) / (N x throughput(1)); 100% is perfect linear scaling
+
+Usage:
+    python bench_ddp_scaling.py
+    python bench_ddp_scaling.py --procs 1,2,4,8 --batch-size 32 --img-size 224 --out data/ddp_scaling.json
+"""
+
+import argparse, json, os, socket, time
+
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+import torch.nn as nn
+from torch.nn.parallel import DistributedDataParallel
+from torchvision import models
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def worker(rank, world, port, args, threads, results):
+    os.environ.update(MASTER_ADDR="127.0.0.1", MASTER_PORT=str(port))
+    dist.init_process_group(args.backend, rank=rank, world_size=world)
+    torch.set_num_threads(threads)
+    torch.manual_seed(rank)
+
+    model = models.resnet18(weights=None, num_classes=args.num_classes)
+    net = DistributedDataParallel(model) if world > 1 else model
+    opt = torch.optim.AdamW(net.parameters(), lr=1e-3)
+    loss_fn = nn.CrossEntropyLoss()
+    x = torch.randn(args.batch_size, 3, args.img_size, args.img_size)
+    y = torch.randint(0, args.num_classes, (args.batch_size,))
+
+    def step():
+        opt.zero_grad()
+        loss_fn(net(x), y).backward()
+        opt.step()
+
+    for _ in range(args.warmup):
+        step()
+    dist.barrier()
+    t0 = time.perf_counter()
+    for _ in range(args.steps):
+        step()
+    secs = torch.tensor(time.perf_counter() - t0)
+    dist.all_reduce(secs, op=dist.ReduceOp.MAX)
+    if rank == 0:
+        results.put(float(secs))
+    dist.destroy_process_group()
+
+def run(world, args):
+    """Seconds for --steps steps with `world` processes (slowest rank)."""
+    threads = args.threads_per_proc or max(1, (os.cpu_count() or 1) // world)
+    results = mp.get_context("spawn").SimpleQueue()
+    mp.spawn(worker, args=(world, free_port(), args, threads, results), nprocs=world, join=True)
+    return results.get(), threads
+
+def main():
+    ap = argparse.ArgumentParser(description="DDP (gloo) scaling efficiency for the ResNet-18 baseline")
+    ap.add_argument("--procs", default="1,2,4,8", help="Comma-separated process counts")
+    ap.add_argument("--steps", type=int, default=20, help="Timed steps per run")
+    ap.add_argument("--warmup", type=int, default=3, help="Untimed steps per run")
+    ap.add_argument("--batch-size", type=int, default=16, help="Batch size per process")
+    ap.add_argument("--img-size", type=int, default=224)
+    ap.add_argument("--num-classes", type=int, default=5)
+    ap.add_argument("--threads-per-proc", type=int, default=0, help="Intra-op threads per process (default cores / N)")
+    ap.add_argument("--backend", default="gloo")
+    ap.add_argument("--out", default="", help="Optional JSON report path")
+    args = ap.parse_args()
+
+    procs = [int(p) for p in args.procs.split(",")]
+    cpus = os.cpu_count() or 1
+    print(f"{cpus} cores | batch {args.batch_size}/process | {args.img_size}px | {args.steps} steps")
+    if max(procs) > cpus:
+        print(f"⚠️  More processes than cores ({max(procs)} > {cpus}); those runs are oversubscribed")
+
+    rows, base = [], None
+    print(f"{'procs':>5} {'threads':>7} {'img/s':>9} {'speedup':>8} {'efficiency':>10}")
+    for n in procs:
+        secs, threads = run(n, args)
+        rate = n * args.batch_size * args.steps / secs
+        if base is None:
+            # efficiency is relative to the first (normally single-process) run
+            base = rate / procs[0]
+        speedup = rate / (base * procs[0])
+        eff = rate / (base * n)
+        rows.append({"procs": n, "threads_per_proc": threads, "images_per_sec": round(rate, 2),
+                     "speedup": round(speedup, 3), "efficiency": round(eff, 3)})
+        print(f"{n:>5} {threads:>7} {rate:>9.1f} {speedup:>7.2f}x {eff:>9.0%}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"cores": cpus, "backend": args.backend, "batch_size_per_proc": args.batch_size,
+                       "img_size": args.img_size, "steps": args.steps, "runs": rows}, f, indent=2)
+        print(f"Report → {args.out}")
+
+if __name__ == "__main__":
+    main()
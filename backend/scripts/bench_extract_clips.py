@@ -0,0 +1,86 @@
+"""
+bench_extract_clips.py - Per-Event vs Grouped Clip Extraction Benchmark
+
+This script runs extract_clips.py twice on the same manifest, once with the default
+per-event path (one seek + decode per tag) and once with --grouped (one decode per
+span of overlapping windows), and compares wall time and bytes read.
+
+Main workflow:
+1. Run extract_clips.py per-event into a fresh temp directory
+2. Run extract_clips.py --grouped into another fresh temp directory
+3. Measure wall time and bytes read by each run (including its ffmpeg children)
+4. Print a side-by-side summary
+
+Bytes read come from rchar in /proc/self/io, which on Linux also counts reaped
+child processes; on other platforms the column shows "n/a".
+
+Usage:
+    python bench_extract_clips.py --manifest manifest.csv --video-root videos
+    python bench_extract_clips.py --manifest manifest.csv --video-root videos --jobs 4 --merge-gap 5
+"""
+
+import argparse, subprocess, sys, tempfile, time
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+
+def read_bytes_so_far():
+    """Bytes read by this process and its reaped children, or None if unavailable."""
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                if line.startswith("rchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+def run_extract(extra, args, out_dir):
+    cmd = [
+        sys.executable, str(HERE / "extract_clips.py"),
+        "--manifest", args.manifest,
+        "--video-root", args.video_root,
+        "--out-dir", str(out_dir),
+        "--jobs", str(args.jobs),
+    ]
+    if args.limit:
+        cmd += ["--limit", str(args.limit)]
+    cmd += extra
+    b0 = read_bytes_so_far()
+    t0 = time.perf_counter()
+    subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL)
+    wall = time.perf_counter() - t0
+    b1 = read_bytes_so_far()
+    n_clips = len(list(out_dir.glob("*.mp4")))
+    return wall, (b1 - b0) if b0 is not None and b1 is not None else None, n_clips
+
+def main():
+    ap = argparse.ArgumentParser(description="Compare per-event and grouped clip extraction")
+    ap.add_argument("--manifest", required=True, help="Path to manifest.csv")
+    ap.add_argument("--video-root", required=True, help="Directory containing source videos")
+    ap.add_argument("--jobs", type=int, default=1, help="--jobs passed to both runs")
+    ap.add_argument("--limit", type=int, default=0, help="--limit passed to both runs (0 = no limit)")
+    ap.add_argument("--merge-gap", type=float, default=0.0, help="--merge-gap for the grouped run")
+    args = ap.parse_args()
+
+    modes = [
+        ("per-event", []),
+        ("grouped", ["--grouped", "--merge-gap", str(args.merge_gap)]),
+    ]
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, extra in modes:
+            out_dir = Path(tmp) / name
+            results.append((name,) + run_extract(extra, args, out_dir))
+
+    print(f"{'mode':<10} {'wall s':>8} {'clips':>6} {'clips/s':>8} {'MB read':>9}")
+    for name, wall, nbytes, n_clips in results:
+        mb = f"{nbytes / 1e6:.1f}" if nbytes is not None else "n/a"
+        print(f"{name:<10} {wall:>8.2f} {n_clips:>6} {n_clips / wall if wall else 0.0:>8.2f} {mb:>9}")
+    (_, w0, b0, _), (_, w1, b1, _) = results
+    speedup = f"{w0 / w1:.2f}x" if w1 else "n/a"
+    ratio = f"{b1 / b0:.2f}" if b0 and b1 is not None else "n/a"
+    print(f"Grouped speedup: {speedup}, bytes read ratio (grouped/per-event): {ratio}")
+
+if __name__ == "__main__":
+    main()
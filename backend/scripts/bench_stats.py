@@ -0,0 +1,178 @@
+"""
+bench_stats.py - Per-Player Stats Store Benchmark (ingest + dashboard query latency)
+
+This script generates a synthetic manifest with --events tagged actions over a few
+seasons of matches, loads it into app.stats.StatsStore (SQLite with materialized
+player x action x video x date aggregates) and times the dashboard queries the API
+serves at GET /stats, against the budget (--budget-ms, default 10 ms at p95).
+
+Main workflow:
+1. Build --events manifest rows (video ids carry the match date, like 2024-09-14_m0001)
+2. Time the initial sync, a no-op sync (file unchanged → skipped) and an incremental
+   sync after appending new matches, re-tagging outcomes and deleting a few events
+3. Check every aggregate level against a GROUP BY over the raw events table
+4. Time each dashboard query --repeats times (p50/p95/max), plus the same team table
+   computed from the raw events for comparison
+5. Print the table, optionally write --out JSON; exit 1 if any p95 is over budget
+
+Usage:
+    python bench_stats.py --events 1000000
+    python bench_stats.py --events 200000 --repeats 50 --out stats_bench.json
+"""
+
+import argparse, csv, json, random, sys, tempfile, time
+from datetime import date, timedelta
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))  # backend/, for app.stats
+from app.stats import LEVELS, StatsStore
+
+FIELDS = ["event_id", "video_id", "video_filename", "t_event_sec", "action", "player", "outcome"]
+ACTIONS = ["serve", "pass", "set", "spike", "block"]
+SUCCESS = {"serve": 0.85, "pass": 0.7, "set": 0.8, "spike": 0.45, "block": 0.3}
+
+def percentile(values, q):
+    values = sorted(values)
+    if not values: return 0.0
+    k = min(len(values) - 1, max(0, int(round(q / 100 * (len(values) - 1)))))
+    return values[k]
+
+def synth_matches(n_events, per_match, players, seed=0, start=0):
+    """Rows for matches numbered from `start`, two per week from Sep 2022, 12 of the players in each."""
+    rng = random.Random(seed + start)
+    rows, m = [], start
+    first = date(2022, 9, 3)
+    while len(rows) < n_events:
+        day = first + timedelta(days=(m // 2) * 7 + (m % 2) * 3)
+        vid = f"{day.isoformat()}_m{m:05d}"
+        roster = rng.sample(players, 12)
+        for t in sorted(rng.uniform(0, 5400) for _ in range(min(per_match, n_events - len(rows)))):
+            action = rng.choice(ACTIONS)
+            rows.append({"video_id": vid, "video_filename": f"{vid}.mp4", "t_event_sec": f"{t:.3f}",
+                         "action": action, "player": rng.choice(roster),
+                         "outcome": int(rng.random() < SUCCESS[action])})
+        m += 1
+    return rows, m
+
+def write_manifest(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=FIELDS)
+        w.writeheader()
+        for i, r in enumerate(rows, 1):
+            w.writerow({"event_id": i, **r})
+
+def check_levels(store):
+    """Every aggregate level must equal a GROUP BY over the stored events."""
+    con = store._con()
+    exprs = {"player": "player", "action": "action", "video": "video", "date": "date", "month": "substr(date, 1, 7)"}
+    for table, cols in LEVELS:
+        keys = ", ".join(exprs[c] for c in cols)
+        want = set(con.execute(f"SELECT {keys}, COUNT(*), SUM(outcome) FROM events GROUP BY {keys}"))
+        got = set(con.execute(f"SELECT {', '.join(cols)}, attempts, success FROM {table}"))
+        if want != got:
+            raise SystemExit(f"❌ {table} disagrees with the events table ({len(want ^ got)} rows differ)")
+
+def time_query(fn, repeats):
+    fn()  # warm the page cache
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return {"p50_ms": round(percentile(times, 50), 3), "p95_ms": round(percentile(times, 95), 3),
+            "max_ms": round(max(times), 3)}
+
+def main():
+    ap = argparse.ArgumentParser(description="Stats store ingest and query latency benchmark")
+    ap.add_argument("--events", type=int, default=1_000_000)
+    ap.add_argument("--per-match", type=int, default=600, help="Tagged actions per match")
+    ap.add_argument("--players", type=int, default=24)
+    ap.add_argument("--repeats", type=int, default=100)
+    ap.add_argument("--budget-ms", type=float, default=10.0, help="p95 limit per dashboard query")
+    ap.add_argument("--work-dir", default="", help="Keep manifest + stats.db here (default: temp dir)")
+    ap.add_argument("--out", default="", help="Write results JSON here")
+    args = ap.parse_args()
+
+    work = Path(args.work_dir or tempfile.mkdtemp(prefix="stats_bench_"))
+    work.mkdir(parents=True, exist_ok=True)
+    manifest, db = work / "manifest.csv", work / "stats.db"
+    db.unlink(missing_ok=True)
+    players = [f"Player_{i:02d}" for i in range(args.players)]
+
+    rows, n_matches = synth_matches(args.events, args.per_match, players)
+    write_manifest(manifest, rows)
+    print(f"Manifest: {len(rows):,} events, {n_matches} matches, {args.players} players → {manifest}")
+
+    store = StatsStore(db)
+    results = {"events": len(rows), "matches": n_matches, "sync": {}, "queries": {}}
+    r = store.sync(manifest)
+    results["sync"]["initial_s"] = r["seconds"]
+    t0 = time.perf_counter()
+    r = store.sync(manifest)
+    results["sync"]["unchanged_s"] = round(time.perf_counter() - t0, 3)
+    assert r["skipped"]
+
+    # a new round of matches, some corrected outcomes, some deleted tags
+    rng = random.Random(1)
+    new_rows, n_matches = synth_matches(max(args.per_match, len(rows) // 100), args.per_match, players, start=n_matches)
+    for i in rng.sample(range(len(rows)), min(100, len(rows))):
+        rows[i]["outcome"] = 1 - rows[i]["outcome"]
+    for i in sorted(rng.sample(range(len(rows)), min(100, len(rows))), reverse=True):
+        del rows[i]
+    rows += new_rows
+    write_manifest(manifest, rows)
+    r = store.sync(manifest)
+    results["sync"]["incremental_s"] = r["seconds"]
+    results["sync"]["incremental"] = {k: r[k] for k in ("added", "removed", "changed")}
+    check_levels(store)
+    print(f"Sync: initial {results['sync']['initial_s']}s, unchanged {results['sync']['unchanged_s']}s, "
+          f"incremental {results['sync']['incremental_s']}s {results['sync']['incremental']}")
+    print("✅ Aggregates match a GROUP BY over the raw events")
+
+    last = store.query(group_by=["date"])["rows"][-1]["date"]
+    month_ago = (date.fromisoformat(last) - timedelta(days=30)).isoformat()
+    season = ("2023-09-01", "2024-06-30")
+    one_video = store.query(players=[players[0]], group_by=["video"])["rows"][0]["video"]
+    queries = {
+        "team_table":      dict(group_by=["player", "action"]),
+        "player_card":     dict(players=[players[0]], group_by=["action"]),
+        "player_trend":    dict(players=[players[0]], group_by=["month", "action"]),
+        "season_by_player": dict(date_from=season[0], date_to=season[1], group_by=["player"]),
+        "last_month_daily": dict(actions=["spike"], date_from=month_ago, group_by=["date"]),
+        "match_report":    dict(videos=[one_video], group_by=["player", "action"]),
+        "player_matches":  dict(players=[players[1]], actions=["serve"], group_by=["video"]),
+        "overall_total":   dict(group_by=[]),
+    }
+    print(f"\n{'query':<18} {'level':<10} {'rows':>6} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}")
+    over = []
+    for name, kw in queries.items():
+        res = time_query(lambda: store.query(**kw), args.repeats)
+        out = store.query(**kw)
+        res.update(level=out["level"], rows=len(out["rows"]))
+        results["queries"][name] = res
+        flag = "" if res["p95_ms"] <= args.budget_ms else "  ⚠️ over budget"
+        if flag: over.append(name)
+        print(f"{name:<18} {res['level']:<10} {res['rows']:>6} {res['p50_ms']:>9.3f} {res['p95_ms']:>9.3f} {res['max_ms']:>9.3f}{flag}")
+
+    # what a dashboard load costs without the aggregates
+    con = store._con()
+    raw = time_query(lambda: con.execute(
+        "SELECT player, action, COUNT(*), SUM(outcome) FROM events GROUP BY player, action").fetchall(),
+        max(3, args.repeats // 20))
+    results["queries"]["team_table_raw_events"] = raw
+    print(f"{'(raw events scan)':<18} {'events':<10} {'':>6} {raw['p50_ms']:>9.3f} {raw['p95_ms']:>9.3f} {raw['max_ms']:>9.3f}")
+    results["db_mb"] = round(db.stat().st_size / 1e6, 1)
+    print(f"\nstats.db: {results['db_mb']} MB")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Results → {args.out}")
+    if over:
+        print(f"❌ p95 over {args.budget_ms} ms: {', '.join(over)}")
+        sys.exit(1)
+    print(f"✅ All dashboard queries within {args.budget_ms} ms at p95")
+
+if __name__ == "__main__":
+    main()
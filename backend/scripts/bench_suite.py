@@ -0,0 +1,303 @@
+"""
+bench_suite.py - Reproducible Synthetic Benchmark Suite for the Pipeline Stages
+
+This script generates synthetic match videos and raw tag exports offline (seeded, so
+every machine gets the same data), times each pipeline stage on them at several sizes,
+and writes the results to a machine-readable JSON file. Given a baseline file from an
+earlier run, it flags every metric that got slower by more than --threshold.
+
+Benchmarks (all throughput, higher is better; best of --repeats):
+- transform  transform_csv() on the raw export                      rows/s
+- extract    cut_clip_ffmpeg() on events from the manifest          clips/s
+- decode     FrameDataset over the extracted clips (no frame cache) samples/s
+- train      train_one_epoch() on synthetic batches (ResNet-18)     images/s
+- infer      FrameSampler + FrameClassifier.predict over a video    frames/s
+
+Main workflow:
+1. For each --sizes preset, generate (once, cached under --data-dir) the videos with
+   cv2.VideoWriter (court, moving players and ball) and a raw export in the tagging
+   app's column format
+2. Run the selected benchmarks; generation is never timed
+3. Write {"env": ..., "results": {"<size>/<bench>": {"value", "unit", ...}}} to --out
+4. With --baseline, compare and exit 1 on regressions; --save-baseline writes the
+   current results as the new baseline instead
+
+Usage:
+    python bench_suite.py --sizes small --save-baseline --baseline bench_baseline.json
+    python bench_suite.py --sizes small,medium --baseline bench_baseline.json --threshold 0.10
+    python bench_suite.py --sizes large --only extract,decode --repeats 1
+"""
+
+import argparse, contextlib, io, json, os, platform, random, sys, tempfile, time
+from pathlib import Path
+
+import cv2
+import numpy as np
+import torch
+import torch.nn as nn
+from torchvision import models
+
+from extract_clips import build_out_name, clip_window, cut_clip_ffmpeg
+from tables import read_rows, write_rows
+from train_baseline_frame import FrameDataset, train_one_epoch
+from transform_csv import transform_csv
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))  # backend/, for app.inference
+from app.inference import FrameClassifier, FrameSampler
+
+# Bump when the generators change so cached data is rebuilt
+DATA_VERSION = 1
+SIZES = {
+    "small":  {"videos": 2, "seconds": 30,  "width": 320,  "height": 180, "rows": 2_000,
+               "clips": 12,  "train_steps": 8,  "batch": 16, "img_size": 112},
+    "medium": {"videos": 3, "seconds": 120, "width": 640,  "height": 360, "rows": 50_000,
+               "clips": 40,  "train_steps": 15, "batch": 32, "img_size": 224},
+    "large":  {"videos": 4, "seconds": 600, "width": 1280, "height": 720, "rows": 500_000,
+               "clips": 120, "train_steps": 30, "batch": 32, "img_size": 224},
+}
+BENCHES = ["transform", "extract", "decode", "train", "infer"]
+RAW_ACTIONS = ["serve", "hit", "attack", "assist", "receive", "block", "dig"]
+RAW_OUTCOMES = ["success", "fail", "successful", "failure"]
+
+def synth_video(path, seconds, width, height, fps=30, seed=0):
+    """A court with six players doing random walks and a ball on bouncing arcs."""
+    rng = np.random.default_rng(seed)
+    court = np.zeros((height, width, 3), dtype=np.uint8)
+    court[:] = (60, 140, 70)
+    cv2.rectangle(court, (width // 10, height // 6), (9 * width // 10, 5 * height // 6), (230, 230, 230), 2)
+    cv2.line(court, (width // 2, height // 8), (width // 2, 7 * height // 8), (250, 250, 250), 3)
+    noise = rng.integers(0, 12, size=(16, height, width, 3), dtype=np.uint8)
+    players = rng.uniform((0.15 * width, 0.2 * height), (0.85 * width, 0.8 * height), size=(6, 2))
+    colors = [(200, 40, 40)] * 3 + [(40, 40, 200)] * 3
+    pw, ph = max(2, width // 40), max(4, height // 9)
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    for i in range(int(seconds * fps)):
+        frame = cv2.add(court, noise[i % len(noise)])
+        players += rng.normal(0, width / 400, size=players.shape)
+        players = np.clip(players, (0.1 * width, 0.15 * height), (0.9 * width, 0.85 * height))
+        for (x, y), c in zip(players.astype(int), colors):
+            cv2.rectangle(frame, (x - pw, y - ph), (x + pw, y + ph), c, -1)
+        phase = (i % (2 * fps)) / (2 * fps)
+        bx = int(width * (0.15 + 0.7 * abs(2 * ((i / (4 * fps)) % 1) - 1)))
+        by = int(height * (0.8 - 0.6 * 4 * phase * (1 - phase)))
+        cv2.circle(frame, (bx, by), max(2, width // 80), (0, 220, 255), -1)
+        writer.write(frame)
+    writer.release()
+
+def synth_export(path, n_rows, videos, seconds, seed=0):
+    """Raw export in the tagging app's format; half the rows carry Time (mm:ss.ms) instead of Timestamp."""
+    rng = random.Random(seed)
+    players = [f"Player {i}" for i in range(12)]
+    rows = []
+    for i in range(n_rows):
+        t = rng.uniform(0.5, seconds - 0.5)
+        stamp, clock = (f"{t:.2f}", "") if i % 2 else ("", f"{int(t // 60)}:{t % 60:06.3f}")
+        rows.append({"Event ID": i, "Timestamp": stamp, "Time": clock,
+                     "Event Type": rng.choice(RAW_ACTIONS), "Player": rng.choice(players),
+                     "Outcome": rng.choice(RAW_OUTCOMES), "Video ID": f"video_{rng.choice(videos)}_{i % 7}"})
+    write_rows(path, rows, list(rows[0]))
+
+def ensure_data(root, size, seed):
+    """Generate (or reuse) the videos and raw export for a size preset."""
+    cfg = SIZES[size]
+    d = Path(root) / size
+    stamp = {"version": DATA_VERSION, "seed": seed, **cfg}
+    try:
+        with open(d / "data.json", encoding="utf-8") as f:
+            if json.load(f) == stamp:
+                return d
+    except (OSError, ValueError):
+        pass
+    (d / "videos").mkdir(parents=True, exist_ok=True)
+    t0 = time.perf_counter()
+    names = [f"match{i}.mp4" for i in range(cfg["videos"])]
+    for i, name in enumerate(names):
+        synth_video(d / "videos" / name, cfg["seconds"], cfg["width"], cfg["height"], seed=seed + i)
+    synth_export(d / "raw_export.csv", cfg["rows"], names, cfg["seconds"], seed=seed)
+    with open(d / "data.json", "w", encoding="utf-8") as f:
+        json.dump(stamp, f)
+    print(f"Generated {size} data in {time.perf_counter() - t0:.1f}s → {d}")
+    return d
+
+def best_of(fn, repeats):
+    """Run fn() repeats times; fn returns (items, seconds). Best rate wins."""
+    best = None
+    for _ in range(repeats):
+        items, secs = fn()
+        if best is None or items / secs > best[0] / best[1]:
+            best = (items, secs)
+    return best
+
+def bench_transform(d, cfg, tmp):
+    out = tmp / "manifest.csv"
+    def run():
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            transform_csv([d / "raw_export.csv"], out, jobs=1)
+        return cfg["rows"], time.perf_counter() - t0
+    return run
+
+def bench_extract(d, cfg, tmp, seed):
+    manifest = tmp / "manifest.csv"
+    if not manifest.exists():
+        with contextlib.redirect_stdout(io.StringIO()):
+            transform_csv([d / "raw_export.csv"], manifest, jobs=1)
+    rows = read_rows(manifest)[1]
+    picks = random.Random(seed).sample(rows, min(cfg["clips"], len(rows)))
+    out_dir = tmp / "clips"; out_dir.mkdir(exist_ok=True)
+    jobs = []
+    for r in picks:
+        t = float(r["t_event_sec"])
+        start, dur = clip_window(t, 1.0, 2.0)
+        dst = out_dir / build_out_name(r["event_id"], r["player"], r["action"], r["outcome"], r["video_filename"], t)
+        jobs.append((d / "videos" / r["video_filename"], dst, start, dur, r))
+    def run():
+        t0 = time.perf_counter()
+        ok = sum(cut_clip_ffmpeg(src, dst, start, dur, overwrite=True) == 0 for src, dst, start, dur, _ in jobs)
+        secs = time.perf_counter() - t0
+        write_rows(tmp / "clips_index.csv", [{"clip_path": str(dst), "action": r["action"]}
+                                            for _, dst, _, _, r in jobs if dst.exists()], ["clip_path", "action"])
+        return ok, secs
+    return run
+
+def bench_decode(d, cfg, tmp):
+    index = tmp / "clips_index.csv"
+    if not index.exists():
+        bench_extract(d, cfg, tmp, 0)()
+    actions = sorted({r["action"] for r in read_rows(index)[1]})
+    ds = FrameDataset(index, {a: i for i, a in enumerate(actions)}, img_size=cfg["img_size"])
+    def run():
+        t0 = time.perf_counter()
+        for i in range(len(ds)):
+            ds[i]
+        return len(ds), time.perf_counter() - t0
+    return run
+
+def bench_train(d, cfg, tmp):
+    torch.manual_seed(0)
+    model = models.resnet18(weights=None, num_classes=5)
+    opt = torch.optim.AdamW(model.parameters(), lr=1e-3)
+    loss_fn = nn.CrossEntropyLoss()
+    s, b = cfg["img_size"], cfg["batch"]
+    batches = [(torch.randn(b, 3, s, s), torch.randint(0, 5, (b,))) for _ in range(cfg["train_steps"])]
+    train_one_epoch(model, batches[:2], opt, loss_fn, torch.device("cpu"))  # warm-up
+    def run():
+        t0 = time.perf_counter()
+        train_one_epoch(model, batches, opt, loss_fn, torch.device("cpu"))
+        return b * len(batches), time.perf_counter() - t0
+    return run
+
+def bench_infer(d, cfg, tmp):
+    ckpt = tmp / "bench_resnet18.pt"
+    model = models.resnet18(weights=None)
+    model.fc = nn.Linear(model.fc.in_features, 5)
+    torch.save({"model": model.state_dict(), "img_size": cfg["img_size"],
+                "class_to_idx": {a: i for i, a in enumerate(["block", "pass", "serve", "set", "spike"])}}, ckpt)
+    clf = FrameClassifier(ckpt, batch_size=32, device="cpu")
+    clf.warmup()
+    video = d / "videos" / "match0.mp4"
+    def run():
+        t0 = time.perf_counter()
+        sampler, n = FrameSampler(video, every_sec=0.5, img_size=clf.img_size), 0
+        while True:
+            frames, _, _ = sampler.read(clf.batch_size)
+            if not len(frames): break
+            clf.predict(frames)
+            n += len(frames)
+        sampler.close()
+        return n, time.perf_counter() - t0
+    return run
+
+UNITS = {"transform": "rows/s", "extract": "clips/s", "decode": "samples/s", "train": "images/s", "infer": "frames/s"}
+
+def compare(results, baseline, threshold):
+    """Print current vs baseline per metric; returns the keys that regressed by more than threshold."""
+    regressions = []
+    print(f"\n{'metric':<18} {'baseline':>12} {'current':>12} {'change':>8}")
+    for key, cur in results.items():
+        base = baseline.get("results", {}).get(key)
+        if base is None:
+            print(f"{key:<18} {'-':>12} {cur['value']:>12.2f} {'new':>8}")
+            continue
+        change = cur["value"] / base["value"] - 1 if base["value"] else 0.0
+        flag = ""
+        if change < -threshold:
+            regressions.append(key)
+            flag = "  ❌ regression"
+        print(f"{key:<18} {base['value']:>12.2f} {cur['value']:>12.2f} {change:>+8.1%}{flag}")
+    return regressions
+
+def main():
+    ap = argparse.ArgumentParser(description="Synthetic, reproducible benchmarks for every pipeline stage")
+    ap.add_argument("--sizes", default="small", help=f"Comma-separated presets: {', '.join(SIZES)}")
+    ap.add_argument("--only", default=",".join(BENCHES), help="Comma-separated benchmarks to run")
+    ap.add_argument("--repeats", type=int, default=3, help="Runs per benchmark; the best one counts")
+    ap.add_argument("--data-dir", default=str(Path(tempfile.gettempdir()) / "astro_bench_data"),
+                    help="Where generated videos/exports are cached between runs")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--threads", type=int, default=0, help="torch intra-op threads (default: torch's choice)")
+    ap.add_argument("--out", default="bench_results.json", help="Results JSON")
+    ap.add_argument("--baseline", default="", help="Baseline JSON to compare against (or to write with --save-baseline)")
+    ap.add_argument("--save-baseline", action="store_true", help="Write this run's results to --baseline")
+    ap.add_argument("--threshold", type=float, default=0.10, help="Flag metrics more than this fraction slower (default 0.10)")
+    args = ap.parse_args()
+
+    sizes = args.sizes.split(",")
+    only = args.only.split(",")
+    unknown = [s for s in sizes if s not in SIZES] + [b for b in only if b not in BENCHES]
+    if unknown:
+        ap.error(f"unknown size/benchmark: {', '.join(unknown)}")
+    if args.save_baseline and not args.baseline:
+        ap.error("--save-baseline needs --baseline")
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    random.seed(args.seed); np.random.seed(args.seed); torch.manual_seed(args.seed)
+
+    results = {}
+    for size in sizes:
+        cfg = SIZES[size]
+        d = ensure_data(args.data_dir, size, args.seed)
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            for name in only:
+                make = {"transform": lambda: bench_transform(d, cfg, tmp),
+                        "extract": lambda: bench_extract(d, cfg, tmp, args.seed),
+                        "decode": lambda: bench_decode(d, cfg, tmp),
+                        "train": lambda: bench_train(d, cfg, tmp),
+                        "infer": lambda: bench_infer(d, cfg, tmp)}[name]
+                items, secs = best_of(make(), args.repeats)
+                key = f"{size}/{name}"
+                results[key] = {"value": round(items / secs, 3), "unit": UNITS[name], "items": items,
+                                "seconds": round(secs, 4)}
+                print(f"{key:<18} {items / secs:>12.2f} {UNITS[name]:<10} ({items} in {secs:.2f}s)")
+
+    report = {
+        "env": {"python": platform.python_version(), "torch": torch.__version__, "opencv": cv2.__version__,
+                "cpus": os.cpu_count(), "threads": torch.get_num_threads(), "machine": platform.machine(),
+                "system": platform.system()},
+        "config": {"repeats": args.repeats, "seed": args.seed, "data_version": DATA_VERSION,
+                   "sizes": {s: SIZES[s] for s in sizes}},
+        "results": results,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results → {args.out}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Baseline saved → {args.baseline}")
+    elif args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("env", {}).get("cpus") != report["env"]["cpus"]:
+            print("⚠️  Baseline was recorded on a machine with a different core count; compare with care")
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print(f"✅ No regressions beyond {args.threshold:.0%}")
+
+if __name__ == "__main__":
+    main()
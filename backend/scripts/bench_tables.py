@@ -0,0 +1,86 @@
+"""
+bench_tables.py - CSV vs Parquet Load-Time Benchmark
+
+This script generates a synthetic clips_index-style table (clip_path, video_filename,
+t_event_sec, action, outcome, player, event_id) with --rows rows, writes it as CSV
+and as Parquet through tables.py, and times how long each takes to load.
+
+Main workflow:
+1. Build --rows synthetic rows (few actions/players/videos, like a real index)
+2. Write clips_index.csv and clips_index.parquet into a temp dir (or --out-dir)
+3. Time, best of --repeats:
+   - csv.DictReader     (what the scripts did before)
+   - read_rows(parquet) (row dicts, drop-in for DictReader)
+   - read_columns(parquet, [action, t_event_sec]) (columnar, no per-row objects)
+4. Print load times, speedups and file sizes
+
+Usage:
+    python bench_tables.py --rows 200000
+
+Requires pyarrow (pip install pyarrow).
+"""
+
+import argparse, csv, random, tempfile, time
+from pathlib import Path
+
+from tables import read_columns, read_rows, write_rows
+
+FIELDS = ["clip_path", "video_filename", "t_event_sec", "action", "outcome", "player", "event_id"]
+ACTIONS = ["serve", "pass", "set", "spike", "block"]
+
+def synth_rows(n, seed=0):
+    rng = random.Random(seed)
+    players = [f"Player_{i}" for i in range(24)]
+    videos = [f"game{i}.mp4" for i in range(60)]
+    rows = []
+    for i in range(n):
+        video, action = rng.choice(videos), rng.choice(ACTIONS)
+        t = rng.uniform(0, 5400)
+        outcome = rng.choice("01")
+        player = rng.choice(players)
+        rows.append({
+            "clip_path": f"data/clips/{Path(video).stem}_{action}_{player}_{int(t * 1000)}_{i}.mp4",
+            "video_filename": video, "t_event_sec": f"{t:.3f}", "action": action,
+            "outcome": outcome, "player": player, "event_id": str(i + 1),
+        })
+    return rows
+
+def best_of(fn, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+def main():
+    ap = argparse.ArgumentParser(description="CSV vs Parquet load times for pipeline tables")
+    ap.add_argument("--rows", type=int, default=200_000)
+    ap.add_argument("--repeats", type=int, default=3)
+    ap.add_argument("--out-dir", default="", help="Keep the generated files here (default: temp dir)")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        out = Path(args.out_dir or tmp); out.mkdir(parents=True, exist_ok=True)
+        rows = synth_rows(args.rows)
+        csv_path = write_rows(out / "clips_index.csv", rows, FIELDS)
+        pq_path = write_rows(out / "clips_index.parquet", rows, FIELDS)
+        del rows
+
+        def load_csv():
+            with open(csv_path, newline="", encoding="utf-8") as f:
+                return list(csv.DictReader(f))
+
+        results = [
+            ("csv.DictReader", best_of(load_csv, args.repeats)),
+            ("read_rows(parquet)", best_of(lambda: read_rows(pq_path), args.repeats)),
+            ("read_columns(parquet)", best_of(lambda: read_columns(pq_path, ["action", "t_event_sec"]), args.repeats)),
+        ]
+        base = results[0][1]
+        print(f"{args.rows} rows, best of {args.repeats}")
+        for name, secs in results:
+            print(f"  {name:<22} {secs * 1000:>9.1f} ms  {base / secs:>6.1f}x")
+        print(f"  size: csv {csv_path.stat().st_size / 1e6:.1f} MB | parquet {pq_path.stat().st_size / 1e6:.1f} MB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+bench_train_step.py - Training Step-Time Benchmark
+
+This script measures ResNet-18 training step time on synthetic in-memory batches,
+comparing a loop that reads loss/accuracy back to the host every step (.item() per
+batch, the old train_one_epoch) against train_one_epoch, which accumulates metrics on
+the device and synchronizes once per epoch.
+
+Main workflow:
+1. Build random batches once (pinned when running on CUDA)
+2. Warm up, then time N steps of each loop
+3. Report ms/step and images/s for both
+
+Usage:
+    python bench_train_step.py --steps 50 --batch-size 32
+    python bench_train_step.py --device cuda --amp --channels-last
+"""
+
+import argparse, time
+
+import torch
+import torch.nn as nn
+from torchvision import models
+
+from train_baseline_frame import amp_setup, train_one_epoch
+
+def train_steps_synced(model, batches, opt, loss_fn, device, amp_dtype=None, scaler=None, channels_last=False):
+    """Reference loop with a host sync per step (loss.item(), (pred == y).sum().item())."""
+    model.train()
+    total, correct, loss_sum = 0, 0, 0.0
+    for x, y in batches:
+        x, y = x.to(device), y.to(device)
+        if channels_last:
+            x = x.contiguous(memory_format=torch.channels_last)
+        opt.zero_grad()
+        with torch.autocast(device.type, dtype=amp_dtype, enabled=amp_dtype is not None):
+            logits = model(x)
+            loss = loss_fn(logits, y)
+        if scaler is not None:
+            scaler.scale(loss).backward(); scaler.step(opt); scaler.update()
+        else:
+            loss.backward(); opt.step()
+        loss_sum += loss.item() * x.size(0)
+        correct += (logits.argmax(1) == y).sum().item()
+        total += x.size(0)
+    return loss_sum/total, correct/total
+
+def timed(fn, device):
+    if device.type == "cuda": torch.cuda.synchronize()
+    t0 = time.perf_counter()
+    fn()
+    if device.type == "cuda": torch.cuda.synchronize()
+    return time.perf_counter() - t0
+
+def main():
+    ap = argparse.ArgumentParser(description="Compare per-step host syncs with on-device metric accumulation")
+    ap.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
+    ap.add_argument("--steps", type=int, default=30)
+    ap.add_argument("--warmup", type=int, default=3)
+    ap.add_argument("--batch-size", type=int, default=32)
+    ap.add_argument("--img-size", type=int, default=224)
+    ap.add_argument("--classes", type=int, default=5)
+    ap.add_argument("--amp", action="store_true")
+    ap.add_argument("--channels-last", action="store_true")
+    args = ap.parse_args()
+
+    device = torch.device(args.device)
+    torch.manual_seed(0)
+    model = models.resnet18(weights=None)
+    model.fc = nn.Linear(model.fc.in_features, args.classes)
+    model.to(device)
+    if args.channels_last:
+        model.to(memory_format=torch.channels_last)
+    opt = torch.optim.AdamW(model.parameters(), lr=1e-3)
+    loss_fn = nn.CrossEntropyLoss()
+    amp_dtype, scaler = amp_setup(device) if args.amp else (None, None)
+
+    pin = device.type == "cuda"
+    def make(n):
+        out = []
+        for _ in range(n):
+            x = torch.randn(args.batch_size, 3, args.img_size, args.img_size)
+            y = torch.randint(0, args.classes, (args.batch_size,))
+            out.append((x.pin_memory(), y.pin_memory()) if pin else (x, y))
+        return out
+    batches = make(args.steps)
+    warm = make(args.warmup)
+
+    kw = dict(amp_dtype=amp_dtype, scaler=scaler, channels_last=args.channels_last)
+    loops = {
+        "sync each step": lambda b: train_steps_synced(model, b, opt, loss_fn, device, **kw),
+        "sync per epoch": lambda b: train_one_epoch(model, b, opt, loss_fn, device, **kw),
+    }
+    n_img = args.steps * args.batch_size
+    print(f"{args.steps} steps × {args.batch_size} images at {args.img_size}px on {device}"
+          f"{' amp' if amp_dtype is not None else ''}{' channels_last' if args.channels_last else ''}")
+    results = {}
+    for name, loop in loops.items():
+        loop(warm)
+        secs = timed(lambda: loop(batches), device)
+        results[name] = secs
+        print(f"  {name:<15}: {1000 * secs / args.steps:8.2f} ms/step  {n_img / secs:8.1f} img/s")
+    before, after = results["sync each step"], results["sync per epoch"]
+    print(f"Step-time change: {100 * (after - before) / before:+.1f}%")
+
+if __name__ == "__main__":
+    main()
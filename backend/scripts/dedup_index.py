@@ -0,0 +1,215 @@
+"""
+dedup_index.py - Near-Duplicate Clip Index for Leak-Free Splits
+
+Clips from the same rally, or overlapping windows cut around nearby tags in the same
+video, look almost identical. If make_splits.py puts them on both sides of the
+train/test boundary, test accuracy is inflated. This script fingerprints every clip in
+clips_index.csv with perceptual hashes and groups near-duplicates into clusters that
+make_splits.py --dedup keeps within a single split.
+
+Main workflow:
+1. Sample --frames frames per clip (one sequential decode) and compute a 64-bit dHash
+   of each (grayscale 9x8 gradient signs)
+2. Cache hashes in <index dir>/phash_cache.json keyed by clip_path + size/mtime, so
+   re-indexing only decodes new or changed clips
+3. Banded lookup: split each hash into max_distance + 1 bands. Two hashes within
+   max_distance bits must agree exactly on at least one band (pigeonhole), so only
+   clips sharing a band bucket are compared. This is far below all-pairs for real data
+4. Two clips are near-duplicates if any pair of their frame hashes is within
+   --max-distance bits; union-find turns pairs into clusters
+   (--group-by-video also merges every clip of a video into one group)
+
+Usage:
+    python dedup_index.py --index data/clips/clips_index.csv
+    python dedup_index.py --index data/clips/clips_index.csv --max-distance 8 --out data/clips/clip_groups.csv
+
+Output:
+    data/clips/phash_cache.json  - cached per-clip frame hashes
+    clip_groups.csv (--out)      - clip_path, group (cluster id)
+"""
+
+import argparse, json, os, time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from tables import read_rows, write_rows
+from train_baseline_frame import read_clip_frames
+
+CACHE_NAME = "phash_cache.json"
+_POPCOUNT8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+def popcount64(x):
+    """Set bits per element of a uint64 array (byte lookup table; works on any numpy)."""
+    x = np.ascontiguousarray(x, dtype=np.uint64)
+    return _POPCOUNT8[x.view(np.uint8)].reshape(x.shape + (8,)).sum(axis=-1, dtype=np.int64)
+
+def dhash(gray):
+    """64-bit difference hash of a grayscale image: sign of horizontal gradients on a 9x8 thumbnail."""
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int(np.packbits(bits).view(">u8")[0])
+
+def clip_hashes(path, num_frames=8):
+    """dHashes of num_frames uniformly spaced frames of a clip, or None if it can't be decoded."""
+    frames = read_clip_frames(str(path), num_frames, img_size=32)
+    if frames is None:
+        return None
+    return [dhash(cv2.cvtColor(f, cv2.COLOR_RGB2GRAY)) for f in frames]
+
+def build_hash_index(clip_paths, cache_path, num_frames=8, workers=None):
+    """
+    {clip_path: [hash, ...]} for every decodable clip, reusing cache_path entries whose
+    clip size/mtime and frame count are unchanged. Returns (hashes, number re-hashed).
+    """
+    cache = {}
+    try:
+        with open(cache_path, encoding="utf-8") as f:
+            cache = json.load(f)
+        if cache.get("num_frames") != num_frames:
+            cache = {}
+    except (OSError, ValueError):
+        pass
+    old = cache.get("clips", {})
+
+    def stamp(p):
+        try:
+            st = os.stat(p)
+            return [st.st_size, st.st_mtime_ns]
+        except OSError:
+            return None
+
+    clip_paths = sorted(set(clip_paths))
+    stamps = {p: stamp(p) for p in clip_paths}
+    fresh = [p for p in clip_paths if stamps[p] is not None and (p not in old or old[p]["stamp"] != stamps[p])]
+    # cv2 releases the GIL while decoding, so threads are enough here
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as ex:
+        computed = dict(zip(fresh, ex.map(lambda p: clip_hashes(p, num_frames), fresh)))
+
+    clips = {}
+    for p in clip_paths:
+        if p in computed:
+            if computed[p] is not None:
+                clips[p] = {"stamp": stamps[p], "hashes": [f"{h:016x}" for h in computed[p]]}
+        elif p in old and stamps[p] is not None:
+            clips[p] = old[p]
+    tmp = Path(str(cache_path) + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"num_frames": num_frames, "clips": clips}, f)
+    os.replace(tmp, cache_path)
+    return {p: [int(h, 16) for h in e["hashes"]] for p, e in clips.items()}, len(fresh)
+
+class UnionFind:
+    def __init__(self, n):
+        self.parent = list(range(n))
+
+    def find(self, i):
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, a, b):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+def near_duplicate_pairs(hashes, owner, max_distance=6):
+    """
+    Pairs of distinct owners (clip indices) with some hashes within max_distance bits.
+    hashes: uint64 [M]; owner: int [M]. Uses max_distance + 1 bands so no pair is missed.
+    Returns (set of (i, j) with i < j, number of hash comparisons made).
+    """
+    bands = max_distance + 1
+    width = 64 // bands
+    masks = [((1 << (64 - b * width if b == bands - 1 else width)) - 1) << (b * width) for b in range(bands)]
+    pairs, compared = set(), 0
+    for b in range(bands):
+        keys = hashes & np.uint64(masks[b])
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        bounds = np.flatnonzero(np.diff(sorted_keys)) + 1
+        for bucket in np.split(order, bounds):
+            if len(bucket) < 2 or len(np.unique(owner[bucket])) < 2:
+                continue
+            for k in range(len(bucket) - 1):
+                i = bucket[k]
+                rest = bucket[k + 1:]
+                rest = rest[owner[rest] != owner[i]]
+                # hash pairs that already collided in an earlier band were checked there
+                x = hashes[rest] ^ hashes[i]
+                for m in masks[:b]:
+                    keep = (x & np.uint64(m)) != 0
+                    rest, x = rest[keep], x[keep]
+                if not len(rest): continue
+                compared += len(rest)
+                close = rest[popcount64(x) <= max_distance]
+                for j in close:
+                    a, c = int(owner[i]), int(owner[j])
+                    pairs.add((min(a, c), max(a, c)))
+    return pairs, compared
+
+def cluster_clips(rows, index_path, max_distance=6, num_frames=8, group_by_video=False, verbose=True):
+    """
+    Near-duplicate cluster id for each clip_path in rows (clips that can't be decoded
+    get their own cluster). With group_by_video, clips of the same video share a cluster.
+    """
+    t0 = time.perf_counter()
+    paths = sorted({r["clip_path"] for r in rows})
+    cache_path = Path(index_path).parent / CACHE_NAME
+    hashes, n_fresh = build_hash_index(paths, cache_path, num_frames=num_frames)
+    pos = {p: i for i, p in enumerate(paths)}
+    uf = UnionFind(len(paths))
+
+    flat, owner = [], []
+    for p, hs in hashes.items():
+        flat += hs
+        owner += [pos[p]] * len(hs)
+    flat = np.asarray(flat, dtype=np.uint64)
+    owner = np.asarray(owner, dtype=np.int64)
+    pairs, compared = near_duplicate_pairs(flat, owner, max_distance)
+    for a, b in pairs:
+        uf.union(a, b)
+    if group_by_video:
+        first = {}
+        for r in rows:
+            v = str(r["video_filename"])
+            uf.union(pos[r["clip_path"]], first.setdefault(v, pos[r["clip_path"]]))
+
+    groups = {p: uf.find(pos[p]) for p in paths}
+    if verbose:
+        sizes = Counter(groups.values())
+        all_pairs = len(flat) * (len(flat) - 1) // 2
+        print(f"Dedup index: {len(paths)} clips ({n_fresh} hashed, {len(paths) - n_fresh} cached), "
+              f"{len(pairs)} near-duplicate pairs, {len(sizes)} groups (largest {max(sizes.values(), default=0)}) | "
+              f"{compared:,} of {all_pairs:,} hash comparisons in {time.perf_counter() - t0:.1f}s")
+    return groups
+
+def main():
+    ap = argparse.ArgumentParser(description="Perceptual-hash near-duplicate clusters for clips_index")
+    ap.add_argument("--index", required=True, help="clips_index.csv (or .parquet) from extract_clips.py")
+    ap.add_argument("--max-distance", type=int, default=6, help="Max Hamming distance between 64-bit dHashes")
+    ap.add_argument("--frames", type=int, default=8, help="Frames hashed per clip")
+    ap.add_argument("--group-by-video", action="store_true", help="Also put every clip of a video in one group")
+    ap.add_argument("--out", default="", help="Optional clip_path,group CSV")
+    args = ap.parse_args()
+
+    rows = read_rows(args.index)[1]
+    groups = cluster_clips(rows, args.index, args.max_distance, args.frames, args.group_by_video)
+
+    # How many tags share a cluster with a clip from another tag, by video
+    members = defaultdict(list)
+    for r in rows:
+        members[groups[r["clip_path"]]].append(r)
+    dup = Counter(str(r["video_filename"]) for m in members.values() if len(m) > 1 for r in m)
+    for video, n in dup.most_common(5):
+        print(f"  {video}: {n} clips in multi-clip clusters")
+    if args.out:
+        write_rows(args.out, [{"clip_path": p, "group": g} for p, g in sorted(groups.items())], ["clip_path", "group"])
+        print(f"Groups → {args.out}")
+
+if __name__ == "__main__":
+    main()
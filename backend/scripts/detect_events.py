@@ -0,0 +1,287 @@
+"""
+detect_events.py - Sliding-Window Event Detection over Full Match Videos
+
+This script auto-tags whole match videos with the trained frame classifier. Each video
+is decoded front to back exactly once, scored in batches, and the detections are written
+as manifest.csv rows that extract_clips.py / make_splits.py can consume directly.
+
+Main workflow:
+1. Decode every --stride-th frame on a reader thread (bounded queue of frame batches)
+2. Classify the sampled frames in batches of --batch-size
+3. Average class probabilities over overlapping windows (--window-sec long, every --hop-sec)
+4. Keep windows whose top class is >= --min-conf and run per-action temporal NMS
+   (a detection suppresses same-action detections within --nms-sec)
+   With --motion-threshold, a cheap motion-energy pass (motion_prefilter.py) runs first and
+   only the active segments are decoded for and scored by the CNN
+5. Convert window centers back to event times using the clip offsets (--pre/--post)
+   and write manifest-compatible rows
+
+Memory stays bounded regardless of video length: at most a few frame batches are queued,
+the window buffer holds --window-sec of probabilities, and NMS only keeps the candidates
+within 2 x --nms-sec of the current time for each action.
+
+Usage:
+    python detect_events.py data/videos/match1.mp4 --out data/detections.csv
+    python detect_events.py data/videos --stride 3 --min-conf 0.7 --nms-sec 3 --out data/detections.csv
+    python detect_events.py match1.mp4 --checkpoint data/splits/baseline_resnet18.int8.ts.pt
+
+Output:
+    CSV with manifest.csv columns (event_id, video_id, video_filename, t_event_sec, action,
+    player, outcome) plus confidence. player and outcome are left blank for review.
+"""
+
+import argparse, json, queue, threading, time
+from collections import defaultdict, deque
+from pathlib import Path
+
+import cv2
+import numpy as np
+import torch
+
+from export_model import load_checkpoint
+from motion_prefilter import active_mask, active_segments, motion_energy
+from tables import write_rows
+from train_baseline_frame import IMAGENET_MEAN, IMAGENET_STD
+
+VIDEO_EXTS = {".mp4", ".mov", ".mkv", ".avi", ".m4v"}
+MANIFEST_FIELDS = ["event_id", "video_id", "video_filename", "t_event_sec", "action", "player", "outcome",
+                   "confidence"]
+
+def load_model(path, device):
+    """Eager checkpoint (.pt) or a TorchScript export (.ts.pt) -> (model, class_to_idx, img_size)."""
+    if path.name.endswith(".ts.pt"):
+        if ".int8." in path.name and "x86" in torch.backends.quantized.supported_engines:
+            torch.backends.quantized.engine = "x86"
+        extra = {"meta.json": ""}
+        model = torch.jit.load(str(path), map_location=device, _extra_files=extra)
+        meta = json.loads(extra["meta.json"])
+        return model, meta["class_to_idx"], int(meta["img_size"])
+    model, class_to_idx, img_size = load_checkpoint(path)
+    return model.to(device), class_to_idx, img_size
+
+def read_batches(path, stride, img_size, batch_size, out_q, stop, segments=None):
+    """
+    Reader thread: put (uint8 [k, H, W, 3] RGB, times, fps, segment index) batches on out_q,
+    then None. With segments [(start_sec, end_sec)], only those spans are decoded and a
+    batch never mixes two segments.
+    """
+    cap = cv2.VideoCapture(str(path))
+    try:
+        if not cap.isOpened(): return
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        for seg, (start, end) in enumerate([(0.0, float("inf"))] if segments is None else segments):
+            pos = first = int(round(start * fps))
+            if first:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, first)
+            frames, times = [], []
+            while not stop.is_set() and pos / fps <= end and cap.grab():
+                if (pos - first) % stride == 0:
+                    ok, frame = cap.retrieve()
+                    if ok:
+                        frame = cv2.resize(frame, (img_size, img_size), interpolation=cv2.INTER_AREA)
+                        frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+                        times.append(pos / fps)
+                        if len(frames) == batch_size:
+                            out_q.put((np.stack(frames), times, fps, seg))
+                            frames, times = [], []
+                pos += 1
+            if frames:
+                out_q.put((np.stack(frames), times, fps, seg))
+    finally:
+        cap.release()
+        out_q.put(None)
+
+class WindowScorer:
+    """Mean class probabilities over windows of `size` sampled frames, emitted every `hop` frames."""
+
+    def __init__(self, size, hop):
+        self.size, self.hop = size, hop
+        self.buf = deque(maxlen=size)
+        self.seen = 0
+
+    def push(self, probs, t):
+        """Add one frame; returns (window center time, mean probs) when a window completes."""
+        self.buf.append((probs, t))
+        self.seen += 1
+        if len(self.buf) < self.size or (self.seen - self.size) % self.hop:
+            return None
+        center = (self.buf[0][1] + self.buf[-1][1]) / 2
+        return center, np.mean([p for p, _ in self.buf], axis=0)
+
+class TemporalNMS:
+    """
+    Streaming per-action non-max suppression over a time-ordered stream of (t, action, conf).
+    A candidate is decided once the stream is more than `radius` past it, when everything
+    that could suppress it has been seen: it is kept unless a kept detection, or a
+    higher-confidence candidate not yet decided, lies within `radius`. Only candidates
+    within 2 * radius of the stream head are held, so a long run of confident windows
+    (e.g. a steady misclassification during dead time) never accumulates.
+    """
+
+    def __init__(self, radius):
+        self.radius = radius
+        self.pending = defaultdict(deque)  # action -> undecided (t, conf), time order
+        self.kept = defaultdict(deque)     # action -> kept times within radius of the oldest pending
+
+    def push(self, t, action, conf):
+        out = self._advance(t)
+        self.pending[action].append((t, conf))
+        return out
+
+    def flush(self):
+        out = self._advance(float("inf"))
+        self.pending.clear()
+        self.kept.clear()
+        return sorted(out)
+
+    def _advance(self, head):
+        out = []
+        for action, pending in self.pending.items():
+            kept = self.kept[action]
+            while pending and head - pending[0][0] > self.radius:
+                t, conf = pending.popleft()
+                while kept and t - kept[0] > self.radius:
+                    kept.popleft()
+                if kept:
+                    continue
+                later = (c for u, c in pending if u - t <= self.radius)
+                if any(c > conf for c in later):
+                    continue
+                kept.append(t)
+                out.append((t, action, conf))
+        return out
+
+@torch.no_grad()
+def detect_video(path, model, idx_to_class, img_size, device, args, segments=None):
+    """
+    Stream one video (or only its active segments) through the model.
+    Returns ([(t_event_sec, action, conf)], stats).
+    """
+    mean = torch.tensor(IMAGENET_MEAN, device=device).view(1, 3, 1, 1)
+    std = torch.tensor(IMAGENET_STD, device=device).view(1, 3, 1, 1)
+    # clips are cut [t - pre, t + post], so the training frame sits (post - pre)/2 after the event
+    center_offset = (args.post - args.pre) / 2
+
+    batches = queue.Queue(maxsize=args.queue_batches)
+    stop = threading.Event()
+    reader = threading.Thread(target=read_batches, daemon=True,
+                              args=(path, args.stride, img_size, args.batch_size, batches, stop, segments))
+    reader.start()
+
+    scorer = nms = None
+    seg = -1
+    detections, n_frames, n_windows, last_t = [], 0, 0, 0.0
+    try:
+        while True:
+            item = batches.get()
+            if item is None: break
+            frames, times, fps, item_seg = item
+            if item_seg != seg:
+                # windows never span the dead time between two segments
+                seg = item_seg
+                step = args.stride / fps
+                scorer = WindowScorer(max(1, round(args.window_sec / step)), max(1, round(args.hop_sec / step)))
+                nms = nms or TemporalNMS(args.nms_sec)
+            x = torch.from_numpy(frames).to(device).permute(0, 3, 1, 2).float().div_(255)
+            probs = torch.softmax(model((x - mean) / std), dim=1).cpu().numpy()
+            n_frames += len(frames)
+            last_t = times[-1]
+            for p, t in zip(probs, times):
+                window = scorer.push(p, t)
+                if window is None: continue
+                n_windows += 1
+                center, mean_p = window
+                k = int(mean_p.argmax())
+                if mean_p[k] >= args.min_conf:
+                    detections += nms.push(center, idx_to_class[k], float(mean_p[k]))
+    finally:
+        stop.set()
+        while reader.is_alive():
+            try: batches.get(timeout=0.1)
+            except queue.Empty: pass
+    if nms is not None:
+        detections += nms.flush()
+    events = [(max(0.0, t - center_offset), a, c) for t, a, c in sorted(detections)]
+    return events, {"frames": n_frames, "windows": n_windows, "video_sec": last_t}
+
+def collect_videos(inputs):
+    paths = []
+    for p in map(Path, inputs):
+        if p.is_dir():
+            paths += sorted(q for q in p.iterdir() if q.suffix.lower() in VIDEO_EXTS)
+        else:
+            paths.append(p)
+    return paths
+
+def main():
+    ap = argparse.ArgumentParser(description="Detect events in full match videos → manifest.csv rows")
+    ap.add_argument("inputs", nargs="+", help="Video files and/or directories of videos")
+    ap.add_argument("--out", required=True, help="Output .csv or .parquet (manifest columns + confidence)")
+    ap.add_argument("--checkpoint", default="data/splits/baseline_resnet18.pt",
+                    help="baseline_resnet18.pt or an export_model.py TorchScript artifact (.ts.pt)")
+    ap.add_argument("--stride", type=int, default=5, help="Score every Nth decoded frame (default 5)")
+    ap.add_argument("--window-sec", type=float, default=1.0, help="Window length probabilities are averaged over")
+    ap.add_argument("--hop-sec", type=float, default=0.5, help="Time between window starts (windows overlap)")
+    ap.add_argument("--min-conf", type=float, default=0.6, help="Minimum mean top-class probability")
+    ap.add_argument("--nms-sec", type=float, default=2.0, help="Suppress same-action detections this close")
+    ap.add_argument("--pre", type=float, default=1.0, help="Clip seconds before the event (as in extract_clips.py)")
+    ap.add_argument("--post", type=float, default=2.0, help="Clip seconds after the event (as in extract_clips.py)")
+    ap.add_argument("--batch-size", type=int, default=32)
+    ap.add_argument("--queue-batches", type=int, default=4, help="Decoded batches buffered ahead of the model")
+    ap.add_argument("--motion-threshold", type=float, default=0.0,
+                    help="Only classify segments whose motion energy is >= this x the video median "
+                         "(motion_prefilter.py; 0 = scan everything)")
+    ap.add_argument("--motion-pad-sec", type=float, default=1.5, help="Context kept around active frames")
+    ap.add_argument("--device", default="", help="cpu/cuda (default: cuda if available; int8 needs cpu)")
+    args = ap.parse_args()
+
+    if args.stride < 1:
+        print("❌ --stride must be >= 1"); return
+    device = torch.device(args.device or ("cuda" if torch.cuda.is_available() else "cpu"))
+    ckpt = Path(args.checkpoint)
+    if not ckpt.exists():
+        print(f"❌ Checkpoint not found: {ckpt}"); return
+    model, class_to_idx, img_size = load_model(ckpt, device)
+    model.eval()
+    idx_to_class = {i: a for a, i in class_to_idx.items()}
+
+    videos = collect_videos(args.inputs)
+    if not videos:
+        print("❌ No videos found"); return
+
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    event_id, rows = 0, []
+    for path in videos:
+        t0 = time.perf_counter()
+        segments = None
+        if args.motion_threshold > 0:
+            # cheap pass on tiny grayscale frames; the CNN only sees the active spans
+            times, energy = motion_energy(path, args.stride)
+            if not len(times):
+                print(f"⚠️ {path.name}: could not decode, skipped"); continue
+            active = active_mask(times, energy, args.motion_threshold, args.motion_pad_sec)
+            segments = active_segments(times, active)
+            print(f"   {path.name}: motion prefilter keeps {len(segments)} segments, "
+                  f"skips {(~active).mean():.0%} of frames")
+        events, stats = detect_video(path, model, idx_to_class, img_size, device, args, segments)
+        wall = time.perf_counter() - t0
+        if segments is not None:
+            stats["video_sec"] = float(times[-1])
+        if not stats["frames"]:
+            if segments is None:
+                print(f"⚠️ {path.name}: could not decode, skipped")
+            continue
+        for t, action, conf in events:
+            event_id += 1
+            rows.append({"event_id": event_id, "video_id": path.stem, "video_filename": path.name,
+                         "t_event_sec": f"{t:.3f}", "action": action, "player": "", "outcome": "",
+                         "confidence": f"{conf:.4f}"})
+        # rewritten after every video so a long batch run keeps what it has finished
+        write_rows(out, rows, MANIFEST_FIELDS)
+        print(f"✅ {path.name}: {len(events)} events from {stats['windows']} windows / "
+              f"{stats['frames']} frames in {wall:.1f}s ({stats['video_sec'] / wall:.1f}x realtime)")
+    print(f"Wrote {event_id} events → {out}")
+
+if __name__ == "__main__":
+    main()
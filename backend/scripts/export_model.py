@@ -0,0 +1,149 @@
+"""
+export_model.py - CPU Inference Export (TorchScript / int8 / ONNX)
+
+This script turns the checkpoint saved by train_baseline_frame.py into artifacts that
+are faster to serve on CPU-only nodes, and reports how much accuracy each one gives
+up for its speed on the test split.
+
+Main workflow:
+1. Load baseline_resnet18.pt (weights + class_to_idx + img_size)
+2. Trace and freeze the fp32 model to TorchScript
+3. Statically quantize to int8 (FX graph mode), calibrating observers on val.csv frames,
+   then trace and freeze that too
+4. Optionally export fp32 ONNX (--onnx, needs onnx + onnxruntime)
+5. Evaluate every variant on test.csv: accuracy and forward-pass images/s
+
+Every artifact carries class_to_idx and img_size (TorchScript extra file / ONNX
+metadata "meta.json"), so the API can load it without the original checkpoint.
+The API picks one with ASTRO_MODEL_FORMAT=eager|torchscript|int8|onnx.
+
+Usage:
+    python export_model.py --splits-dir data/splits
+    python export_model.py --splits-dir data/splits --onnx --frame-cache data/frame_cache
+
+Output:
+    data/splits/baseline_resnet18.ts.pt       - fp32 TorchScript (traced + frozen)
+    data/splits/baseline_resnet18.int8.ts.pt  - int8 TorchScript (static quantization)
+    data/splits/baseline_resnet18.onnx        - fp32 ONNX (--onnx)
+    data/splits/export_report.json            - accuracy vs throughput per variant
+"""
+import argparse, json, time
+from pathlib import Path
+
+import torch
+import torch.nn as nn
+from torch.utils.data import DataLoader
+from torchvision import models
+
+from tables import find_table, read_rows
+from train_baseline_frame import FrameDataset, build_frame_cache
+
+def load_checkpoint(path):
+    ckpt = torch.load(path, map_location="cpu")
+    model = models.resnet18(weights=None)
+    model.fc = nn.Linear(model.fc.in_features, len(ckpt["class_to_idx"]))
+    model.load_state_dict(ckpt["model"])
+    return model.eval(), ckpt["class_to_idx"], int(ckpt.get("img_size", 224))
+
+def save_torchscript(model, example, path, meta):
+    with torch.no_grad():
+        ts = torch.jit.freeze(torch.jit.trace(model, example))
+    torch.jit.save(ts, str(path), _extra_files={"meta.json": json.dumps(meta)})
+    return ts
+
+def quantize_int8(model, calib_loader, example, max_batches):
+    """Static int8 quantization: insert observers, run val batches through, convert."""
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+    engine = "x86" if "x86" in torch.backends.quantized.supported_engines else "qnnpack"
+    torch.backends.quantized.engine = engine
+    prepared = prepare_fx(model, get_default_qconfig_mapping(engine), example_inputs=(example,))
+    with torch.no_grad():
+        for i, (x, _) in enumerate(calib_loader):
+            if i >= max_batches: break
+            prepared(x)
+    return convert_fx(prepared)
+
+def export_onnx(model, example, path, meta):
+    import onnx
+    torch.onnx.export(model, example, str(path), input_names=["input"], output_names=["logits"],
+                      dynamic_axes={"input": {0: "batch"}, "logits": {0: "batch"}}, opset_version=18)
+    m = onnx.load(str(path))  # also pulls in any external weights file the exporter wrote
+    m.metadata_props.add(key="meta.json", value=json.dumps(meta))
+    onnx.save(m, str(path))
+    Path(str(path) + ".data").unlink(missing_ok=True)
+
+def evaluate_variant(run, loader):
+    """Accuracy plus images/s of the forward pass alone (decode time excluded)."""
+    correct = total = 0
+    fwd_s = 0.0
+    with torch.no_grad():
+        for x, y in loader:
+            t0 = time.perf_counter()
+            logits = run(x)
+            fwd_s += time.perf_counter() - t0
+            correct += (logits.argmax(1) == y).sum().item()
+            total += x.size(0)
+    return correct / max(total, 1), total / fwd_s if fwd_s else 0.0
+
+def main():
+    ap = argparse.ArgumentParser(description="Export TorchScript/int8/ONNX artifacts and compare them")
+    ap.add_argument("--splits-dir", required=True, help="Dir with val.csv/test.csv and baseline_resnet18.pt")
+    ap.add_argument("--checkpoint", default="", help="Checkpoint path (default <splits-dir>/baseline_resnet18.pt)")
+    ap.add_argument("--batch-size", type=int, default=32)
+    ap.add_argument("--calib-batches", type=int, default=10, help="val batches used to calibrate int8")
+    ap.add_argument("--onnx", action="store_true", help="Also export and evaluate ONNX (needs onnx + onnxruntime)")
+    ap.add_argument("--frame-cache", default="", help="Reuse train_baseline_frame.py's decoded frame cache")
+    args = ap.parse_args()
+
+    torch.manual_seed(0)
+    splits = Path(args.splits_dir)
+    ckpt_path = Path(args.checkpoint) if args.checkpoint else splits / "baseline_resnet18.pt"
+    stem = ckpt_path.with_suffix("")
+    model, class_to_idx, img_size = load_checkpoint(ckpt_path)
+    meta = {"class_to_idx": class_to_idx, "img_size": img_size}
+
+    frame_cache = None
+    if args.frame_cache:
+        clip_paths = []
+        for name in ("val", "test"):
+            clip_paths += [row["clip_path"] for row in read_rows(find_table(splits, name))[1]]
+        frame_cache = build_frame_cache(clip_paths, args.frame_cache, img_size=img_size)
+    val_ds = FrameDataset(find_table(splits, "val"), class_to_idx, img_size=img_size, frame_cache=frame_cache)
+    test_ds = FrameDataset(find_table(splits, "test"), class_to_idx, img_size=img_size, frame_cache=frame_cache)
+    val_ld = DataLoader(val_ds, batch_size=args.batch_size, shuffle=True)
+    test_ld = DataLoader(test_ds, batch_size=args.batch_size, shuffle=False)
+    example = torch.randn(args.batch_size, 3, img_size, img_size)
+
+    variants = {"eager fp32": model}
+    ts_path = stem.with_suffix(".ts.pt")
+    variants["torchscript fp32"] = save_torchscript(model, example, ts_path, meta)
+    print(f"Wrote {ts_path}")
+
+    int8_path = stem.with_suffix(".int8.ts.pt")
+    qmodel = quantize_int8(load_checkpoint(ckpt_path)[0], val_ld, example, args.calib_batches)
+    variants["torchscript int8"] = save_torchscript(qmodel, example, int8_path, meta)
+    print(f"Wrote {int8_path}")
+
+    if args.onnx:
+        import onnxruntime as ort
+        onnx_path = stem.with_suffix(".onnx")
+        export_onnx(model, example, onnx_path, meta)
+        sess = ort.InferenceSession(str(onnx_path), providers=["CPUExecutionProvider"])
+        variants["onnx fp32"] = lambda x: torch.from_numpy(sess.run(None, {"input": x.numpy()})[0])
+        print(f"Wrote {onnx_path}")
+
+    report = {}
+    print(f"{'variant':<18} {'test acc':>8} {'img/s':>9}")
+    for name, run in variants.items():
+        run(example)  # warm-up
+        acc, rate = evaluate_variant(run, test_ld)
+        report[name] = {"test_acc": round(acc, 4), "images_per_sec": round(rate, 1)}
+        print(f"{name:<18} {acc:>8.3f} {rate:>9.1f}")
+    report_path = splits / "export_report.json"
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report → {report_path}")
+
+if __name__ == "__main__":
+    main()
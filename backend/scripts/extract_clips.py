@@ -11,22 +11,44 @@ Main workflow:
 3. Use FFmpeg to create clips with consistent encoding
 4. Generate descriptive filenames for easy organization
 5. Create clips_index.csv for downstream ML training scripts
+6. Record every clip in clips_cache.json so re-runs only cut new or changed windows
 
 Purpose: Converts tagged volleyball moments into individual training clips,
 enabling computer vision models to learn volleyball action recognition.
 
 Usage:
     python extract_clips.py --manifest manifest.csv --video-root videos --out-dir clips
+    python extract_clips.py --manifest manifest.csv --video-root videos --out-dir clips --jobs 8
+    python extract_clips.py --manifest manifest.csv --video-root videos --out-dir clips --grouped --merge-gap 5
+    python extract_clips.py --manifest manifest.csv --video-root videos --out-dir clips --codec copy --copy-tolerance 0.5
+    python extract_clips.py --manifest manifest.csv --video-root videos --out-dir clips/game1 --video game1.mp4
 
 Output:
     clips/game1_spike_succ_Johnny_Tran_45200_1.mp4  (individual clips)
-    clips/clips_index.csv                            (index for ML training)
+    clips/clips_index.csv                            (index for ML training; .parquet with --index-format parquet)
+    clips/clips_cache.json                           (cache keys for incremental re-runs)
 """
 
-import argparse,csv,math,os,subprocess,sys
+import argparse,bisect,hashlib,json,math,os,subprocess,sys,threading,time
 from collections import defaultdict
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
 
+from tables import read_rows, write_rows
+
+INDEX_FIELDS = [
+    "clip_path", "video_filename", "t_event_sec",
+    "pre", "post", "action", "outcome", "player", "event_id",
+    "clip_start", "clip_end",
+]
+
+CACHE_NAME = "clips_cache.json"
+
+# Keyframe timestamps per source, probed once and shared by all pool workers
+_keyframes = {}
+_keyframe_locks = defaultdict(threading.Lock)
+_keyframe_locks_guard = threading.Lock()
+
 def sanitize(s: str, maxlen: int = 80) -> str:
     """Safe chunk for filenames: keep alnum/_- and collapse spaces."""
     s = (s or "").strip().replace(" ", "_")
@@ -56,7 +78,7 @@ def cut_clip_ffmpeg(src: Path, dst: Path, start: float, dur: float,
         return 0
     cmd = [
         "ffmpeg",
-        "-hide_banner", "-loglevel", "error",
+        "-hide_banner", "-loglevel", "error", "-y",
         "-ss", f"{start:.3f}",
         "-i", str(src),
         "-t", f"{dur:.3f}",
@@ -68,26 +90,253 @@ def cut_clip_ffmpeg(src: Path, dst: Path, start: float, dur: float,
     ]
     return subprocess.call(cmd)
 
+def probe_keyframes(src: Path) -> list:
+    """
+    Return sorted keyframe timestamps (seconds) of src's first video stream.
+    Reads packet flags with ffprobe (no decoding) and caches the result per source.
+    """
+    with _keyframe_locks_guard:
+        lock = _keyframe_locks[src]
+    with lock:
+        if src not in _keyframes:
+            cmd = [
+                "ffprobe",
+                "-v", "error",
+                "-select_streams", "v:0",
+                "-show_entries", "packet=pts_time,flags",
+                "-of", "csv=p=0",
+                str(src),
+            ]
+            out = subprocess.run(cmd, capture_output=True, text=True).stdout
+            times = []
+            for line in out.splitlines():
+                pts, _, flags = line.partition(",")
+                if "K" in flags:
+                    try:
+                        times.append(float(pts))
+                    except ValueError:
+                        pass
+            _keyframes[src] = sorted(times)
+        return _keyframes[src]
+
+def snap_to_keyframe(keyframes: list, start: float) -> float:
+    """Latest keyframe at or before start (0.0 if none)."""
+    i = bisect.bisect_right(keyframes, start + 1e-6)
+    return keyframes[i - 1] if i else 0.0
+
+def cut_clip_copy(src: Path, dst: Path, start: float, dur: float, tolerance: float,
+                  overwrite: bool = False) -> tuple:
+    """
+    Stream-copy [start, start+dur) from src when the window start sits within tolerance
+    seconds after a keyframe; the copy then begins at that keyframe. Otherwise fall back
+    to cut_clip_ffmpeg. Only the start needs snapping: a copy can stop on any packet.
+    Returns (ffmpeg exit code, actual start, actual end, True if stream-copied).
+    """
+    end = start + dur
+    snapped = snap_to_keyframe(probe_keyframes(src), start)
+    if start - snapped > tolerance:
+        return cut_clip_ffmpeg(src, dst, start, dur, overwrite=overwrite), start, end, False
+    if dst.exists() and not overwrite:
+        return 0, snapped, end, True
+    cmd = [
+        "ffmpeg",
+        "-hide_banner", "-loglevel", "error", "-y",
+        "-ss", f"{snapped:.3f}",
+        "-i", str(src),
+        "-t", f"{end - snapped:.3f}",
+        "-c:v", "copy",
+        "-an",
+        str(dst),
+    ]
+    return subprocess.call(cmd), snapped, end, True
+
+def cut_span_ffmpeg(src: Path, start: float, end: float, clips: list,
+                    overwrite: bool = False, crf: int = 23, preset: str = "veryfast") -> int:
+    """
+    Decode [start, end) of src once and write every (dst, clip_start, dur) in clips from it.
+    All outputs map the same input stream, so ffmpeg seeks and decodes the span a single
+    time and each output keeps only its own window (output-side -ss/-t).
+    Returns ffmpeg exit code (0 = success).
+    """
+    clips = [c for c in clips if overwrite or not c[0].exists()]
+    if not clips:
+        return 0
+    cmd = [
+        "ffmpeg",
+        "-hide_banner", "-loglevel", "error", "-y",
+        "-ss", f"{start:.3f}",
+        "-t", f"{end - start:.3f}",
+        "-i", str(src),
+    ]
+    for dst, clip_start, dur in clips:
+        cmd += [
+            "-map", "0:v",
+            "-ss", f"{clip_start - start:.3f}",
+            "-t", f"{dur:.3f}",
+            "-c:v", "libx264",
+            "-preset", preset,
+            "-crf", str(crf),
+            "-an",
+            str(dst),
+        ]
+    return subprocess.call(cmd)
+
+def merge_spans(items: list, gap: float = 0.0, max_clips: int = 8) -> list:
+    """
+    Group (seq, job) items per source video into decode spans sorted by time.
+    Windows that overlap, or sit less than gap seconds apart, share a span, up to
+    max_clips per span (each clip is one encoder in the span's ffmpeg process).
+    """
+    by_src = defaultdict(list)
+    for seq, job in items:
+        by_src[job["video_filename"]].append((seq, job))
+    spans = []
+    for video_filename in sorted(by_src):
+        cur = None
+        for seq, job in sorted(by_src[video_filename], key=lambda it: (it[1]["start"], it[0])):
+            s, e = job["start"], job["start"] + job["dur"]
+            if cur is not None and s <= cur["end"] + gap and len(cur["items"]) < max_clips:
+                cur["end"] = max(cur["end"], e)
+                cur["items"].append((seq, job))
+            else:
+                cur = {"src": job["src"], "start": s, "end": e, "items": [(seq, job)]}
+                spans.append(cur)
+    return spans
+
+def load_cache(path: Path) -> dict:
+    """Read the clip cache manifest ({"sources": ..., "clips": ...}); empty if missing or unreadable."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            cache = json.load(f)
+        if cache.get("version") == 1:
+            return cache
+    except (OSError, ValueError):
+        pass
+    return {"version": 1, "sources": {}, "clips": {}}
+
+def write_atomic(path: Path, write) -> None:
+    """Call write(f) on a temp file next to path, then rename it over path in one step."""
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
+        write(f)
+    os.replace(tmp, path)
+
+def source_fingerprint(src: Path, known: dict, full_hash: bool = False) -> str:
+    """
+    Identify a source video's content: size + mtime, or a sha256 of the file when full_hash.
+    known is the previous run's entry for this source; its hash is reused while size/mtime match.
+    Returns the fingerprint and updates known in place.
+    """
+    st = src.stat()
+    if known.get("size") != st.st_size or known.get("mtime_ns") != st.st_mtime_ns:
+        known.clear()
+        known.update(size=st.st_size, mtime_ns=st.st_mtime_ns)
+    if not full_hash:
+        return f"{st.st_size}:{st.st_mtime_ns}"
+    if "sha256" not in known:
+        h = hashlib.sha256()
+        with open(src, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        known["sha256"] = h.hexdigest()
+    return known["sha256"]
+
+def clip_key(fingerprint: str, start: float, dur: float, encode: dict) -> str:
+    """Cache key of one clip: source content, window and encode parameters."""
+    blob = json.dumps([fingerprint, f"{start:.3f}", f"{dur:.3f}", encode], sort_keys=True)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+def clip_window(t: float, pre: float, post: float) -> tuple:
+    """Return (start, dur) for an event at t, clamping the window start to 0."""
+    start = max(0.0, t - pre)
+    dur = pre + post
+    # If event is very early and we clamped start to 0, extend duration to still include the post window
+    if t - pre < 0:
+        dur = t + post  # from 0 to (t+post)
+    return start, dur
+
+def timed_cut(job: dict, overwrite: bool, copy_tolerance=None) -> tuple:
+    """
+    Run one cut on a pool worker; returns ([exit code], worker name, seconds spent).
+    With copy_tolerance set, tries a stream copy first and records the window actually used.
+    """
+    t0 = time.perf_counter()
+    if copy_tolerance is None:
+        code = cut_clip_ffmpeg(job["src"], job["dst"], job["start"], job["dur"], overwrite=overwrite)
+    else:
+        code, actual_start, actual_end, job["copied"] = cut_clip_copy(
+            job["src"], job["dst"], job["start"], job["dur"], copy_tolerance, overwrite=overwrite)
+        job["index_row"]["clip_start"] = f"{actual_start:.3f}"
+        job["index_row"]["clip_end"] = f"{actual_end:.3f}"
+    return [code], threading.current_thread().name, time.perf_counter() - t0
+
+def timed_span(span: dict, overwrite: bool) -> tuple:
+    """Cut every clip of a span on a pool worker; returns (exit codes, worker name, seconds spent)."""
+    t0 = time.perf_counter()
+    jobs = [job for _, job in span["items"]]
+    fresh = [overwrite or not job["dst"].exists() for job in jobs]
+    clips = [(job["dst"], job["start"], job["dur"]) for job in jobs]
+    if cut_span_ffmpeg(span["src"], span["start"], span["end"], clips, overwrite=overwrite) == 0:
+        codes = [0] * len(jobs)
+    else:
+        # One bad window fails the whole graph; retry per event so the others survive
+        codes = [cut_clip_ffmpeg(job["src"], job["dst"], job["start"], job["dur"], overwrite=f)
+                 for job, f in zip(jobs, fresh)]
+    return codes, threading.current_thread().name, time.perf_counter() - t0
+
 def main():
     ap = argparse.ArgumentParser(description="Extract event-centered clips from manifest.csv using ffmpeg")
-    ap.add_argument("--manifest", required=True, help="Path to manifest.csv")
+    ap.add_argument("--manifest", required=True, help="Path to manifest.csv (or .parquet)")
     ap.add_argument("--video-root", required=True, help="Directory containing source videos")
     ap.add_argument("--out-dir", required=True, help="Directory to write clips and clips_index.csv")
     ap.add_argument("--pre", type=float, default=1.0, help="Seconds before t_event_sec (default 1.0)")
     ap.add_argument("--post", type=float, default=2.0, help="Seconds after t_event_sec (default 2.0)")
     ap.add_argument("--limit", type=int, default=0, help="Max total clips (0 = no limit)")
     ap.add_argument("--per-action-limit", type=int, default=0, help="Max clips per action class (0 = no limit)")
-    ap.add_argument("--overwrite", action="store_true", help="Overwrite existing clip files")
+    ap.add_argument("--overwrite", action="store_true", help="Ignore the clip cache and re-cut every clip")
+    ap.add_argument("--jobs", type=int, default=1, help="Number of ffmpeg cuts to run in parallel (default 1)")
+    ap.add_argument("--grouped", action="store_true",
+                    help="Decode each source once per span of overlapping windows and emit all its clips in one ffmpeg pass "
+                         "(limits are applied when planning, before any cut runs)")
+    ap.add_argument("--merge-gap", type=float, default=0.0,
+                    help="With --grouped, also merge windows less than this many seconds apart (default 0)")
+    ap.add_argument("--max-span-clips", type=int, default=8,
+                    help="With --grouped, max clips (parallel encoders) per decode span; longer chains are split (default 8)")
+    ap.add_argument("--codec", choices=["libx264", "copy"], default="libx264",
+                    help="copy = stream-copy from the keyframe before each window when close enough, "
+                         "re-encode otherwise (default libx264)")
+    ap.add_argument("--copy-tolerance", type=float, default=0.5,
+                    help="With --codec copy, max seconds a window may start early to snap to a keyframe (default 0.5)")
+    ap.add_argument("--hash-sources", action="store_true",
+                    help="Fingerprint source videos by sha256 instead of size + mtime")
+    ap.add_argument("--keep-orphans", action="store_true",
+                    help="Keep previously cut clips that this run no longer indexes (cleanup is also skipped "
+                         "automatically for --limit/--per-action-limit/--video runs and runs with missing sources or failed cuts)")
+    ap.add_argument("--index-format", choices=["csv", "parquet"], default="csv",
+                    help="Write clips_index.csv or clips_index.parquet (typed columns, needs pyarrow)")
+    ap.add_argument("--video", action="append", default=[],
+                    help="Only extract events from this source video (repeatable; default: all)")
     args = ap.parse_args()
+    if args.codec == "copy" and args.grouped:
+        ap.error("--codec copy cannot be combined with --grouped")
 
     manifest = Path(args.manifest)
     video_root = Path(args.video_root)
     out_dir = Path(args.out_dir)
     ensure_dir(out_dir)
+    jobs = max(1, args.jobs)
 
     # Where we’ll log what we produced (handy for training scripts):
-    index_path = out_dir / "clips_index.csv"
-    wrote_header = not index_path.exists()
+    index_path = out_dir / f"clips_index.{args.index_format}"
+
+    # Clips are re-cut only when their cache key (source content, window, encode params) changes
+    cache_path = out_dir / CACHE_NAME
+    old_cache = load_cache(cache_path)
+    new_cache = {"version": 1, "sources": old_cache["sources"], "clips": {}}
+    fingerprints = {}
+    encode = {"codec": args.codec, "crf": 23, "preset": "veryfast"}
+    if args.codec == "copy":
+        encode["copy_tolerance"] = max(0.0, args.copy_tolerance)
 
     total_in = 0
     total_out = 0
@@ -95,73 +344,123 @@ def main():
     per_video_missing = defaultdict(int)
     per_video_ok = defaultdict(int)
 
-    # Open once to append index rows as we go
-    index_f = open(index_path, "a", newline="", encoding="utf-8")
-    index_w = csv.DictWriter(
-        index_f,
-        fieldnames=[
-            "clip_path", "video_filename", "t_event_sec",
-            "pre", "post", "action", "outcome", "player", "event_id"
-        ],
-    )
-    if wrote_header:
-        index_w.writeheader()
-
-    with open(manifest, newline="", encoding="utf-8") as f:
-        r = csv.DictReader(f)
-        required = {"event_id","video_filename","t_event_sec","action","player","outcome"}
-        missing_headers = required - set(r.fieldnames or [])
-        if missing_headers:
-            print(f"❌ Missing headers in manifest: {sorted(missing_headers)}")
-            sys.exit(2)
-
-        for row in r:
-            total_in += 1
-            # Respect overall and per-action limits
+    # Cuts run on a bounded thread pool (ffmpeg does the work in its own process).
+    # Finished clips are keyed by manifest position so the index stays in manifest order.
+    pool = ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="cut")
+    pending = {}                       # future -> [(seq, job), ...]
+    planned = []                       # (seq, job) waiting for --grouped spans
+    in_flight = defaultdict(int)       # action -> cuts submitted but not finished
+    n_in_flight = 0
+    done_rows = {}                     # seq -> index row
+    n_reused = 0
+    n_failed = 0
+    copied = {}                        # seq -> True if stream-copied
+    worker_clips = defaultdict(int)
+    worker_busy = defaultdict(float)
+
+    def record(seq, job):
+        nonlocal total_out
+        done_rows[seq] = job["index_row"]
+        copied[seq] = job.get("copied", False)
+        new_cache["clips"][job["dst"].name] = {
+            "key": job["key"],
+            "clip_start": job["index_row"]["clip_start"],
+            "clip_end": job["index_row"]["clip_end"],
+            "copied": copied[seq],
+        }
+        total_out += 1
+        per_action_counts[job["action"]] += 1
+        per_video_ok[job["video_filename"]] += 1
+
+    def collect(return_when):
+        nonlocal n_in_flight, n_failed
+        done, _ = wait(list(pending), return_when=return_when)
+        for fut in done:
+            items = pending.pop(fut)
+            codes, worker, secs = fut.result()
+            worker_busy[worker] += secs
+            for (seq, job), code in zip(items, codes):
+                in_flight[job["action"]] -= 1
+                n_in_flight -= 1
+                if code != 0:
+                    # ffmpeg failed; skip
+                    n_failed += 1
+                    continue
+                worker_clips[worker] += 1
+                record(seq, job)
+
+    t_start = time.perf_counter()
+    fieldnames, manifest_rows = read_rows(manifest)
+    required = {"event_id","video_filename","t_event_sec","action","player","outcome"}
+    missing_headers = required - set(fieldnames)
+    if missing_headers:
+        print(f"❌ Missing headers in manifest: {sorted(missing_headers)}")
+        sys.exit(2)
+
+    only_videos = set(args.video)
+    for seq, row in enumerate(manifest_rows):
+        if only_videos and str(row["video_filename"]).strip() not in only_videos:
+            continue
+        total_in += 1
+        action = (row["action"] or "").strip().lower()
+
+        # Respect overall and per-action limits. Cuts still in flight may fail, so when
+        # a limit is only reached by counting them, wait for them before deciding.
+        limit_hit = skip = False
+        while True:
             if args.limit and total_out >= args.limit:
+                limit_hit = True
                 break
-            action = (row["action"] or "").strip().lower()
             if args.per_action_limit and per_action_counts[action] >= args.per_action_limit:
-                continue
+                skip = True
+                break
+            undecided = (args.limit and total_out + n_in_flight >= args.limit) or \
+                        (args.per_action_limit and per_action_counts[action] + in_flight[action] >= args.per_action_limit)
+            if args.grouped:
+                # Grouped cuts only start once the whole manifest is planned; count them as done
+                limit_hit = bool(args.limit and total_out + n_in_flight >= args.limit)
+                skip = bool(undecided) and not limit_hit
+                break
+            if not (undecided or len(pending) >= 2 * jobs):
+                break
+            collect(FIRST_COMPLETED)
+        if limit_hit:
+            break
+        if skip:
+            continue
 
-            # Resolve source video
-            video_filename = row["video_filename"].strip()
-            src = video_root / video_filename
-            if not src.exists():
-                per_video_missing[video_filename] += 1
-                continue
+        # Resolve source video
+        video_filename = row["video_filename"].strip()
+        src = video_root / video_filename
+        if not src.exists():
+            per_video_missing[video_filename] += 1
+            continue
 
-            try:
-                t = float(row["t_event_sec"])
-            except Exception:
-                continue
-
-            # Compute clip window (clamp to 0)
-            pre = max(0.0, float(args.pre))
-            post = max(0.0, float(args.post))
-            start = max(0.0, t - pre)
-            dur = pre + post
-            # If event is very early and we clamped start to 0, extend duration to still include the post window
-            if t - pre < 0:
-                dur = t + post  # from 0 to (t+post)
-
-            out_name = build_out_name(
-                event_id=row["event_id"],
-                player=row["player"],
-                action=action,
-                outcome=row["outcome"],
-                video_filename=video_filename,
-                t_sec=t,
-            )
-            dst = out_dir / out_name
-
-            code = cut_clip_ffmpeg(src, dst, start, dur, overwrite=args.overwrite)
-            if code != 0:
-                # ffmpeg failed; skip
-                continue
-
-            # Write index entry for training pipelines
-            index_w.writerow({
+        try:
+            t = float(row["t_event_sec"])
+        except Exception:
+            continue
+
+        # Compute clip window (clamp to 0)
+        pre = max(0.0, float(args.pre))
+        post = max(0.0, float(args.post))
+        start, dur = clip_window(t, pre, post)
+
+        out_name = build_out_name(
+            event_id=row["event_id"],
+            player=row["player"],
+            action=action,
+            outcome=row["outcome"],
+            video_filename=video_filename,
+            t_sec=t,
+        )
+        dst = out_dir / out_name
+
+        job = {
+            "src": src, "dst": dst, "start": start, "dur": dur,
+            "action": action, "video_filename": video_filename,
+            # Index entry for training pipelines
+            "index_row": {
                 "clip_path": str(dst),
                 "video_filename": video_filename,
                 "t_event_sec": f"{t:.3f}",
@@ -171,17 +470,78 @@ def main():
                 "outcome": row["outcome"],
                 "player": row["player"],
                 "event_id": row["event_id"],
-            })
+                # Window actually cut; differs from t - pre .. t + post when stream-copied
+                "clip_start": f"{start:.3f}",
+                "clip_end": f"{start + dur:.3f}",
+            },
+        }
+        if video_filename not in fingerprints:
+            known = old_cache["sources"].setdefault(video_filename, {})
+            fingerprints[video_filename] = source_fingerprint(src, known, full_hash=args.hash_sources)
+        job["key"] = clip_key(fingerprints[video_filename], start, dur, encode)
+        cached = old_cache["clips"].get(dst.name)
+        if not args.overwrite and cached and cached["key"] == job["key"] and dst.exists():
+            job["index_row"]["clip_start"] = cached["clip_start"]
+            job["index_row"]["clip_end"] = cached["clip_end"]
+            job["copied"] = cached.get("copied", False)
+            record(seq, job)
+            n_reused += 1
+            continue
 
-            total_out += 1
-            per_action_counts[action] += 1
-            per_video_ok[video_filename] += 1
+        # Anything that reaches the pool is missing or stale, so cuts always overwrite
+        in_flight[action] += 1
+        n_in_flight += 1
+        if args.grouped:
+            planned.append((seq, job))
+        else:
+            copy_tolerance = encode.get("copy_tolerance")
+            pending[pool.submit(timed_cut, job, True, copy_tolerance)] = [(seq, job)]
 
-    index_f.close()
+    n_spans = 0
+    if planned:
+        for span in merge_spans(planned, gap=max(0.0, args.merge_gap), max_clips=max(1, args.max_span_clips)):
+            # Every clip of a span is its own encoder, so spans count their clips against
+            # --jobs; a span with more clips than --jobs runs on its own
+            while pending and sum(map(len, pending.values())) + len(span["items"]) > jobs:
+                collect(FIRST_COMPLETED)
+            pending[pool.submit(timed_span, span, True)] = span["items"]
+            n_spans += 1
+    if pending:
+        collect(ALL_COMPLETED)
+    pool.shutdown()
+    wall = time.perf_counter() - t_start
+
+    # Rewrite the index from scratch so re-runs never pile up duplicate rows
+    write_rows(index_path, [done_rows[seq] for seq in sorted(done_rows)], INDEX_FIELDS)
+
+    # Drop clips that earlier runs cut but this run no longer indexes. Only a full run
+    # knows which manifest rows are really gone: a limited or filtered run, a missing
+    # source or a failed cut would otherwise delete clips that are still wanted.
+    n_removed = 0
+    gc_skipped = [why for why, hit in (
+        ("--limit/--per-action-limit", args.limit or args.per_action_limit), ("--video", only_videos),
+        ("missing source videos", per_video_missing), ("failed cuts", n_failed)) if hit]
+    if not args.keep_orphans and not gc_skipped:
+        for name in set(old_cache["clips"]) - set(new_cache["clips"]):
+            try:
+                (out_dir / name).unlink()
+                n_removed += 1
+            except FileNotFoundError:
+                pass
+        new_cache["sources"] = {v: old_cache["sources"][v] for v in fingerprints}
+    else:
+        for name, entry in old_cache["clips"].items():
+            new_cache["clips"].setdefault(name, entry)
+    write_atomic(cache_path, lambda f: json.dump(new_cache, f, indent=1, sort_keys=True))
 
     # Summary
     print(f"Scanned manifest rows: {total_in}")
     print(f"Wrote clips: {total_out} → {index_path.name}")
+    print(f"Reused cached clips: {n_reused}, cut: {total_out - n_reused}, removed orphans: {n_removed}")
+    if gc_skipped and not args.keep_orphans:
+        print(f"⚠️ Orphan cleanup skipped ({', '.join(gc_skipped)}); earlier clips were kept")
+    if n_failed:
+        print(f"⚠️ {n_failed} cuts failed")
     if per_action_counts:
         print("Per-action counts:", dict(per_action_counts))
     if per_video_missing:
@@ -189,6 +549,16 @@ def main():
         print(f"Missing source videos for {miss} events across {len(per_video_missing)} files:")
         for k, v in sorted(per_video_missing.items(), key=lambda x: -x[1])[:5]:
             print(f"  {k}: {v} missing")
+    if args.codec == "copy":
+        n_copied = sum(1 for seq in done_rows if copied[seq])
+        print(f"Stream-copied {n_copied} clips, re-encoded {len(done_rows) - n_copied} (keyframe drift > {args.copy_tolerance:.2f}s)")
+    if args.grouped:
+        print(f"Grouped mode: {n_spans} decode spans for {len(planned)} clips")
+    if jobs > 1:
+        print(f"Throughput: {total_out / wall if wall else 0.0:.2f} clips/s over {wall:.1f}s with {jobs} jobs")
+        for w in sorted(worker_busy):
+            busy = worker_busy[w]
+            print(f"  {w}: {worker_clips[w]} clips, {worker_clips[w] / busy if busy else 0.0:.2f} clips/s")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,76 @@
+"""
+load_test_api.py - Inference API Load Test
+
+This script fires concurrent requests at a running backend (uvicorn app.main:app) and
+reports latency percentiles and throughput at each concurrency level, which shows how
+well the micro-batcher turns concurrent requests into shared forward passes.
+
+Main workflow:
+1. Read the clip (or video) to upload once
+2. For each concurrency level, keep that many requests in flight until N complete
+3. Print p50/p99 latency and requests/s per level
+
+Usage:
+    python load_test_api.py --url http://127.0.0.1:8000 --clip data/clips/some_clip.mp4
+    python load_test_api.py --url http://127.0.0.1:8000 --clip match.mp4 --endpoint /analyze --requests 20
+
+Requires httpx (pip install httpx).
+"""
+
+import argparse, asyncio, time
+from pathlib import Path
+
+import httpx
+
+def percentile(values, q):
+    values = sorted(values)
+    if not values: return 0.0
+    k = min(len(values) - 1, max(0, int(round(q / 100 * (len(values) - 1)))))
+    return values[k]
+
+async def run_level(client, url, payload, filename, concurrency, n_requests):
+    latencies, errors = [], 0
+    remaining = n_requests
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            t0 = time.perf_counter()
+            r = await client.post(url, files={"file": (filename, payload, "video/mp4")})
+            latencies.append(time.perf_counter() - t0)
+            if r.status_code != 200:
+                errors += 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - t0
+    return latencies, errors, wall
+
+async def main_async(args):
+    payload = Path(args.clip).read_bytes()
+    url = args.url.rstrip("/") + args.endpoint
+    levels = [int(c) for c in args.concurrency.split(",")]
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        # one warm-up request so connection setup and lazy init aren't measured
+        await client.post(url, files={"file": (Path(args.clip).name, payload, "video/mp4")})
+        print(f"{'conc':>5} {'p50 ms':>9} {'p99 ms':>9} {'req/s':>8} {'errors':>7}")
+        for c in levels:
+            lat, errors, wall = await run_level(client, url, payload, Path(args.clip).name, c, args.requests)
+            print(f"{c:>5} {1000 * percentile(lat, 50):>9.1f} {1000 * percentile(lat, 99):>9.1f} "
+                  f"{len(lat) / wall if wall else 0.0:>8.1f} {errors:>7}")
+
+def main():
+    ap = argparse.ArgumentParser(description="Latency/throughput vs concurrency for the inference API")
+    ap.add_argument("--url", default="http://127.0.0.1:8000", help="Base URL of the running backend")
+    ap.add_argument("--clip", required=True, help="Clip or video file to upload")
+    ap.add_argument("--endpoint", default="/classify", help="/classify (default) or /analyze")
+    ap.add_argument("--concurrency", default="1,2,4,8,16,32", help="Comma-separated concurrency levels")
+    ap.add_argument("--requests", type=int, default=100, help="Requests per concurrency level")
+    ap.add_argument("--timeout", type=float, default=120.0)
+    args = ap.parse_args()
+    asyncio.run(main_async(args))
+
+if __name__ == "__main__":
+    main()
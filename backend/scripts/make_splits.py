@@ -12,30 +12,45 @@ Main workflow:
 4. Split each action group into train/val/test with specified ratios
 5. Write separate CSV files for each split
 
+With --dedup, near-duplicate clips (same rally, overlapping windows; see dedup_index.py)
+are clustered first and each cluster goes to a single split, so nothing leaks from
+train into val/test. --group-by-video does the same for whole source videos.
+
 Purpose: Creates proper ML datasets with balanced action representation across splits,
 preventing data leakage and ensuring fair evaluation.
 
 Usage:
     python make_splits.py --index clips_index.csv --out-dir data/splits
+    python make_splits.py --index clips_index.parquet --out-dir data/splits --format parquet
+    python make_splits.py --index clips_index.csv --out-dir data/splits --dedup
     
 Output:
     data/splits/train.csv - Training set (70% by default)
     data/splits/val.csv   - Validation set (15% by default) 
     data/splits/test.csv  - Test set (15% by default)
+    (train/val/test.parquet with --format parquet)
 """
 
-import argparse, csv, random
+import argparse, random
 from collections import defaultdict
 from pathlib import Path
 
+from tables import read_rows, write_rows
+
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument("--index", required=True, help="Path to clips_index.csv")
+    ap.add_argument("--index", required=True, help="Path to clips_index.csv (or .parquet)")
     ap.add_argument("--out-dir", required=True, help="Where to write splits/")
     ap.add_argument("--seed", type=int, default=42)
     ap.add_argument("--per-action-cap", type=int, default=0, help="0=no cap")
     ap.add_argument("--val-frac", type=float, default=0.15)
     ap.add_argument("--test-frac", type=float, default=0.15)
+    ap.add_argument("--format", choices=["csv", "parquet"], default="csv",
+                    help="Split file format; parquet has typed, dictionary-encoded columns (needs pyarrow)")
+    ap.add_argument("--dedup", action="store_true",
+                    help="Keep perceptual-hash near-duplicate clusters (dedup_index.py) within one split")
+    ap.add_argument("--max-distance", type=int, default=6, help="With --dedup, max dHash Hamming distance")
+    ap.add_argument("--group-by-video", action="store_true", help="Keep all clips of a video within one split")
     args = ap.parse_args()
 
     random.seed(args.seed)
@@ -43,17 +58,15 @@ def main():
 
     # Load rows
     rows = []
-    with open(args.index, newline="", encoding="utf-8") as f:
-        r = csv.DictReader(f)
-        for row in r:
-            rows.append({
-                "clip_path": row["clip_path"],
-                "action": (row["action"] or "").strip().lower(),
-                "outcome": row["outcome"].strip(),
-                "player": row["player"],
-                "video_filename": row["video_filename"],
-                "t_event_sec": row["t_event_sec"],
-            })
+    for row in read_rows(args.index)[1]:
+        rows.append({
+            "clip_path": row["clip_path"],
+            "action": (row["action"] or "").strip().lower(),
+            "outcome": str(row["outcome"]).strip(),
+            "player": row["player"],
+            "video_filename": row["video_filename"],
+            "t_event_sec": row["t_event_sec"],
+        })
 
     # Group by action (for stratified split)
     by_action = defaultdict(list)
@@ -61,27 +74,60 @@ def main():
         by_action[row["action"]].append(row)
 
     train, val, test = [], [], []
+    capped = {}
     for action, items in by_action.items():
         random.shuffle(items)
         if args.per_action_cap and len(items) > args.per_action_cap:
             items = items[:args.per_action_cap]
-
-        n = len(items)
-        n_test = int(round(n * args.test_frac))
-        n_val  = int(round(n * args.val_frac))
-        n_train = n - n_val - n_test
-
-        test  += items[:n_test]
-        val   += items[n_test:n_test+n_val]
-        train += items[n_test+n_val:]
+        capped[action] = items
+
+    if args.dedup or args.group_by_video:
+        # Keep every near-duplicate cluster (and, with --group-by-video, every video) in one split
+        kept = [r for items in capped.values() for r in items]
+        if args.dedup:
+            from dedup_index import cluster_clips  # pulls in cv2/torch, so only when asked
+            groups = cluster_clips(kept, args.index, max_distance=args.max_distance,
+                                   group_by_video=args.group_by_video)
+        else:
+            groups = {r["clip_path"]: r["video_filename"] for r in kept}
+        members = defaultdict(list)
+        for r in kept:
+            members[groups.get(r["clip_path"], r["clip_path"])].append(r)
+
+        # Stratify by each group's majority action, then hand groups to the split
+        # furthest below its target size
+        by_major = defaultdict(list)
+        for g in sorted(members, key=str):
+            acts = defaultdict(int)
+            for r in members[g]: acts[r["action"]] += 1
+            by_major[min(acts, key=lambda a: (-acts[a], a))].append(g)
+        for action in sorted(by_major):
+            gs = by_major[action]
+            random.shuffle(gs)
+            n = sum(len(members[g]) for g in gs)
+            target = {"test": n * args.test_frac, "val": n * args.val_frac}
+            target["train"] = n - target["test"] - target["val"]
+            out = {"train": train, "val": val, "test": test}
+            filled = dict.fromkeys(out, 0)
+            for g in gs:
+                name = max(("train", "val", "test"), key=lambda k: target[k] - filled[k])
+                out[name] += members[g]
+                filled[name] += len(members[g])
+        n_multi = sum(1 for m in members.values() if len(m) > 1)
+        print(f"Grouped split: {len(members)} groups ({n_multi} with more than one clip), none shared across splits")
+    else:
+        for action, items in capped.items():
+            n = len(items)
+            n_test = int(round(n * args.test_frac))
+            n_val  = int(round(n * args.val_frac))
+            n_train = n - n_val - n_test
+
+            test  += items[:n_test]
+            val   += items[n_test:n_test+n_val]
+            train += items[n_test+n_val:]
 
     def write_split(name, data):
-        path = out_dir / f"{name}.csv"
-        with open(path, "w", newline="", encoding="utf-8") as f:
-            w = csv.DictWriter(f, fieldnames=list(train[0].keys()))
-            w.writeheader()
-            w.writerows(data)
-        return path
+        return write_rows(out_dir / f"{name}.{args.format}", data, list(rows[0].keys()))
 
     p_train = write_split("train", train)
     p_val   = write_split("val", val)
@@ -0,0 +1,159 @@
+"""
+motion_prefilter.py - Motion-Energy Prefilter for Full-Video Scans
+
+Most of a recreational match is dead time between rallies. This script measures how much
+the picture changes (mean absolute frame difference, or Farneback optical-flow magnitude)
+on tiny grayscale frames, keeps only high-activity segments, and reports how many frames
+that would skip versus how many hand-tagged events would be lost. detect_events.py uses the
+same functions (--motion-threshold) to send only active segments to the CNN.
+
+Main workflow:
+1. Decode every --stride-th frame, downscale to --width px wide grayscale
+2. Motion energy per sampled frame vs. the previous sample, smoothed over --smooth-sec
+3. Active = energy >= threshold x the video's median energy, dilated by --pad-sec
+   on both sides so rally starts/ends aren't clipped
+4. For each threshold: fraction of frames skipped, and recall of manifest events whose
+   t_event_sec falls inside an active segment (overall and per action)
+
+Usage:
+    python motion_prefilter.py --manifest data/manifest.csv --video-root data/videos
+    python motion_prefilter.py --manifest data/manifest.csv --video-root data/videos --rel-threshold 1,1.5,2,3 --method flow --out data/motion_report.json
+"""
+
+import argparse, json
+from collections import defaultdict
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from tables import read_rows
+
+def motion_energy(path, stride=5, width=64, method="diff", smooth_sec=0.5):
+    """
+    Motion energy of every stride-th frame as (times float64 [N], energy float32 [N]).
+    Frames are shrunk to `width` px wide grayscale before differencing, so the cost is
+    dominated by decoding. Returns empty arrays if the video cannot be read.
+    """
+    cap = cv2.VideoCapture(str(path))
+    if not cap.isOpened():
+        return np.zeros(0), np.zeros(0, dtype=np.float32)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    times, energy, prev, size, pos = [], [], None, None, 0
+    while cap.grab():
+        if pos % stride == 0:
+            ok, frame = cap.retrieve()
+            if ok:
+                if size is None:
+                    h, w = frame.shape[:2]
+                    size = (width, max(1, round(h * width / w)))
+                g = cv2.cvtColor(cv2.resize(frame, size, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+                if prev is None:
+                    e = 0.0
+                elif method == "flow":
+                    flow = cv2.calcOpticalFlowFarneback(prev, g, None, 0.5, 2, 9, 2, 5, 1.1, 0)
+                    e = float(np.sqrt((flow ** 2).sum(axis=2)).mean())
+                else:
+                    e = float(cv2.absdiff(g, prev).mean())
+                times.append(pos / fps)
+                energy.append(e)
+                prev = g
+        pos += 1
+    cap.release()
+    times, energy = np.asarray(times), np.asarray(energy, dtype=np.float32)
+    if len(energy) > 1:
+        energy[0] = energy[1]  # first sample has nothing to compare against
+        k = max(1, round(smooth_sec * fps / stride))
+        if k > 1:
+            energy = np.convolve(energy, np.ones(k, dtype=np.float32) / k, mode="same")
+    return times, energy
+
+def active_mask(times, energy, rel_threshold, pad_sec=1.5):
+    """Boolean [N]: energy >= rel_threshold x median, dilated by pad_sec each side."""
+    if not len(energy):
+        return np.zeros(0, dtype=bool)
+    active = energy >= rel_threshold * float(np.median(energy))
+    step = float(np.median(np.diff(times))) if len(times) > 1 else 1.0
+    pad = int(round(pad_sec / step)) if step > 0 else 0
+    if pad > 0:
+        active = np.convolve(active.astype(np.int32), np.ones(2 * pad + 1, dtype=np.int32), mode="same") > 0
+    return active
+
+def active_segments(times, active):
+    """[(start_sec, end_sec)] runs of consecutive active samples."""
+    d = np.diff(active.astype(np.int8), prepend=0, append=0)
+    starts, ends = np.flatnonzero(d == 1), np.flatnonzero(d == -1) - 1
+    return [(float(times[s]), float(times[e])) for s, e in zip(starts, ends)]
+
+def events_recalled(times, active, t_events):
+    """Boolean per event: is the sample nearest to t_event_sec active?"""
+    t_events = np.asarray(t_events, dtype=np.float64)
+    if not len(times):
+        return np.zeros(len(t_events), dtype=bool)
+    idx = np.clip(np.searchsorted(times, t_events), 1, len(times) - 1)
+    idx -= (t_events - times[idx - 1]) < (times[idx] - t_events)
+    return active[idx]
+
+def main():
+    ap = argparse.ArgumentParser(description="Frames skipped vs. tag recall for the motion-energy prefilter")
+    ap.add_argument("--manifest", required=True, help="manifest.csv (or .parquet) with hand tags")
+    ap.add_argument("--video-root", required=True, help="Folder containing the source videos")
+    ap.add_argument("--rel-threshold", default="1.0,1.5,2.0,3.0",
+                    help="Comma-separated thresholds, as multiples of each video's median energy")
+    ap.add_argument("--pad-sec", type=float, default=1.5, help="Keep this much context around active frames")
+    ap.add_argument("--stride", type=int, default=5, help="Measure every Nth frame (default 5)")
+    ap.add_argument("--width", type=int, default=64, help="Downscaled frame width in px (default 64)")
+    ap.add_argument("--method", choices=["diff", "flow"], default="diff", help="Frame difference or optical flow")
+    ap.add_argument("--smooth-sec", type=float, default=0.5, help="Moving-average window for the energy curve")
+    ap.add_argument("--out", default="", help="Optional JSON report path")
+    args = ap.parse_args()
+
+    thresholds = [float(x) for x in args.rel_threshold.split(",")]
+    events_by_video = defaultdict(list)
+    for row in read_rows(args.manifest)[1]:
+        try:
+            t = float(row["t_event_sec"])
+        except (TypeError, ValueError):
+            continue
+        events_by_video[str(row["video_filename"]).strip()].append((t, (row["action"] or "").strip().lower()))
+
+    curves = {}
+    for name in sorted(events_by_video):
+        src = Path(args.video_root) / name
+        times, energy = motion_energy(src, args.stride, args.width, args.method, args.smooth_sec)
+        if not len(times):
+            print(f"⚠️ Could not read {src}, skipped")
+            continue
+        curves[name] = (times, energy)
+        print(f"{name}: {len(times)} samples, median energy {np.median(energy):.2f}")
+    if not curves:
+        print("❌ No readable videos"); return
+
+    report = {}
+    print(f"\n{'rel thr':>7} {'skipped':>8} {'recall':>7}  per-action recall")
+    for thr in thresholds:
+        n_frames = n_skipped = 0
+        hits, totals = defaultdict(int), defaultdict(int)
+        for name, (times, energy) in curves.items():
+            active = active_mask(times, energy, thr, args.pad_sec)
+            n_frames += len(active)
+            n_skipped += int((~active).sum())
+            events = events_by_video[name]
+            for (_, action), hit in zip(events, events_recalled(times, active, [t for t, _ in events])):
+                totals[action] += 1
+                hits[action] += int(hit)
+        recall = sum(hits.values()) / max(sum(totals.values()), 1)
+        per_action = {a: round(hits[a] / totals[a], 3) for a in sorted(totals)}
+        report[str(thr)] = {"skipped_fraction": round(n_skipped / max(n_frames, 1), 4),
+                            "recall": round(recall, 4), "per_action_recall": per_action}
+        print(f"{thr:>7.2f} {n_skipped / max(n_frames, 1):>8.1%} {recall:>7.1%}  "
+              + " ".join(f"{a}={r:.0%}" for a, r in per_action.items()))
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"method": args.method, "stride": args.stride, "pad_sec": args.pad_sec,
+                       "thresholds": report}, f, indent=2)
+        print(f"Report → {args.out}")
+
+if __name__ == "__main__":
+    main()
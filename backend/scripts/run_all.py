@@ -0,0 +1,334 @@
+"""
+run_all.py - End-to-End Pipeline Runner (tags → manifest → clips → splits → train)
+
+This script runs the whole README flow as one dependency graph of stages instead of four
+scripts by hand. A stage is skipped when the fingerprint of its inputs, arguments and
+script source is unchanged since its last successful run, and every stage records how
+long it took, how much CPU and memory it used and its throughput.
+
+Main workflow:
+1. manifest - transform_csv.py over every raw export under --raw
+2. extract  - the manifest is split per source video and each video runs its own
+   extract_clips.py into clips/<video key>/, --jobs videos at a time. Videos whose tags and
+   source file are unchanged are skipped; the per-video indexes are merged into
+   clips/clips_index.csv
+3. splits   - make_splits.py on the merged index (--dedup passes through)
+4. train    - train_baseline_frame.py on the splits (skip with --until splits)
+Stages whose dependencies are done run concurrently (--max-parallel). --format picks CSV
+or Parquet for every table the stages write (manifest, indexes, splits).
+
+Fingerprints:
+- Table inputs (raw exports, manifests, indexes, splits) are hashed by content, so a stage
+  that re-runs and writes identical output does not invalidate the stages after it
+- Source videos (and anything over 64 MB) use size + mtime, like extract_clips.py's cache
+- The stage's script source and its command-line arguments are part of the fingerprint
+
+Usage:
+    python run_all.py --raw data/raw --video-root data/videos --work-dir data/run
+    python run_all.py --raw data/raw --video-root data/videos --work-dir data/run --jobs 4 --until splits
+    python run_all.py --raw data/raw --video-root data/videos --work-dir data/run --format parquet
+    python run_all.py --raw data/raw --video-root data/videos --work-dir data/run --force train --profile cprofile
+    python run_all.py --raw data/raw --video-root data/videos --work-dir data/run --train-args "--frame-cache data/run/frame_cache --amp"
+
+Output:
+    <work-dir>/manifest.csv, clips/, splits/         - stage outputs (.parquet tables with --format parquet)
+    <work-dir>/run_state.json                          - fingerprints of the last successful runs
+    <work-dir>/reports/run_<timestamp>.json            - per-stage status, wall/CPU seconds, peak RSS, items/s
+    <work-dir>/logs/<stage>.log                        - stage stdout/stderr
+    <work-dir>/profiles/<stage>.prof (.txt) / .svg     - with --profile cprofile / py-spy
+"""
+
+import argparse, hashlib, json, os, pstats, shlex, shutil, subprocess, sys, threading, time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from extract_clips import sanitize
+from tables import read_rows, write_rows
+
+SCRIPTS = Path(__file__).resolve().parent
+STATE_NAME = "run_state.json"
+HASH_LIMIT = 64 << 20
+STAGES = ["manifest", "extract", "splits", "train"]
+
+def video_key(video):
+    """Per-video sub-manifest / clips dir name: the full filename plus a short hash, so that
+    game1.mp4 and game1.mov, or names that sanitize alike, never share one."""
+    return f"{sanitize(video)}_{hashlib.sha1(video.encode('utf-8')).hexdigest()[:8]}"
+
+def file_signature(path):
+    """sha1 of the file's contents, or size:mtime for big files (videos); None if missing."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    if st.st_size > HASH_LIMIT:
+        return f"{st.st_size}:{st.st_mtime_ns}"
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def fingerprint(script, argv, inputs):
+    """One hash over the stage's script source, its arguments and its input files."""
+    blob = json.dumps({"script": file_signature(SCRIPTS / script), "argv": [str(a) for a in argv],
+                       "inputs": {str(p): file_signature(p) for p in sorted(map(str, inputs))}}, sort_keys=True)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+def run_script(script, argv, log_path, profile="none", profile_path=None):
+    """
+    Run one pipeline script as a child process, appending its output to log_path.
+    Returns (exit code, CPU seconds, peak RSS in MB); CPU/RSS are None where os.wait4
+    is unavailable (Windows).
+    """
+    cmd = [sys.executable, str(SCRIPTS / script), *map(str, argv)]
+    if profile == "cprofile":
+        cmd[1:1] = ["-m", "cProfile", "-o", f"{profile_path}.prof"]
+    elif profile == "py-spy":
+        cmd = ["py-spy", "record", "--subprocesses", "-o", f"{profile_path}.svg", "--"] + cmd
+    with open(log_path, "a", encoding="utf-8") as log:
+        log.write(f"$ {' '.join(shlex.quote(c) for c in cmd)}\n"); log.flush()
+        proc = subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT)
+        if not hasattr(os, "wait4"):
+            return proc.wait(), None, None
+        # wait4 gives this child's own rusage, so concurrent stages don't mix their numbers
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+    rss_mb = usage.ru_maxrss / (1 << 20 if sys.platform == "darwin" else 1 << 10)
+    if profile == "cprofile" and proc.returncode == 0:
+        with open(f"{profile_path}.txt", "w", encoding="utf-8") as f:
+            pstats.Stats(f"{profile_path}.prof", stream=f).sort_stats("cumulative").print_stats(30)
+    return proc.returncode, usage.ru_utime + usage.ru_stime, rss_mb
+
+def count_rows(path):
+    try:
+        return len(read_rows(path)[1])
+    except (OSError, KeyError, ValueError):
+        return 0
+
+class Pipeline:
+    """Stages, their fingerprints and the per-stage report of one run."""
+    def __init__(self, args):
+        self.args = args
+        self.work = Path(args.work_dir)
+        for sub in ("logs", "reports", "profiles"):
+            (self.work / sub).mkdir(parents=True, exist_ok=True)
+        self.ext = f".{args.format}"
+        self.manifest = self.work / f"manifest{self.ext}"
+        self.clips = self.work / "clips"
+        self.index = self.clips / f"clips_index{self.ext}"
+        self.splits = self.work / "splits"
+        self.split_tables = [self.splits / f"{n}{self.ext}" for n in ("train", "val", "test")]
+        self.state_path = self.work / STATE_NAME
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                self.state = json.load(f)
+        except (OSError, ValueError):
+            self.state = {}
+        self.lock = threading.Lock()
+        self.force = set(args.force.split(",")) if args.force else set()
+        if "all" in self.force:
+            self.force = set(STAGES)
+
+    def save_state(self):
+        with self.lock:
+            tmp = self.state_path.with_name(STATE_NAME + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.state, f, indent=1, sort_keys=True)
+            os.replace(tmp, self.state_path)
+
+    def step(self, key, stage, script, argv, inputs, outputs):
+        """
+        Run script unless key's fingerprint matches the last success and its outputs exist.
+        Returns a report dict (status ran / skipped / failed).
+        """
+        fp = fingerprint(script, argv, inputs)
+        if stage not in self.force and self.state.get(key) == fp and all(Path(o).exists() for o in outputs):
+            return {"status": "skipped", "wall_s": 0.0, "cpu_s": 0.0, "max_rss_mb": 0.0}
+        profile_path = self.work / "profiles" / sanitize(key.replace(":", "_"))
+        t0 = time.perf_counter()
+        code, cpu_s, rss_mb = run_script(script, argv, self.work / "logs" / f"{stage}.log",
+                                         self.args.profile, profile_path)
+        report = {"status": "ran" if code == 0 else "failed", "wall_s": round(time.perf_counter() - t0, 3),
+                  "cpu_s": None if cpu_s is None else round(cpu_s, 3),
+                  "max_rss_mb": None if rss_mb is None else round(rss_mb, 1)}
+        if code == 0:
+            with self.lock:
+                self.state[key] = fp
+            self.save_state()
+        else:
+            report["exit_code"] = code
+        return report
+
+    def stage_manifest(self):
+        from transform_csv import expand_inputs
+        raw = expand_inputs(self.args.raw)
+        if not raw:
+            return {"status": "failed", "error": f"no raw exports under {self.args.raw}"}
+        argv = ["--in", *raw, "--out", self.manifest]
+        report = self.step("manifest", "manifest", "transform_csv.py", argv, raw, [self.manifest])
+        report["items"] = count_rows(self.manifest)
+        return report
+
+    def stage_extract(self):
+        """One extract_clips.py per source video, --jobs at a time, then merge the indexes."""
+        fieldnames, rows = read_rows(self.manifest)
+        by_video = {}
+        for row in rows:
+            by_video.setdefault(str(row["video_filename"]).strip(), []).append(row)
+        per_video_dir = self.work / "manifests"
+        per_video_dir.mkdir(exist_ok=True)
+        video_root = Path(self.args.video_root)
+
+        def one(video):
+            stem = video_key(video)
+            sub_manifest = per_video_dir / f"{stem}{self.ext}"
+            if file_signature(sub_manifest) is None or read_rows(sub_manifest)[1] != by_video[video]:
+                write_rows(sub_manifest, by_video[video], fieldnames)
+            out_dir = self.clips / stem
+            sub_index = out_dir / f"clips_index{self.ext}"
+            argv = ["--manifest", sub_manifest, "--video-root", video_root, "--out-dir", out_dir,
+                    "--pre", self.args.pre, "--post", self.args.post, "--index-format", self.args.format,
+                    *shlex.split(self.args.extract_args)]
+            report = self.step(f"extract:{video}", "extract", "extract_clips.py", argv,
+                               [sub_manifest, video_root / video], [sub_index])
+            report["items"] = count_rows(sub_index)
+            return video, stem, report
+
+        videos = sorted(by_video)
+        with ThreadPoolExecutor(max_workers=max(1, self.args.jobs)) as ex:
+            results = list(ex.map(one, videos))
+
+        merged, index_fields = [], None
+        for _, stem, report in results:
+            if report["status"] == "failed":
+                continue
+            fields, sub_rows = read_rows(self.clips / stem / f"clips_index{self.ext}")
+            index_fields = index_fields or fields
+            merged += sub_rows
+        # rewrite only on change, so an unchanged index keeps its mtime for anyone watching it
+        if index_fields is not None and merged != (read_rows(self.index)[1] if self.index.exists() else None):
+            write_rows(self.index, merged, index_fields)
+
+        ran = [r for _, _, r in results if r["status"] != "skipped"]
+        cpu = [r["cpu_s"] for r in ran if r.get("cpu_s") is not None]
+        rss = [r["max_rss_mb"] for r in ran if r.get("max_rss_mb") is not None]
+        failed = [v for v, _, r in results if r["status"] == "failed"]
+        return {
+            "status": "failed" if failed else ("ran" if ran else "skipped"),
+            "cpu_s": round(sum(cpu), 3) if cpu else 0.0,
+            "max_rss_mb": max(rss) if rss else 0.0,
+            "items": len(merged),
+            "videos": {v: r for v, _, r in results},
+            **({"error": f"extract_clips failed for {', '.join(failed)}"} if failed else {}),
+        }
+
+    def stage_splits(self):
+        argv = ["--index", self.index, "--out-dir", self.splits, "--format", self.args.format,
+                *shlex.split(self.args.splits_args)]
+        if self.args.dedup:
+            argv.append("--dedup")
+        report = self.step("splits", "splits", "make_splits.py", argv, [self.index], self.split_tables)
+        report["items"] = sum(count_rows(p) for p in self.split_tables)
+        return report
+
+    def stage_train(self):
+        argv = ["--splits-dir", self.splits, "--epochs", self.args.epochs, "--batch-size", self.args.batch_size,
+                "--img-size", self.args.img_size, *shlex.split(self.args.train_args)]
+        inputs = list(self.split_tables)
+        # clip caches change when a clip is re-cut under the same path (new source, new window)
+        inputs += sorted(self.clips.glob("*/clips_cache.json"))
+        report = self.step("train", "train", "train_baseline_frame.py", argv, inputs,
+                           [self.splits / "baseline_resnet18.pt"])
+        # images seen during training (train split x epochs)
+        report["items"] = count_rows(inputs[0]) * self.args.epochs
+        return report
+
+def run_graph(stages, deps, max_parallel=2):
+    """
+    Run {name: fn} respecting deps ({name: [names]}), starting every stage whose
+    dependencies succeeded as soon as a slot frees up. Stages after a failure are 'blocked'.
+    Returns {name: report} with wall_s and throughput filled in.
+    """
+    reports, pending, order = {}, {}, list(stages)
+    with ThreadPoolExecutor(max_workers=max_parallel) as ex:
+        while len(reports) < len(order):
+            for name in order:
+                if name in reports or name in pending.values():
+                    continue
+                states = [reports.get(d, {}).get("status") for d in deps.get(name, [])]
+                if any(s in ("failed", "blocked") for s in states):
+                    reports[name] = {"status": "blocked"}
+                    print(f"⏭️  {name:<9} blocked by a failed dependency")
+                elif all(s in ("ran", "skipped") for s in states):
+                    t0 = time.perf_counter()
+                    pending[ex.submit(lambda fn=stages[name], t0=t0: (fn(), time.perf_counter() - t0))] = name
+            if not pending:
+                continue
+            done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+            for fut in done:
+                name = pending.pop(fut)
+                try:
+                    report, wall = fut.result()
+                except Exception as e:  # a stage's own bookkeeping crashed; report it like a failed script
+                    report, wall = {"status": "failed", "error": repr(e)}, 0.0
+                report["wall_s"] = round(wall, 3)
+                items = report.get("items")
+                if items is not None and report["status"] == "ran" and wall > 0:
+                    report["items_per_s"] = round(items / wall, 2)
+                reports[name] = report
+                icon = {"ran": "✅", "skipped": "⏭️ ", "failed": "❌"}[report["status"]]
+                mem = f" | peak {report['max_rss_mb']:.0f} MB" if report.get("max_rss_mb") else ""
+                rate = f" | {report['items_per_s']:.1f} items/s" if "items_per_s" in report else ""
+                print(f"{icon} {name:<9} {report['status']:<7} {wall:7.2f}s | items {items if items is not None else '-'}"
+                      f"{mem}{rate}" + (f" | {report['error']}" if "error" in report else ""))
+    return reports
+
+def main():
+    ap = argparse.ArgumentParser(description="Run tags → manifest → clips → splits → train with cached stages")
+    ap.add_argument("--raw", nargs="+", required=True, help="Raw tag exports: files, directories or globs")
+    ap.add_argument("--video-root", required=True, help="Directory containing the source videos")
+    ap.add_argument("--work-dir", required=True, help="Where stage outputs, state, logs and reports go")
+    ap.add_argument("--jobs", type=int, default=max(1, (os.cpu_count() or 1) // 2),
+                    help="Videos extracted concurrently (default: half the cores)")
+    ap.add_argument("--max-parallel", type=int, default=2, help="Independent stages run at the same time")
+    ap.add_argument("--until", choices=STAGES, default="train", help="Last stage to run")
+    ap.add_argument("--force", default="", help="Comma-separated stages to re-run regardless of fingerprints (or 'all')")
+    ap.add_argument("--profile", choices=["none", "cprofile", "py-spy"], default="none",
+                    help="Profile every stage that runs (cProfile .prof + top-30 .txt, or a py-spy flame graph)")
+    ap.add_argument("--pre", type=float, default=1.0)
+    ap.add_argument("--post", type=float, default=2.0)
+    ap.add_argument("--format", choices=["csv", "parquet"], default="csv",
+                    help="Manifest, clips index and split tables as CSV or Parquet (needs pyarrow)")
+    ap.add_argument("--dedup", action="store_true", help="Pass --dedup to make_splits.py")
+    ap.add_argument("--epochs", type=int, default=5)
+    ap.add_argument("--batch-size", type=int, default=32)
+    ap.add_argument("--img-size", type=int, default=224)
+    ap.add_argument("--extract-args", default="", help="Extra arguments for extract_clips.py (quoted)")
+    ap.add_argument("--splits-args", default="", help="Extra arguments for make_splits.py (quoted)")
+    ap.add_argument("--train-args", default="", help="Extra arguments for train_baseline_frame.py (quoted)")
+    args = ap.parse_args()
+    if args.profile == "py-spy" and not shutil.which("py-spy"):
+        print("⚠️  py-spy not found on PATH (pip install py-spy); running without profiling")
+        args.profile = "none"
+
+    pipe = Pipeline(args)
+    wanted = STAGES[:STAGES.index(args.until) + 1]
+    stages = {name: getattr(pipe, f"stage_{name}") for name in wanted}
+    deps = {"extract": ["manifest"], "splits": ["extract"], "train": ["splits"]}
+
+    t0 = time.perf_counter()
+    reports = run_graph(stages, deps, max_parallel=max(1, args.max_parallel))
+    wall = time.perf_counter() - t0
+
+    stamp = time.strftime("%Y%m%d_%H%M%S")
+    report_path = pipe.work / "reports" / f"run_{stamp}.json"
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump({"started": stamp, "wall_s": round(wall, 3), "args": vars(args), "stages": reports}, f, indent=2)
+    ran = [n for n, r in reports.items() if r["status"] == "ran"]
+    print(f"Pipeline: {wall:.1f}s, ran {len(ran)}/{len(reports)} stages → {report_path}")
+    if any(r["status"] in ("failed", "blocked") for r in reports.values()):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+tables.py - Table I/O shared by the pipeline scripts (CSV or Parquet)
+
+manifest, clips_index and the train/val/test splits can be stored either as CSV (the
+default, and the compatibility export) or as Parquet, picked by file extension. Parquet
+files have typed columns (float seconds, int event ids) and dictionary-encoded repeated
+strings (action, player, outcome, video ids), so they are smaller and load much faster
+than re-parsing CSV text row by row. Parquet needs pyarrow (pip install pyarrow).
+
+read_rows() returns csv.DictReader-style dicts from either format, so scripts that work
+row by row don't care which one they got; read_columns() returns whole columns for code
+that can work on arrays directly.
+
+Usage (convert between formats):
+    python tables.py data/manifest.csv data/manifest.parquet
+    python tables.py data/splits/train.parquet data/splits/train.csv
+"""
+import argparse, csv, os
+from pathlib import Path
+
+PARQUET_EXTS = (".parquet", ".pq")
+DICT_COLUMNS = {"action", "player", "outcome", "video_id", "video_filename"}
+FLOAT_COLUMNS = {"t_event_sec", "pre", "post", "clip_start", "clip_end", "confidence"}
+INT_COLUMNS = {"event_id"}
+
+def is_parquet(path):
+    return str(path).lower().endswith(PARQUET_EXTS)
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("❌ Parquet files need pyarrow (pip install pyarrow)")
+    return pa, pq
+
+def find_table(directory, stem):
+    """directory/stem.parquet or directory/stem.csv, whichever was written last."""
+    found = [p for p in (Path(directory) / f"{stem}{ext}" for ext in PARQUET_EXTS + (".csv",)) if p.exists()]
+    if not found:
+        return Path(directory) / f"{stem}.csv"
+    return max(found, key=lambda p: p.stat().st_mtime_ns)
+
+def read_rows(path):
+    """(fieldnames, [row dict]) from a CSV or Parquet table. Parquet nulls come back as ""."""
+    if not is_parquet(path):
+        with open(path, newline="", encoding="utf-8") as f:
+            r = csv.DictReader(f)
+            return list(r.fieldnames or []), list(r)
+    _, pq = _pyarrow()
+    table = pq.read_table(path)
+    names = table.column_names
+    cols = [_pylist(table.column(n)) for n in names]
+    return names, [dict(zip(names, vals)) for vals in zip(*cols)]
+
+def _pylist(col):
+    """Column as a Python list with nulls as "". numpy's tolist() is far faster than
+    Arrow's to_pylist() for dictionary-encoded strings, so use it when there are no nulls."""
+    if col.null_count == 0:
+        return col.to_numpy().tolist()
+    return ["" if v is None else v for v in col.to_pylist()]
+
+def read_columns(path, columns=None):
+    """{name: column} for the given (default all) columns; numpy arrays for Parquet, lists for CSV."""
+    if not is_parquet(path):
+        fieldnames, rows = read_rows(path)
+        return {n: [r[n] for r in rows] for n in (columns or fieldnames)}
+    _, pq = _pyarrow()
+    table = pq.read_table(path, columns=columns)
+    return {n: table.column(n).to_numpy() for n in table.column_names}
+
+def _column(pa, name, values):
+    """Typed Arrow array for a column, falling back to plain strings if a value doesn't parse."""
+    values = [None if v is None or v == "" else v for v in values]
+    try:
+        if name in FLOAT_COLUMNS:
+            return pa.array([None if v is None else float(v) for v in values], type=pa.float64())
+        if name in INT_COLUMNS:
+            return pa.array([None if v is None else int(v) for v in values], type=pa.int64())
+    except (TypeError, ValueError):
+        pass
+    arr = pa.array([None if v is None else str(v) for v in values], type=pa.string())
+    return arr.dictionary_encode() if name in DICT_COLUMNS else arr
+
+def write_rows(path, rows, fieldnames):
+    """Write row dicts to path (CSV or Parquet by extension) via a temp file + rename."""
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    if is_parquet(path):
+        pa, pq = _pyarrow()
+        table = pa.table({n: _column(pa, n, [r.get(n) for r in rows]) for n in fieldnames})
+        pq.write_table(table, tmp)
+    else:
+        with open(tmp, "w", newline="", encoding="utf-8") as f:
+            w = csv.DictWriter(f, fieldnames=fieldnames, extrasaction="ignore")
+            w.writeheader()
+            w.writerows(rows)
+    os.replace(tmp, path)
+    return path
+
+def main():
+    ap = argparse.ArgumentParser(description="Convert a pipeline table between CSV and Parquet")
+    ap.add_argument("src", help="Input .csv or .parquet")
+    ap.add_argument("dst", help="Output .csv or .parquet")
+    args = ap.parse_args()
+    fieldnames, rows = read_rows(args.src)
+    write_rows(args.dst, rows, fieldnames)
+    print(f"✅ {len(rows)} rows: {args.src} → {args.dst}")
+
+if __name__ == "__main__":
+    main()
@@ -23,161 +23,619 @@ Model Architecture:
 - Input: 224x224 RGB images (center frames from clips)
 - Output: Action classification probabilities
 
+ClipDataset (for temporal models, not used by this baseline's training loop):
+- Samples e.g. 8–16 uniformly spaced (or jittered) frames per clip
+- Decodes each clip once, front to back, instead of seeking per frame
+- Returns uint8 [T, C, H, W]; normalize on the batch/device
+
+Frame cache (optional, --frame-cache DIR):
+- Decodes each clip's center frame once at --img-size into a uint8 .npy memory map
+- A JSON sidecar maps clip_path -> row plus the clip's size/mtime
+- Later runs only re-decode clips that changed; a new --img-size gets its own cache
+
+Distributed data parallel (launch with torchrun; gloo backend by default):
+- Every rank loads the same seeded, max_per_class-capped split, then a DistributedSampler
+  gives each rank a disjoint shard of it, reshuffled every epoch
+- Gradients are averaged across ranks; --batch-size is per process
+- Val/test are sharded too and the loss/accuracy sums are all-reduced
+- Only rank 0 builds the frame cache, prints and writes the checkpoint
+- bench_ddp_scaling.py measures throughput and scaling efficiency for 1/2/4/8 processes
+
 Usage:
     python train_baseline_frame.py --splits-dir data/splits --epochs 10 --batch-size 32
+    python train_baseline_frame.py --splits-dir data/splits --frame-cache data/frame_cache
+    torchrun --nproc-per-node 4 train_baseline_frame.py --splits-dir data/splits --frame-cache data/frame_cache
+    torchrun --nnodes 2 --node-rank 0 --nproc-per-node 8 --master-addr node0 --master-port 29500 train_baseline_frame.py --splits-dir data/splits
 
 Output:
     data/splits/baseline_resnet18.pt - Best model checkpoint with class mappings
 """
-import argparse, csv, os, random
+import argparse, json, os, random, time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import cv2
+import numpy as np
 import torch
+import torch.distributed as dist
 import torch.nn as nn
-from torch.utils.data import Dataset, DataLoader
+import torch.nn.functional as F
+from torch.nn.parallel import DistributedDataParallel
+from torch.utils.data import Dataset, DataLoader, Subset
+from torch.utils.data.distributed import DistributedSampler
 from torchvision import models, transforms
 
-class FrameDataset(Dataset):
-    def __init__(self, split_csv, class_to_idx, img_size=224, max_per_class=0, seed=42):
-        self.samples = []
-        random.seed(seed)
-        with open(split_csv, newline="", encoding="utf-8") as f:
-            r = csv.DictReader(f)
-            by_class = {}
-            for row in r:
-                a = row["action"]
-                by_class.setdefault(a, []).append(row)
-            for a, items in by_class.items():
-                random.shuffle(items)
-                if max_per_class and len(items) > max_per_class:
-                    items = items[:max_per_class]
-                self.samples.extend(items)
+from tables import find_table, read_rows
+
+def read_clip_frame(path):
+    """Center frame of a clip as RGB uint8 (first frame if seeking fails), or None."""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened(): return None
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or 1
+    center_idx = max(0, frame_count // 2)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, center_idx)
+    ok, frame = cap.read()
+    cap.release()
+    if not ok or frame is None:
+        # if broken, try first frame
+        cap = cv2.VideoCapture(path)
+        ok, frame = cap.read(); cap.release()
+        if not ok or frame is None: return None
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+def build_frame_cache(clip_paths, cache_dir, img_size=224, workers=None):
+    """
+    Decode each clip's center frame at img_size into cache_dir/frames_<img_size>.npy
+    (uint8 [N, H, W, 3]) with a frames_<img_size>.json sidecar mapping clip_path -> row.
+    Rows whose clip file size/mtime are unchanged are copied over instead of re-decoded.
+    Clips that cannot be decoded are left out (and remembered, so an unchanged cache is
+    never rewritten). Returns (npy path, {clip_path: row}).
+    """
+    cache_dir = Path(cache_dir); cache_dir.mkdir(parents=True, exist_ok=True)
+    npy_path = cache_dir / f"frames_{img_size}.npy"
+    idx_path = cache_dir / f"frames_{img_size}.json"
+    resize = transforms.Compose([transforms.ToPILImage(), transforms.Resize((img_size, img_size))])
+
+    old_clips, old_failed, old_frames = {}, {}, None
+    if idx_path.exists() and npy_path.exists():
+        with open(idx_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("img_size") == img_size:
+            old_clips = meta["clips"]
+            old_failed = meta.get("failed", {})
+            old_frames = np.load(npy_path, mmap_mode="r")
+
+    def stamp(p):
+        try:
+            st = os.stat(p)
+            return [st.st_size, st.st_mtime_ns]
+        except OSError:
+            return None
+
+    clip_paths = sorted(set(clip_paths))
+    stamps = {p: stamp(p) for p in clip_paths}
+    fresh = [p for p in clip_paths
+             if (p not in old_clips or old_clips[p]["stamp"] != stamps[p])
+             and (p not in old_failed or old_failed[p] != stamps[p])]
+    if not fresh and set(old_clips) | set(old_failed) == set(clip_paths):
+        return npy_path, {p: e["row"] for p, e in old_clips.items()}
+
+    def decode(p):
+        img = read_clip_frame(p)
+        return None if img is None else np.asarray(resize(img))
 
+    # cv2 releases the GIL while decoding, so threads are enough here
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as ex:
+        decoded = dict(zip(fresh, ex.map(decode, fresh)))
+
+    keep = [p for p in clip_paths if (p in decoded and decoded[p] is not None) or
+            (p not in decoded and p in old_clips)]
+    tmp_path = cache_dir / f"frames_{img_size}.tmp.npy"
+    frames = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.uint8,
+                                       shape=(len(keep), img_size, img_size, 3))
+    clips = {}
+    for row, p in enumerate(keep):
+        frames[row] = decoded[p] if p in decoded else old_frames[old_clips[p]["row"]]
+        clips[p] = {"row": row, "stamp": stamps[p]}
+    frames.flush(); del frames, old_frames
+    os.replace(tmp_path, npy_path)
+    failed = {p: stamps[p] for p in clip_paths if p not in clips}
+    with open(idx_path, "w", encoding="utf-8") as f:
+        json.dump({"img_size": img_size, "clips": clips, "failed": failed}, f)
+    print(f"Frame cache: {len(keep)} clips ({len(fresh)} decoded) → {npy_path}")
+    return npy_path, {p: e["row"] for p, e in clips.items()}
+
+def load_split(split_csv, max_per_class=0, seed=42):
+    """Rows of a split file (CSV or Parquet), shuffled per class and capped at max_per_class (0 = no cap)."""
+    samples = []
+    random.seed(seed)
+    by_class = {}
+    for row in read_rows(split_csv)[1]:
+        a = row["action"]
+        by_class.setdefault(a, []).append(row)
+    for a, items in by_class.items():
+        random.shuffle(items)
+        if max_per_class and len(items) > max_per_class:
+            items = items[:max_per_class]
+        samples.extend(items)
+    return samples
+
+def sample_indices(frame_count, num_frames, rng=None):
+    """
+    num_frames indices spread uniformly over frame_count frames (segment centers).
+    With rng, each index is drawn at random inside its segment instead (temporal jitter).
+    Short clips repeat indices rather than returning fewer frames.
+    """
+    seg = frame_count / num_frames
+    if rng is None:
+        return [min(frame_count - 1, int((i + 0.5) * seg)) for i in range(num_frames)]
+    return [min(frame_count - 1, int(i * seg + rng.random() * seg)) for i in range(num_frames)]
+
+def read_clip_frames(path, num_frames, img_size=224, rng=None):
+    """
+    Decode a clip front to back once and keep num_frames sampled frames as RGB uint8
+    [T, img_size, img_size, 3]. Skipped frames are only grabbed (no color conversion or copy).
+    Returns None if nothing could be decoded.
+    """
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened(): return None
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    if frame_count <= 0:
+        # container has no frame count; decode everything and sample afterwards
+        frames = []
+        while True:
+            ok, frame = cap.read()
+            if not ok: break
+            frames.append(frame)
+        cap.release()
+        if not frames: return None
+        picks = [frames[i] for i in sample_indices(len(frames), num_frames, rng)]
+    else:
+        wanted = sample_indices(frame_count, num_frames, rng)
+        picks, last, frame = [], None, None
+        pos = 0
+        for idx in wanted:
+            if idx != last:
+                frame = None
+                while pos <= idx:
+                    if not cap.grab(): break
+                    pos += 1
+                else:
+                    ok, frame = cap.retrieve()
+                    if not ok: frame = None
+                last = idx
+            if frame is None: break
+            picks.append(frame)
+        cap.release()
+        if not picks: return None
+        # the container over-reported its length; pad with the last decoded frame
+        picks += [picks[-1]] * (num_frames - len(picks))
+    out = np.empty((num_frames, img_size, img_size, 3), dtype=np.uint8)
+    for i, frame in enumerate(picks):
+        cv2.cvtColor(cv2.resize(frame, (img_size, img_size), interpolation=cv2.INTER_AREA),
+                     cv2.COLOR_BGR2RGB, dst=out[i])
+    return out
+
+IMAGENET_MEAN = [0.485,0.456,0.406]
+IMAGENET_STD = [0.229,0.224,0.225]
+
+class FrameDataset(Dataset):
+    def __init__(self, split_csv, class_to_idx, img_size=224, max_per_class=0, seed=42, frame_cache=None,
+                 uint8_output=False):
+        """
+        frame_cache: optional (npy path, {clip_path: row}) from build_frame_cache.
+        uint8_output: return uint8 [C, H, W] at img_size and leave float conversion,
+        normalization and augmentation to BatchTransform.
+        """
+        self.samples = load_split(split_csv, max_per_class=max_per_class, seed=seed)
+        self.img_size = img_size
+        self.uint8_output = uint8_output
         self.class_to_idx = class_to_idx
+        # The memmap is opened lazily so DataLoader workers each map the file instead of
+        # receiving a pickled copy of it
+        self.cache_path, self.cache_rows = frame_cache or (None, {})
+        self._frames = None
+        self.cached_transform = transforms.Compose([
+            transforms.ToTensor(),
+            transforms.Normalize(mean=IMAGENET_MEAN, std=IMAGENET_STD),
+        ])
         self.transform = transforms.Compose([
             transforms.ToPILImage(),
             transforms.Resize((img_size, img_size)),
             transforms.ToTensor(),
-            transforms.Normalize(mean=[0.485,0.456,0.406],
-                                 std=[0.229,0.224,0.225]),
+            transforms.Normalize(mean=IMAGENET_MEAN, std=IMAGENET_STD),
         ])
 
     def __len__(self): return len(self.samples)
 
-    def _read_center_frame(self, path):
-        cap = cv2.VideoCapture(path)
-        if not cap.isOpened(): return None
-        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or 1
-        center_idx = max(0, frame_count // 2)
-        cap.set(cv2.CAP_PROP_POS_FRAMES, center_idx)
-        ok, frame = cap.read()
-        cap.release()
-        if not ok or frame is None: return None
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        return frame
-
     def __getitem__(self, idx):
         row = self.samples[idx]
-        img = self._read_center_frame(row["clip_path"])
+        y = self.class_to_idx[row["action"]]
+        cache_row = self.cache_rows.get(row["clip_path"])
+        if cache_row is not None:
+            if self._frames is None:
+                # copy-on-write map: slices are zero-copy views that torch can wrap
+                self._frames = np.load(self.cache_path, mmap_mode="c")
+            if self.uint8_output:
+                return torch.from_numpy(self._frames[cache_row]).permute(2, 0, 1), y
+            return self.cached_transform(self._frames[cache_row]), y
+        img = read_clip_frame(row["clip_path"])
+        if self.uint8_output:
+            if img is None:
+                img = (255 * torch.rand(self.img_size, self.img_size, 3).numpy()).astype("uint8")
+            img = cv2.resize(img, (self.img_size, self.img_size), interpolation=cv2.INTER_AREA)
+            return torch.from_numpy(img).permute(2, 0, 1), y
         if img is None:
-            # if broken, try first frame
-            cap = cv2.VideoCapture(row["clip_path"])
-            ok, img = cap.read(); cap.release()
-            if not ok or img is None:
-                img = (255 * torch.rand(224,224,3).numpy()).astype("uint8")
-            else:
-                img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+            img = (255 * torch.rand(224,224,3).numpy()).astype("uint8")
         x = self.transform(img)
+        return x, y
+
+class ClipDataset(Dataset):
+    """
+    num_frames uniformly spaced frames per clip from a single sequential decode.
+    Items are uint8 [T, C, H, W] tensors; normalization is left to the batch/device.
+    jitter=True samples a random frame inside each segment (use for training only).
+    """
+    def __init__(self, split_csv, class_to_idx, num_frames=8, img_size=224, max_per_class=0, seed=42, jitter=False):
+        self.samples = load_split(split_csv, max_per_class=max_per_class, seed=seed)
+        self.class_to_idx = class_to_idx
+        self.num_frames = num_frames
+        self.img_size = img_size
+        self.jitter = jitter
+        self.seed = seed
+        self.epoch = 0
+
+    def __len__(self): return len(self.samples)
+
+    def set_epoch(self, epoch):
+        """Jitter offsets depend on (seed, epoch, idx), so runs are reproducible across workers."""
+        self.epoch = epoch
+
+    def __getitem__(self, idx):
+        row = self.samples[idx]
+        rng = random.Random(hash((self.seed, self.epoch, idx))) if self.jitter else None
+        clip = read_clip_frames(row["clip_path"], self.num_frames, img_size=self.img_size, rng=rng)
+        if clip is None:
+            clip = np.zeros((self.num_frames, self.img_size, self.img_size, 3), dtype=np.uint8)
+        x = torch.from_numpy(clip).permute(0, 3, 1, 2).contiguous()
         y = self.class_to_idx[row["action"]]
         return x, y
 
-def train_one_epoch(model, loader, opt, loss_fn, device):
+class BatchTransform(nn.Module):
+    """
+    Turns a uint8 batch [B, C, H, W] (or clips [B, T, C, H, W]) into normalized float on
+    the batch's device, so workers only ship bytes and the math runs vectorized.
+    With augment, each sample (each clip, shared by its frames) gets a random
+    scale/translate crop, horizontal flip and brightness/contrast jitter in one
+    affine_grid/grid_sample pass, which also resizes to img_size.
+    """
+    def __init__(self, img_size=224, augment=False, scale=(0.8, 1.0), flip_p=0.5, jitter=0.2):
+        super().__init__()
+        self.img_size = img_size
+        self.augment = augment
+        self.scale = scale
+        self.flip_p = flip_p
+        self.jitter = jitter
+        self.register_buffer("mean", torch.tensor(IMAGENET_MEAN).view(1, 3, 1, 1))
+        self.register_buffer("std", torch.tensor(IMAGENET_STD).view(1, 3, 1, 1))
+
+    @torch.no_grad()
+    def forward(self, x, train=False):
+        clip_shape = x.shape if x.dim() == 5 else None
+        if clip_shape is not None:
+            x = x.flatten(0, 1)
+        x = x.float().div_(255)
+        if train and self.augment:
+            n = clip_shape[0] if clip_shape is not None else x.size(0)
+            rand = lambda: torch.rand(n, device=x.device)
+            s = self.scale[0] + (self.scale[1] - self.scale[0]) * rand()
+            flip = torch.where(rand() < self.flip_p, -1.0, 1.0)
+            theta = torch.zeros(n, 2, 3, device=x.device)
+            theta[:, 0, 0] = s * flip
+            theta[:, 1, 1] = s
+            theta[:, 0, 2] = (1 - s) * (2 * rand() - 1)
+            theta[:, 1, 2] = (1 - s) * (2 * rand() - 1)
+            bright = 1 + self.jitter * (2 * rand() - 1)
+            contrast = 1 + self.jitter * (2 * rand() - 1)
+            if clip_shape is not None:
+                t = clip_shape[1]
+                theta, bright, contrast = (v.repeat_interleave(t, 0) for v in (theta, bright, contrast))
+            grid = F.affine_grid(theta, [x.size(0), x.size(1), self.img_size, self.img_size], align_corners=False)
+            x = F.grid_sample(x, grid, mode="bilinear", padding_mode="reflection", align_corners=False)
+            mean = x.mean(dim=(1, 2, 3), keepdim=True)
+            x = ((x - mean) * contrast.view(-1, 1, 1, 1) + mean) * bright.view(-1, 1, 1, 1)
+            x = x.clamp_(0, 1)
+        elif x.shape[-2:] != (self.img_size, self.img_size):
+            x = F.interpolate(x, size=(self.img_size, self.img_size), mode="bilinear",
+                              antialias=True, align_corners=False)
+        x = (x - self.mean) / self.std
+        if clip_shape is not None:
+            x = x.view(clip_shape[0], clip_shape[1], *x.shape[1:])
+        return x
+
+def make_loader(ds, args, shuffle, num_workers=None, sampler=None):
+    """DataLoader with the worker/prefetch/pinning options from the CLI."""
+    num_workers = args.workers if num_workers is None else num_workers
+    kw = dict(batch_size=args.batch_size, shuffle=shuffle and sampler is None, sampler=sampler,
+              num_workers=num_workers, pin_memory=args.pin_memory and torch.cuda.is_available())
+    if num_workers > 0:
+        kw.update(prefetch_factor=args.prefetch_factor, persistent_workers=args.persistent_workers)
+    return DataLoader(ds, **kw)
+
+def autotune_workers(ds, args, max_batches=10):
+    """
+    Time a few batches of ds for each candidate worker count and return the fastest.
+    The first batch is not timed, so worker start-up does not count against a setting.
+    """
+    cpus = os.cpu_count() or 1
+    candidates = sorted({0, 1, 2, 4, 8, 16, 32, cpus} & set(range(cpus + 1)))
+    best, best_rate = args.workers, 0.0
+    print("Autotuning loader workers:")
+    for n in candidates:
+        it = iter(make_loader(ds, args, shuffle=True, num_workers=n))
+        if next(it, None) is None:
+            return args.workers
+        seen, t0 = 0, time.perf_counter()
+        for _, (x, _) in zip(range(max_batches), it):
+            seen += x.size(0)
+        secs = time.perf_counter() - t0
+        del it
+        rate = seen / secs if secs > 0 else 0.0
+        print(f"  workers={n:<3} {rate:8.1f} samples/s")
+        if rate > best_rate:
+            best, best_rate = n, rate
+    print(f"Using {best} loader workers")
+    return best
+
+def dist_setup(backend="gloo"):
+    """
+    (rank, world_size, local_rank, local_world_size) from torchrun's environment. Starts the
+    process group when there is more than one process; a plain `python` run is rank 0 of 1.
+    """
+    world = int(os.environ.get("WORLD_SIZE", "1"))
+    if world <= 1:
+        return 0, 1, 0, 1
+    dist.init_process_group(backend)
+    local_world = int(os.environ.get("LOCAL_WORLD_SIZE", world))
+    return dist.get_rank(), world, int(os.environ.get("LOCAL_RANK", 0)), local_world
+
+def all_reduce_sum(t):
+    """Sum a tensor across ranks in place (no-op outside distributed runs)."""
+    if dist.is_available() and dist.is_initialized():
+        dist.all_reduce(t)
+    return t
+
+def shard(ds, rank, world):
+    """Every world-th sample starting at rank, so eval shards cover ds exactly once."""
+    return ds if world == 1 else Subset(ds, range(rank, len(ds), world))
+
+def amp_setup(device):
+    """
+    Autocast dtype and GradScaler for --amp: fp16 + loss scaling on CUDA, bf16 (no scaling
+    needed) on CPU. Returns (None, None) when this CPU cannot run bf16 autocast.
+    """
+    if device.type == "cuda":
+        try:
+            scaler = torch.amp.GradScaler("cuda")
+        except AttributeError:  # torch < 2.3
+            scaler = torch.cuda.amp.GradScaler()
+        return torch.float16, scaler
+    try:
+        with torch.autocast("cpu", dtype=torch.bfloat16):
+            torch.nn.functional.conv2d(torch.ones(1, 1, 3, 3), torch.ones(1, 1, 1, 1))
+    except RuntimeError:
+        return None, None
+    return torch.bfloat16, None
+
+def train_one_epoch(model, loader, opt, loss_fn, device, batch_tf=None, timing=None,
+                    amp_dtype=None, scaler=None, channels_last=False, log_every=0):
+    """
+    timing: optional dict that receives data_s (waiting on the loader), compute_s and images.
+    amp_dtype/scaler: from amp_setup for mixed precision; channels_last: NHWC inputs.
+    Loss/accuracy are summed on the device and read back once per epoch (or every
+    log_every steps when logging), so steps never block on a host sync. In distributed
+    runs the returned loss/accuracy and timing["images"] cover all ranks.
+    """
     model.train()
-    total, correct, loss_sum = 0, 0, 0.0
-    for x, y in loader:
-        x, y = x.to(device), y.to(device)
+    total = 0
+    loss_sum = torch.zeros((), device=device)
+    correct = torch.zeros((), dtype=torch.long, device=device)
+    data_s = compute_s = 0.0
+    t_mark = time.perf_counter()
+    for step, (x, y) in enumerate(loader, 1):
+        t_got = time.perf_counter()
+        data_s += t_got - t_mark
+        x, y = x.to(device, non_blocking=True), y.to(device, non_blocking=True)
+        if batch_tf is not None:
+            x = batch_tf(x, train=True)
+        if channels_last:
+            x = x.contiguous(memory_format=torch.channels_last)
         opt.zero_grad()
-        logits = model(x)
-        loss = loss_fn(logits, y)
-        loss.backward(); opt.step()
-        loss_sum += loss.item() * x.size(0)
-        pred = logits.argmax(1)
-        correct += (pred == y).sum().item()
+        with torch.autocast(device.type, dtype=amp_dtype, enabled=amp_dtype is not None):
+            logits = model(x)
+            loss = loss_fn(logits, y)
+        if scaler is not None:
+            scaler.scale(loss).backward(); scaler.step(opt); scaler.update()
+        else:
+            loss.backward(); opt.step()
+        loss_sum += loss.detach().float() * x.size(0)
+        correct += (logits.argmax(1) == y).sum()
         total += x.size(0)
+        if log_every and step % log_every == 0:
+            print(f"  step {step:05d} | loss {loss_sum.item()/total:.4f} acc {correct.item()/total:.3f}")
+        t_mark = time.perf_counter()
+        compute_s += t_mark - t_got
+    stats = all_reduce_sum(torch.stack([loss_sum.float(), correct.float(),
+                                        torch.tensor(float(total), device=device)]))
+    loss_sum, correct, total = stats.tolist()
+    total = int(total)
+    if timing is not None:
+        # the .item() above waits for queued device work; count it as compute
+        compute_s += time.perf_counter() - t_mark
+        timing.update(data_s=data_s, compute_s=compute_s, images=total)
     return loss_sum/total, correct/total
 
 @torch.no_grad()
-def evaluate(model, loader, loss_fn, device):
+def evaluate(model, loader, loss_fn, device, batch_tf=None, amp_dtype=None, channels_last=False):
     model.eval()
-    total, correct, loss_sum = 0, 0, 0.0
+    total = 0
+    loss_sum = torch.zeros((), device=device)
+    correct = torch.zeros((), dtype=torch.long, device=device)
     for x, y in loader:
-        x, y = x.to(device), y.to(device)
-        logits = model(x)
-        loss = loss_fn(logits, y)
-        loss_sum += loss.item() * x.size(0)
-        pred = logits.argmax(1)
-        correct += (pred == y).sum().item()
+        x, y = x.to(device, non_blocking=True), y.to(device, non_blocking=True)
+        if batch_tf is not None:
+            x = batch_tf(x)
+        if channels_last:
+            x = x.contiguous(memory_format=torch.channels_last)
+        with torch.autocast(device.type, dtype=amp_dtype, enabled=amp_dtype is not None):
+            logits = model(x)
+            loss = loss_fn(logits, y)
+        loss_sum += loss.float() * x.size(0)
+        correct += (logits.argmax(1) == y).sum()
         total += x.size(0)
+    stats = all_reduce_sum(torch.stack([loss_sum.float(), correct.float(),
+                                        torch.tensor(float(total), device=device)]))
+    loss_sum, correct, total = stats.tolist()
     return loss_sum/total, correct/total
 
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument("--splits-dir", required=True, help="Dir with train.csv/val.csv/test.csv")
+    ap.add_argument("--splits-dir", required=True, help="Dir with train/val/test .csv (or .parquet)")
     ap.add_argument("--epochs", type=int, default=5)
     ap.add_argument("--batch-size", type=int, default=32)
     ap.add_argument("--img-size", type=int, default=224)
     ap.add_argument("--max-per-class", type=int, default=0, help="cap per class for quick runs")
     ap.add_argument("--lr", type=float, default=1e-3)
     ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--frame-cache", default="", help="Dir for the decoded frame cache (empty = decode every epoch)")
+    ap.add_argument("--batch-transforms", action="store_true",
+                    help="Load uint8 frames and convert/normalize whole batches on the training device")
+    ap.add_argument("--augment", action="store_true",
+                    help="With --batch-transforms, random crop/flip/color jitter on training batches")
+    ap.add_argument("--workers", type=int, default=2, help="DataLoader worker processes (default 2)")
+    ap.add_argument("--prefetch-factor", type=int, default=2, help="Batches prefetched per worker (default 2)")
+    ap.add_argument("--persistent-workers", action="store_true", help="Keep loader workers alive between epochs")
+    ap.add_argument("--no-pin-memory", dest="pin_memory", action="store_false", help="Disable pinned host memory")
+    ap.add_argument("--autotune-loader", action="store_true",
+                    help="Measure samples/s across worker counts on the train split and use the fastest")
+    ap.add_argument("--amp", action="store_true",
+                    help="Mixed precision: fp16 autocast + grad scaling on CUDA, bf16 autocast on CPU")
+    ap.add_argument("--channels-last", action="store_true", help="Use NHWC (channels_last) memory format")
+    ap.add_argument("--log-every", type=int, default=0, help="Print running train loss/acc every K steps (0 = per epoch only)")
+    ap.add_argument("--dist-backend", default="gloo", help="torch.distributed backend under torchrun (default gloo)")
+    ap.add_argument("--threads", type=int, default=0,
+                    help="Intra-op threads per process (default: all cores, split evenly between local ranks under torchrun)")
     args = ap.parse_args()
+    if args.augment and not args.batch_transforms:
+        ap.error("--augment requires --batch-transforms")
+
+    rank, world, local_rank, local_world = dist_setup(args.dist_backend)
+    if args.threads or world > 1:
+        # torchrun sets OMP_NUM_THREADS=1; give each local rank its share of the cores instead
+        torch.set_num_threads(args.threads or max(1, (os.cpu_count() or 1) // local_world))
+    log = print if rank == 0 else (lambda *a, **k: None)
+    if world > 1:
+        log(f"Distributed: {world} processes ({args.dist_backend}), {torch.get_num_threads()} threads each, "
+            f"global batch {args.batch_size * world}")
 
     random.seed(args.seed); torch.manual_seed(args.seed)
 
     # Build label space from train split
-    train_csv = Path(args.splits_dir) / "train.csv"
-    val_csv   = Path(args.splits_dir) / "val.csv"
-    test_csv  = Path(args.splits_dir) / "test.csv"
+    train_csv = find_table(args.splits_dir, "train")
+    val_csv   = find_table(args.splits_dir, "val")
+    test_csv  = find_table(args.splits_dir, "test")
 
     actions = set()
-    with open(train_csv, newline="", encoding="utf-8") as f:
-        r = csv.DictReader(f)
-        for row in r: actions.add((row["action"] or "").strip().lower())
+    for row in read_rows(train_csv)[1]: actions.add((row["action"] or "").strip().lower())
     actions = sorted(actions)
     class_to_idx = {a:i for i,a in enumerate(actions)}
-    print("Classes:", class_to_idx)
+    log("Classes:", class_to_idx)
+
+    # One-time decode of every split's frames into a shared memory-mapped cache
+    frame_cache = None
+    if args.frame_cache:
+        clip_paths = []
+        for split_csv in (train_csv, val_csv, test_csv):
+            clip_paths += [row["clip_path"] for row in read_rows(split_csv)[1]]
+        # Rank 0 decodes first. Then the first rank on each other node builds its node's copy,
+        # a no-op when storage is shared, a local decode when it is not. The remaining ranks
+        # then find an up-to-date cache and only read its index. Ranks of one node never
+        # write the same files at once.
+        build = lambda: build_frame_cache(clip_paths, args.frame_cache, img_size=args.img_size)
+        if rank == 0:
+            frame_cache = build()
+        if world > 1:
+            dist.barrier()
+            if local_rank == 0 and rank != 0:
+                frame_cache = build()
+            dist.barrier()
+            if local_rank != 0:
+                frame_cache = build()
 
     # Datasets/Loaders
-    train_ds = FrameDataset(train_csv, class_to_idx, img_size=args.img_size, max_per_class=args.max_per_class, seed=args.seed)
-    val_ds   = FrameDataset(val_csv,   class_to_idx, img_size=args.img_size, max_per_class=0, seed=args.seed)
-    test_ds  = FrameDataset(test_csv,  class_to_idx, img_size=args.img_size, max_per_class=0, seed=args.seed)
+    ds_kw = dict(img_size=args.img_size, seed=args.seed, frame_cache=frame_cache, uint8_output=args.batch_transforms)
+    train_ds = FrameDataset(train_csv, class_to_idx, max_per_class=args.max_per_class, **ds_kw)
+    val_ds   = FrameDataset(val_csv,   class_to_idx, max_per_class=0, **ds_kw)
+    test_ds  = FrameDataset(test_csv,  class_to_idx, max_per_class=0, **ds_kw)
 
-    train_ld = DataLoader(train_ds, batch_size=args.batch_size, shuffle=True, num_workers=2, pin_memory=True)
-    val_ld   = DataLoader(val_ds,   batch_size=args.batch_size, shuffle=False, num_workers=2, pin_memory=True)
-    test_ld  = DataLoader(test_ds,  batch_size=args.batch_size, shuffle=False, num_workers=2, pin_memory=True)
+    if args.autotune_loader:
+        # shuffling during the probe must not change the training run's batch order
+        rng_state = torch.get_rng_state()
+        args.workers = autotune_workers(train_ds, args)
+        torch.set_rng_state(rng_state)
+    # Every rank holds the same capped sample list; the sampler shards it per epoch
+    train_sampler = DistributedSampler(train_ds, num_replicas=world, rank=rank, shuffle=True,
+                                       seed=args.seed) if world > 1 else None
+    train_ld = make_loader(train_ds, args, shuffle=True, sampler=train_sampler)
+    val_ld   = make_loader(shard(val_ds, rank, world),  args, shuffle=False)
+    test_ld  = make_loader(shard(test_ds, rank, world), args, shuffle=False)
 
     # Model
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    device = torch.device(f"cuda:{local_rank}" if torch.cuda.is_available() else "cpu")
     model = models.resnet18(weights=models.ResNet18_Weights.DEFAULT)
     model.fc = nn.Linear(model.fc.in_features, len(class_to_idx))
     model.to(device)
+    if args.channels_last:
+        model.to(memory_format=torch.channels_last)
+    net = model
+    if world > 1:
+        net = DistributedDataParallel(model, device_ids=[local_rank] if device.type == "cuda" else None)
+    amp_dtype, scaler = amp_setup(device) if args.amp else (None, None)
+    if args.amp and amp_dtype is None:
+        log("⚠️  bf16 autocast is not supported on this CPU; training in fp32")
+    batch_tf = BatchTransform(args.img_size, augment=args.augment).to(device) if args.batch_transforms else None
 
     opt = torch.optim.AdamW(model.parameters(), lr=args.lr)
     loss_fn = nn.CrossEntropyLoss()
 
     best_val = 0.0
     for epoch in range(1, args.epochs+1):
-        tr_loss, tr_acc = train_one_epoch(model, train_ld, opt, loss_fn, device)
-        va_loss, va_acc = evaluate(model, val_ld, loss_fn, device)
-        print(f"Epoch {epoch:02d} | train loss {tr_loss:.4f} acc {tr_acc:.3f} | val loss {va_loss:.4f} acc {va_acc:.3f}")
-        if va_acc > best_val:
+        if train_sampler is not None:
+            train_sampler.set_epoch(epoch)
+        timing = {}
+        tr_loss, tr_acc = train_one_epoch(net, train_ld, opt, loss_fn, device, batch_tf, timing=timing,
+                                          amp_dtype=amp_dtype, scaler=scaler, channels_last=args.channels_last,
+                                          log_every=args.log_every if rank == 0 else 0)
+        va_loss, va_acc = evaluate(net, val_ld, loss_fn, device, batch_tf,
+                                   amp_dtype=amp_dtype, channels_last=args.channels_last)
+        log(f"Epoch {epoch:02d} | train loss {tr_loss:.4f} acc {tr_acc:.3f} | val loss {va_loss:.4f} acc {va_acc:.3f}")
+        busy = timing["data_s"] + timing["compute_s"]
+        log(f"         data wait {timing['data_s']:.1f}s ({100 * timing['data_s'] / busy if busy else 0:.0f}%)"
+            f" | compute {timing['compute_s']:.1f}s | {timing['images'] / busy if busy else 0:.1f} img/s")
+        # val metrics are all-reduced, so rank 0 sees the global accuracy; only it writes
+        if va_acc > best_val and rank == 0:
             best_val = va_acc
-            torch.save({"model": model.state_dict(),
-                        "class_to_idx": class_to_idx},
+            # fp32 weights in the default layout, loadable without --amp/--channels-last
+            torch.save({"model": {k: v.contiguous() for k, v in model.state_dict().items()},
+                        "class_to_idx": class_to_idx,
+                        "img_size": args.img_size},
                        Path(args.splits_dir) / "baseline_resnet18.pt")
 
-    te_loss, te_acc = evaluate(model, test_ld, loss_fn, device)
-    print(f"TEST  | loss {te_loss:.4f} acc {te_acc:.3f}")
+    te_loss, te_acc = evaluate(net, test_ld, loss_fn, device, batch_tf,
+                               amp_dtype=amp_dtype, channels_last=args.channels_last)
+    log(f"TEST  | loss {te_loss:.4f} acc {te_acc:.3f}")
+    if world > 1:
+        dist.destroy_process_group()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,262 @@
+"""
+train_embedding_head.py - Frozen-Backbone Embedding Cache + Fast Head Sweeps
+
+Hyperparameter sweeps with train_baseline_frame.py re-run the full ResNet-18 forward and
+backward pass over the same frames for every config. This script runs the ImageNet
+backbone once per clip, stores its 512-d pooled embeddings in a float16 memory map, and
+then trains only a small head on that matrix, so a sweep of dozens of configs takes
+seconds to minutes.
+
+Main workflow:
+1. Collect clip_paths from train/val/test.csv
+2. Embed each clip once (frozen ResNet-18, fc removed) into
+   <cache-dir>/emb_<img_size>_t<T>.npy (float16 [N, T, 512]) with a JSON sidecar mapping
+   clip_path -> row plus the clip's size/mtime; later runs only embed changed clips
+   - T = 1 (default): the clip's center frame, exactly as the baseline sees it
+   - T > 1 (--num-frames): T uniformly spaced frames, for the temporal head
+3. Train a head for every config in the grid (--head x --lr x --weight-decay x --epochs)
+   - linear: nn.Linear(512, C) on the time-averaged embedding
+   - temporal: Conv1d over the per-frame embeddings + mean pooling + Linear
+4. Pick the config with the best val accuracy, report its test accuracy
+
+Usage:
+    python train_embedding_head.py --splits-dir data/splits --cache-dir data/emb_cache
+    python train_embedding_head.py --splits-dir data/splits --cache-dir data/emb_cache --lr 1e-3,3e-3,1e-2 --weight-decay 0,1e-4,1e-3 --epochs 50,100
+    python train_embedding_head.py --splits-dir data/splits --cache-dir data/emb_cache --num-frames 8 --head linear,temporal
+
+Output:
+    data/splits/head_sweep.json            - val/test accuracy of every config
+    data/splits/linear_head_resnet18.pt    - best linear head on the frozen backbone (--save),
+                                             same format as baseline_resnet18.pt
+
+Embeddings are computed without augmentation, so this is for fast model selection; the
+best config can be fine-tuned end to end with train_baseline_frame.py afterwards.
+"""
+import argparse, itertools, json, os, time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import torch
+import torch.nn as nn
+from torchvision import models, transforms
+
+from tables import find_table, read_rows
+from train_baseline_frame import BatchTransform, read_clip_frame, read_clip_frames
+
+EMB_DIM = 512
+
+def backbone(device):
+    """ImageNet ResNet-18 with the classifier removed (outputs 512-d pooled features)."""
+    model = models.resnet18(weights=models.ResNet18_Weights.DEFAULT)
+    model.fc = nn.Identity()
+    return model.to(device).eval()
+
+def decode_clip(path, num_frames, img_size, resize):
+    """uint8 [T, H, W, 3] RGB at img_size, or None. T = 1 uses the center frame like FrameDataset."""
+    if num_frames == 1:
+        img = read_clip_frame(path)
+        return None if img is None else np.asarray(resize(img))[None]
+    return read_clip_frames(path, num_frames, img_size=img_size)
+
+def build_embedding_cache(clip_paths, cache_dir, img_size=224, num_frames=1, batch_size=64,
+                          device=None, workers=None):
+    """
+    Embed every clip once into cache_dir/emb_<img_size>_t<num_frames>.npy (float16
+    [N, T, 512]) with a JSON sidecar mapping clip_path -> row. Rows whose clip file
+    size/mtime are unchanged are copied over instead of re-embedded; clips that cannot
+    be decoded are left out (and remembered, so an unchanged cache is never rewritten).
+    Returns (npy path, {clip_path: row}).
+    """
+    cache_dir = Path(cache_dir); cache_dir.mkdir(parents=True, exist_ok=True)
+    name = f"emb_{img_size}_t{num_frames}"
+    npy_path, idx_path = cache_dir / f"{name}.npy", cache_dir / f"{name}.json"
+    device = device or torch.device("cpu")
+
+    old_clips, old_failed, old_emb = {}, {}, None
+    if idx_path.exists() and npy_path.exists():
+        with open(idx_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        old_clips = meta["clips"]
+        old_failed = meta.get("failed", {})
+        old_emb = np.load(npy_path, mmap_mode="r")
+
+    def stamp(p):
+        try:
+            st = os.stat(p)
+            return [st.st_size, st.st_mtime_ns]
+        except OSError:
+            return None
+
+    clip_paths = sorted(set(clip_paths))
+    stamps = {p: stamp(p) for p in clip_paths}
+    fresh = [p for p in clip_paths
+             if (p not in old_clips or old_clips[p]["stamp"] != stamps[p])
+             and (p not in old_failed or old_failed[p] != stamps[p])]
+    if not fresh and set(old_clips) | set(old_failed) == set(clip_paths):
+        return npy_path, {p: e["row"] for p, e in old_clips.items()}
+
+    model = backbone(device)
+    batch_tf = BatchTransform(img_size).to(device)
+    resize = transforms.Compose([transforms.ToPILImage(), transforms.Resize((img_size, img_size))])
+    embedded = {}
+    t0 = time.perf_counter()
+    # decode one batch of clips at a time on threads (cv2 releases the GIL), embed on device
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as ex, torch.no_grad():
+        for i in range(0, len(fresh), batch_size):
+            chunk = fresh[i:i + batch_size]
+            decoded = ex.map(lambda p: decode_clip(p, num_frames, img_size, resize), chunk)
+            clips = [(p, c) for p, c in zip(chunk, decoded) if c is not None]
+            if not clips: continue
+            x = torch.from_numpy(np.stack([c for _, c in clips])).to(device)  # [B, T, H, W, 3]
+            x = batch_tf(x.permute(0, 1, 4, 2, 3))
+            feats = model(x.flatten(0, 1)).view(len(clips), num_frames, EMB_DIM)
+            for (p, _), f in zip(clips, feats.half().cpu().numpy()):
+                embedded[p] = f
+
+    keep = [p for p in clip_paths if p in embedded or (p not in fresh and p in old_clips)]
+    tmp_path = cache_dir / f"{name}.tmp.npy"
+    emb = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float16,
+                                    shape=(len(keep), num_frames, EMB_DIM))
+    clips = {}
+    for row, p in enumerate(keep):
+        emb[row] = embedded[p] if p in embedded else old_emb[old_clips[p]["row"]]
+        clips[p] = {"row": row, "stamp": stamps[p]}
+    emb.flush(); del emb, old_emb
+    os.replace(tmp_path, npy_path)
+    failed = {p: stamps[p] for p in clip_paths if p not in clips}
+    with open(idx_path, "w", encoding="utf-8") as f:
+        json.dump({"img_size": img_size, "num_frames": num_frames, "clips": clips, "failed": failed}, f)
+    print(f"Embedding cache: {len(keep)} clips ({len(embedded)} embedded in "
+          f"{time.perf_counter() - t0:.1f}s) → {npy_path}")
+    return npy_path, {p: e["row"] for p, e in clips.items()}
+
+class TemporalHead(nn.Module):
+    """Small temporal head over per-frame embeddings [B, T, 512] -> logits [B, C]."""
+    def __init__(self, num_classes, hidden=256, dropout=0.2):
+        super().__init__()
+        self.conv = nn.Conv1d(EMB_DIM, hidden, kernel_size=3, padding=1)
+        self.drop = nn.Dropout(dropout)
+        self.fc = nn.Linear(hidden, num_classes)
+
+    def forward(self, x):
+        h = torch.relu(self.conv(x.transpose(1, 2))).mean(dim=2)
+        return self.fc(self.drop(h))
+
+class LinearHead(nn.Module):
+    """nn.Linear on the time-averaged embedding; with T = 1 this is the baseline's fc layer."""
+    def __init__(self, num_classes):
+        super().__init__()
+        self.fc = nn.Linear(EMB_DIM, num_classes)
+
+    def forward(self, x):
+        return self.fc(x.mean(dim=1))
+
+def split_tensors(split_csv, emb, rows, class_to_idx, device):
+    """(float32 [N, T, 512], int64 [N]) for the clips of a split that are in the cache."""
+    idx, ys = [], []
+    for row in read_rows(split_csv)[1]:
+        r = rows.get(row["clip_path"])
+        if r is None: continue
+        idx.append(r); ys.append(class_to_idx[(row["action"] or "").strip().lower()])
+    x = torch.from_numpy(np.asarray(emb[sorted(idx)] if idx else np.zeros((0,) + emb.shape[1:]), dtype=np.float32))
+    order = np.argsort(np.argsort(idx))  # undo the sort used for a sequential memmap read
+    return x[torch.from_numpy(order)].to(device), torch.tensor(ys, dtype=torch.long, device=device)
+
+def train_head(cfg, data, num_classes, batch_size, seed):
+    """Train one head config on in-memory embeddings; returns (model, best val acc, test acc at best val)."""
+    torch.manual_seed(seed)
+    (xtr, ytr), (xva, yva), (xte, yte) = data
+    head = (TemporalHead if cfg["head"] == "temporal" else LinearHead)(num_classes).to(xtr.device)
+    opt = torch.optim.AdamW(head.parameters(), lr=cfg["lr"], weight_decay=cfg["weight_decay"])
+    loss_fn = nn.CrossEntropyLoss()
+
+    def acc(x, y):
+        head.eval()
+        with torch.no_grad():
+            return (head(x).argmax(1) == y).float().mean().item() if len(y) else 0.0
+
+    best_val, best_test, best_state = -1.0, 0.0, None
+    for _ in range(cfg["epochs"]):
+        head.train()
+        perm = torch.randperm(len(ytr), device=xtr.device)
+        for i in range(0, len(perm), batch_size):
+            b = perm[i:i + batch_size]
+            opt.zero_grad(set_to_none=True)
+            loss_fn(head(xtr[b]), ytr[b]).backward()
+            opt.step()
+        va = acc(xva, yva)
+        if va > best_val:
+            best_val, best_test = va, acc(xte, yte)
+            best_state = {k: v.detach().clone() for k, v in head.state_dict().items()}
+    head.load_state_dict(best_state)
+    return head, best_val, best_test
+
+def main():
+    ap = argparse.ArgumentParser(description="Embed clips once with a frozen ResNet-18, then sweep small heads")
+    ap.add_argument("--splits-dir", required=True, help="Dir with train/val/test .csv (or .parquet)")
+    ap.add_argument("--cache-dir", required=True, help="Dir for the float16 embedding cache")
+    ap.add_argument("--img-size", type=int, default=224)
+    ap.add_argument("--num-frames", type=int, default=1, help="Frames embedded per clip (1 = center frame)")
+    ap.add_argument("--head", default="linear", help="Comma-separated: linear,temporal")
+    ap.add_argument("--lr", default="1e-3,3e-3,1e-2", help="Comma-separated learning rates")
+    ap.add_argument("--weight-decay", default="0,1e-4,1e-2", help="Comma-separated AdamW weight decays")
+    ap.add_argument("--epochs", default="50", help="Comma-separated epoch counts")
+    ap.add_argument("--batch-size", type=int, default=64)
+    ap.add_argument("--embed-batch-size", type=int, default=64, help="Clips per backbone forward pass")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--save", action="store_true",
+                    help="Save the best linear head (T = 1) as a full ResNet-18 checkpoint")
+    args = ap.parse_args()
+
+    splits = Path(args.splits_dir)
+    csvs = {s: find_table(splits, s) for s in ("train", "val", "test")}
+    actions, clip_paths = set(), []
+    for s, p in csvs.items():
+        for row in read_rows(p)[1]:
+            clip_paths.append(row["clip_path"])
+            if s == "train": actions.add((row["action"] or "").strip().lower())
+    class_to_idx = {a: i for i, a in enumerate(sorted(actions))}
+    print("Classes:", class_to_idx)
+
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    torch.manual_seed(args.seed)
+    npy_path, rows = build_embedding_cache(clip_paths, args.cache_dir, img_size=args.img_size,
+                                           num_frames=args.num_frames, batch_size=args.embed_batch_size,
+                                           device=device)
+    emb = np.load(npy_path, mmap_mode="r")
+    data = [split_tensors(csvs[s], emb, rows, class_to_idx, device) for s in ("train", "val", "test")]
+    print(f"Embeddings: train {len(data[0][1])} | val {len(data[1][1])} | test {len(data[2][1])}")
+
+    grid = [dict(head=h, lr=float(lr), weight_decay=float(wd), epochs=int(ep))
+            for h, lr, wd, ep in itertools.product(args.head.split(","), args.lr.split(","),
+                                                    args.weight_decay.split(","), args.epochs.split(","))]
+    results, best, best_va = [], None, -1.0
+    t0 = time.perf_counter()
+    for cfg in grid:
+        head, va, te = train_head(cfg, data, len(class_to_idx), args.batch_size, args.seed)
+        results.append({**cfg, "val_acc": round(va, 4), "test_acc": round(te, 4)})
+        print(f"{cfg['head']:<8} lr {cfg['lr']:<7g} wd {cfg['weight_decay']:<7g} ep {cfg['epochs']:<4d}"
+              f"| val acc {va:.3f} | test acc {te:.3f}")
+        if va > best_va:
+            best, best_va = (head, results[-1]), va
+    print(f"{len(grid)} configs in {time.perf_counter() - t0:.1f}s")
+    print(f"BEST  | {best[1]}")
+
+    with open(splits / "head_sweep.json", "w", encoding="utf-8") as f:
+        json.dump({"img_size": args.img_size, "num_frames": args.num_frames, "configs": results,
+                   "best": best[1]}, f, indent=2)
+
+    if args.save:
+        if best[1]["head"] != "linear" or args.num_frames != 1:
+            print("⚠️  --save needs the best config to be a linear head on --num-frames 1; not saved")
+            return
+        model = backbone("cpu")
+        model.fc = nn.Linear(EMB_DIM, len(class_to_idx))
+        model.fc.load_state_dict({k.removeprefix("fc."): v.cpu() for k, v in best[0].state_dict().items()})
+        out = splits / "linear_head_resnet18.pt"
+        torch.save({"model": model.state_dict(), "class_to_idx": class_to_idx, "img_size": args.img_size}, out)
+        print(f"Saved → {out}")
+
+if __name__ == "__main__":
+    main()
@@ -6,18 +6,26 @@ ML-ready format. It handles various input formats, standardizes column names,
 normalizes data values, and outputs a consistent manifest.csv for training.
 
 Main workflow:
-1. Read raw CSV with flexible column mapping
+1. Read one or more raw CSVs (files, directories or globs), in parallel, resolving the
+   flexible column mapping once per file header
 2. Parse and validate timestamps 
 3. Standardize action names and outcomes
 4. Clean video filenames
-5. Remove duplicates
-6. Output clean manifest.csv
+5. Remove duplicates across all inputs, keyed on (video, time, action, player)
+6. Output one clean manifest.csv with sequential event_ids (stable for the same inputs)
 
 Usage:
     python transform_csv.py --in raw_export.csv --out manifest.csv
+    python transform_csv.py --in raw_export.csv --out manifest.parquet   (typed columns, needs pyarrow)
+    python transform_csv.py --in data/raw/ --out manifest.csv --jobs 6
+    python transform_csv.py --in "data/raw/*_match*.csv" extra.csv --out manifest.csv
 """
 
-import argparse,csv,re
+import argparse,csv,glob,os,re,time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from tables import write_rows
 
 IN_COLS = {
     "event_id":  ["Event ID", "event_id", "id"],
@@ -29,11 +37,7 @@ IN_COLS = {
     "video_id":  ["Video ID", "video_id", "video"],
 }
 
-def first(row,names):
-    for n in names:
-        if n in row and str(row[n].strip() != ""):
-            return row[n]
-    return ""
+MANIFEST_FIELDS = ["event_id", "video_id", "video_filename", "t_event_sec", "action", "player", "outcome"]
 
 _TIME = re.compile(r"^\s*(\d+):(\d+)(?:\.(\d+))?\s*$")
 
@@ -74,88 +78,153 @@ def video_id_to_filename(video_id):
     m = _EXT.search(s)
     return s[:m.end()] if m else s
 
-def transform_csv(in_path, out_path):
-    total = written = skipped = 0
-    counts = {}
-    seen = set()
-    
-    with open(in_path, newline="", encoding="utf-8-sig") as fin, \
-         open(out_path, "w", newline="", encoding="utf-8") as fout:
-        
-        r = csv.DictReader(fin)
-        w = csv.DictWriter(fout, fieldnames=[
-            "event_id", "video_id", "video_filename", "t_event_sec", "action", "player", "outcome"
-        ])
-        w.writeheader()
-        
-        event_counter = 1
-        
+def resolve_columns(fieldnames):
+    """
+    Map each logical column to one header position: its first alias present in this file
+    (even if a row leaves it empty), the last column of that name if the header repeats it.
+    """
+    pos = {name: i for i, name in enumerate(fieldnames or [])}
+    return {key: next((pos[n] for n in names if n in pos), None) for key, names in IN_COLS.items()}
+
+def pick(row, i):
+    """Value at a resolved position ("" if the column is absent or the row is short)."""
+    return row[i] if i is not None and i < len(row) else ""
+
+def parse_export(in_path, max_examples=5):
+    """
+    Parse one raw export. The column mapping is resolved once from its header.
+    Returns (records, rows read, {error: count}, first few "row N: error" examples);
+    records are (video_id, video_filename, t_sec, action, player, outcome) in file order.
+    """
+    records, errors, examples = [], {}, []
+    total = 0
+    with open(in_path, newline="", encoding="utf-8-sig") as fin:
+        r = csv.reader(fin)
+        cols = resolve_columns(next(r, []))
         for row in r:
+            if not row:  # blank line
+                continue
             total += 1
             try:
                 # Get raw data
-                event_id = first(row, IN_COLS["event_id"])
-                ts_val = first(row, IN_COLS["timestamp"])
-                time_str = first(row, IN_COLS["time"])
-                raw_act = first(row, IN_COLS["event_type"])
-                player = first(row, IN_COLS["player"])
-                outc = first(row, IN_COLS["outcome"])
-                vid_id = first(row, IN_COLS["video_id"])
-                
+                ts_val = pick(row, cols["timestamp"])
+                time_str = pick(row, cols["time"])
+                raw_act = pick(row, cols["event_type"])
+                player = pick(row, cols["player"])
+                outc = pick(row, cols["outcome"])
+                vid_id = pick(row, cols["video_id"])
+
                 # Parse and clean data
                 t_sec = parse_time_to_seconds(time_str, ts_val)
                 action = canonicalize_action(raw_act)
                 outcome = normalize_outcome(outc)
-                
+
                 # FIX: Clean video name extraction
                 # Remove "video_" prefix and extract base name
                 clean_video_name = vid_id.replace("video_", "").split("_")[0]
-                
+
                 # IMPORTANT: Remove .mp4 if it exists, then add it back
                 if clean_video_name.endswith(".mp4"):
                     clean_video_name = clean_video_name[:-4]  # Remove .mp4
-                
+
                 # Now create the clean filename
                 clean_filename = f"{clean_video_name}.mp4"
-                
-                # Check for duplicates
-                key = (clean_video_name, round(t_sec, 3), action, player)
-                if key in seen:
-                    skipped += 1
-                    continue
-                seen.add(key)
-                
-                # Write clean data
-                w.writerow({
-                    "event_id": event_counter,
-                    "video_id": clean_video_name,        
-                    "video_filename": clean_filename,    
-                    "t_event_sec": f"{t_sec:.3f}",
-                    "action": action,
-                    "player": player,
-                    "outcome": outcome,
-                })
-                
-                written += 1
-                event_counter += 1
-                counts[action] = counts.get(action, 0) + 1
-                
+                records.append((clean_video_name, clean_filename, t_sec, action, player, outcome))
             except Exception as e:
-                print(f"Skipping row {total}: {e}")
+                errors[str(e)] = errors.get(str(e), 0) + 1
+                if len(examples) < max_examples:
+                    examples.append(f"row {total}: {e}")
+    return records, total, errors, examples
+
+def expand_inputs(inputs):
+    """Files, directories (*.csv inside) and glob patterns → sorted, de-duplicated file list."""
+    paths = set()
+    for item in inputs:
+        p = Path(item)
+        if p.is_dir():
+            paths.update(p.glob("*.csv"))
+        elif any(ch in item for ch in "*?["):
+            paths.update(Path(g) for g in glob.glob(item, recursive=True))
+        else:
+            paths.add(p)
+    return sorted(paths)
+
+def transform_csv(in_paths, out_path, jobs=None):
+    """
+    Merge one or more raw exports into a single manifest. Files are parsed in parallel,
+    then merged in sorted path order, so dedup (first occurrence wins) and the sequential
+    event_ids are the same on every run no matter which worker finishes first.
+    """
+    if isinstance(in_paths, (str, Path)):
+        in_paths = [in_paths]
+    in_paths = [str(p) for p in in_paths]
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(in_paths)))
+
+    t0 = time.perf_counter()
+    if jobs == 1:
+        parsed = [parse_export(p) for p in in_paths]
+    else:
+        # row parsing is pure Python, so use processes rather than threads
+        with ProcessPoolExecutor(max_workers=jobs) as ex:
+            parsed = list(ex.map(parse_export, in_paths))
+    parse_s = time.perf_counter() - t0
+
+    total = written = skipped = 0
+    counts = {}
+    seen = set()
+    out_rows = []
+    event_counter = 1
+    for path, (records, n_rows, errors, examples) in zip(in_paths, parsed):
+        total += n_rows
+        n_bad = sum(errors.values())
+        skipped += n_bad
+        if n_bad:
+            print(f"Skipping {n_bad} bad rows in {path}: " + "; ".join(f"{e} ×{c}" for e, c in errors.items()))
+            for ex_line in examples:
+                print(f"  {ex_line}")
+        for clean_video_name, clean_filename, t_sec, action, player, outcome in records:
+            # Check for duplicates (across every input file)
+            key = (clean_video_name, round(t_sec, 3), action, player)
+            if key in seen:
                 skipped += 1
                 continue
-        
-        print(f"Read {total} rows → wrote {written}, skipped {skipped}")
-        if counts: 
-            print("Action counts:", counts)
+            seen.add(key)
+
+            # Write clean data
+            out_rows.append({
+                "event_id": event_counter,
+                "video_id": clean_video_name,
+                "video_filename": clean_filename,
+                "t_event_sec": f"{t_sec:.3f}",
+                "action": action,
+                "player": player,
+                "outcome": outcome,
+            })
+            written += 1
+            event_counter += 1
+            counts[action] = counts.get(action, 0) + 1
+
+    # .parquet output gets typed / dictionary-encoded columns; anything else is CSV
+    write_rows(out_path, out_rows, MANIFEST_FIELDS)
+    wall = time.perf_counter() - t0
+    print(f"Read {total} rows → wrote {written}, skipped {skipped}")
+    if counts: 
+        print("Action counts:", counts)
+    print(f"Throughput: {len(in_paths)} files, {total / parse_s if parse_s else 0.0:,.0f} rows/s parsing "
+          f"with {jobs} job(s), {wall:.2f}s total")
 
 
 def main():
-    ap = argparse.ArgumentParser(description="Normalize tag CSV into ML-friendly manifest.csv")
-    ap.add_argument("--in",  dest="in_path", required=True, help="Path to raw CSV export")
-    ap.add_argument("--out", dest="out_path", required=True, help="Where to write manifest.csv")
+    ap = argparse.ArgumentParser(description="Normalize tag CSV exports into one ML-friendly manifest.csv")
+    ap.add_argument("--in",  dest="in_paths", nargs="+", required=True,
+                    help="Raw CSV export(s): files, directories of *.csv, or glob patterns")
+    ap.add_argument("--out", dest="out_path", required=True, help="Where to write manifest.csv (or manifest.parquet)")
+    ap.add_argument("--jobs", type=int, default=0, help="Files parsed in parallel (default: CPU count)")
     args = ap.parse_args()
-    transform_csv(args.in_path, args.out_path)
+    in_paths = expand_inputs(args.in_paths)
+    if not in_paths:
+        print("❌ No input files matched"); raise SystemExit(1)
+    transform_csv(in_paths, args.out_path, jobs=args.jobs or None)
 
 if __name__ == "__main__":
     main()